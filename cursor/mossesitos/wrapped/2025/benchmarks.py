@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Wrapped 2025 chat parser.
+
+    python3 benchmarks.py timestamps
+    python3 benchmarks.py stats -n 2000000
+    python3 benchmarks.py sketch
+    python3 benchmarks.py topn
+    python3 benchmarks.py page
+    python3 benchmarks.py sample
+    python3 benchmarks.py wordcloud
+"""
+
+import hashlib
+import itertools
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from generate_wrapped import generate_html, write_html
+from parse_chat import ChatStats, Message, MessageTable, StatsAccumulator, TimestampDecoder, stats_to_dict
+from sampling import reservoir_sample
+from topk import bottom_counts, top_counts
+from wordcloud_layout import _font, _glyph_mask, _row_bits, cached_layout, to_png, to_svg
+
+
+def strptime_timestamp(date_str, time_str, ampm):
+    """The per-line strptime path the parser used before TimestampDecoder."""
+    if len(date_str.split('/')[-1]) == 2:
+        date_format = "%m/%d/%y"
+    else:
+        date_format = "%m/%d/%Y"
+    if ampm:
+        return datetime.strptime(f"{date_str} {time_str} {ampm.upper()}", f"{date_format} %I:%M %p")
+    return datetime.strptime(f"{date_str} {time_str}", f"{date_format} %H:%M")
+
+
+def synthetic_headers(count, seed=0):
+    """(date, time, AM/PM) groups for a year of chat at a steady pace."""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    step = 365 * 24 * 3600 / count
+    headers = []
+    for i in range(count):
+        ts = start + timedelta(seconds=i * step + rng.random() * step)
+        hour12 = ts.hour % 12 or 12
+        headers.append((f"{ts.month}/{ts.day}/{ts:%y}", f"{hour12}:{ts.minute:02d}",
+                        'AM' if ts.hour < 12 else 'PM'))
+    return headers
+
+
+def timed(label, fn, headers):
+    start = time.perf_counter()
+    result = [fn(*h) for h in headers]
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<18} {elapsed:7.3f}s  ({elapsed / len(headers) * 1e6:.2f} us/line)")
+    return result, elapsed
+
+
+def bench_timestamps(count=500_000):
+    """TimestampDecoder vs per-line strptime on the same header groups."""
+    headers = synthetic_headers(count)
+    print(f"Decoding {count:,} timestamps")
+    expected, slow = timed('strptime', strptime_timestamp, headers)
+    actual, fast = timed('TimestampDecoder', TimestampDecoder().decode, headers)
+    assert actual == expected, 'TimestampDecoder disagrees with strptime'
+    print(f"  {slow / fast:.1f}x faster")
+
+
+def synthetic_messages(count, seed=0):
+    """A steady stream of short messages over one year, from a dozen senders."""
+    rng = random.Random(seed)
+    senders = [f"Person {i}" for i in range(12)]
+    start = datetime(2025, 1, 1)
+    step = 365 * 24 * 3600 / count
+    for i in range(count):
+        yield Message(
+            timestamp=start + timedelta(seconds=int(i * step + rng.random() * step)),
+            sender=rng.choice(senders),
+            content='',
+            is_media=rng.random() < 0.08,
+            has_emoji=rng.random() < 0.2,
+            word_count=rng.randint(0, 12),
+        )
+
+
+def strftime_time_buckets(messages):
+    """The per-message strftime bucketing the stats pass used before MessageTable."""
+    by_hour, by_day, by_month, by_date, by_datetime = {}, {}, {}, {}, {}
+    for msg in messages:
+        by_hour[msg.timestamp.hour] = by_hour.get(msg.timestamp.hour, 0) + 1
+        day_key = msg.timestamp.strftime('%A')
+        by_day[day_key] = by_day.get(day_key, 0) + 1
+        month_key = msg.timestamp.strftime('%B')
+        by_month[month_key] = by_month.get(month_key, 0) + 1
+        date_key = msg.timestamp.strftime('%Y-%m-%d')
+        by_date[date_key] = by_date.get(date_key, 0) + 1
+        datetime_key = msg.timestamp.strftime('%Y-%m-%d %H')
+        by_datetime[datetime_key] = by_datetime.get(datetime_key, 0) + 1
+    return by_hour, by_day, by_month, by_date, by_datetime
+
+
+def table_time_buckets(messages):
+    """The same buckets from integer keys over a MessageTable."""
+    table = MessageTable()
+    for msg in messages:
+        table.append(msg)
+    stats = ChatStats()
+    table.aggregate_into(stats)
+    return (dict(stats.messages_by_hour), dict(stats.messages_by_day), dict(stats.messages_by_month),
+            stats.messages_by_date, stats.messages_by_datetime)
+
+
+def accumulate(messages):
+    acc = StatsAccumulator()
+    for msg in messages:
+        acc.add(msg)
+    return acc.finish()
+
+
+def bench_stats(count=2_000_000):
+    """Time bucketing of the stats pass: strftime per message vs integer keys."""
+    print(f"Stats pass over {count:,} synthetic messages")
+
+    def run(label, fn):
+        start = time.perf_counter()
+        result = fn(synthetic_messages(count))
+        elapsed = time.perf_counter() - start - generate
+        print(f"  {label:<24} {elapsed:7.2f}s")
+        return result, elapsed
+
+    start = time.perf_counter()
+    for _ in synthetic_messages(count):
+        pass
+    generate = time.perf_counter() - start
+    print(f"  (making the messages took {generate:.2f}s; not counted below)")
+
+    expected, slow = run('strftime buckets', strftime_time_buckets)
+    actual, fast = run('MessageTable buckets', table_time_buckets)
+    assert actual == expected, 'MessageTable buckets disagree with strftime buckets'
+    print(f"  {slow / fast:.1f}x faster")
+    run('full StatsAccumulator', accumulate)
+
+
+def synthetic_word_messages(count, vocabulary=200_000, seed=0):
+    """Messages whose words follow a Zipf law over a large vocabulary."""
+    rng = random.Random(seed)
+    senders = [f"Person {i}" for i in range(12)]
+    words = [f"w{i:06d}x" for i in range(vocabulary)]
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(vocabulary)))
+    timestamp = datetime(2025, 1, 1)
+    for _ in range(count):
+        n = rng.randint(1, 12)
+        yield Message(timestamp=timestamp, sender=rng.choice(senders), content='',
+                      word_count=n, words=rng.choices(words, cum_weights=cum_weights, k=n))
+
+
+def bench_sketch(count=1_000_000, slots=5000):
+    """Exact word counts vs SpaceSaving counters: same top lists, bounded memory."""
+    messages = list(synthetic_word_messages(count))
+    print(f"Word counts over {count:,} synthetic messages ({slots:,} sketch slots)")
+
+    def run(label, word_sketch):
+        acc = StatsAccumulator(word_sketch=word_sketch)
+        start = time.perf_counter()
+        for msg in messages:
+            acc.add(msg)
+        if word_sketch:
+            tracked = len(acc.word_counts) + sum(len(w) for w in acc.words_by_person.values())
+        else:
+            tracked = sum(len(postings) for postings in acc.index.postings.values())
+        stats = acc.finish()
+        print(f"  {label:<8} {time.perf_counter() - start:7.2f}s  {tracked:>9,} counters")
+        return acc, stats
+
+    exact_acc, exact = run('exact', None)
+    sketch_acc, sketch = run('sketch', slots)
+
+    # Every listed count must be within the guaranteed bound of the exact one
+    sketch_counts, exact_counts = sketch_acc.word_counts, exact_acc.index.word_counts()
+    bound = sketch_counts.total // slots
+    for word, count in sketch.top_words.items():
+        assert count - sketch_counts.errors[word] <= exact_counts[word] <= count, f'bad count for {word}'
+    worst = max(count - exact_counts[word] for word, count in sketch.top_words.items())
+    assert worst <= bound, f'count off by {worst}, more than total / slots = {bound}'
+
+    # The lists may only differ at the cut-off: anything left out must have
+    # been used no more than the last word that made it in
+    def compare(expected, actual):
+        missing = [w for w in expected if w not in actual]
+        cutoff = min(actual.values())
+        assert all(expected[w] <= cutoff for w in missing), 'a clear top word was dropped'
+        return len(expected) - len(missing), len(expected)
+
+    same, total = compare(exact.top_words, sketch.top_words)
+    print(f"  top words: {same}/{total} the same")
+    same, total = map(sum, zip(*(compare(exact.words_by_person[p], sketch.words_by_person[p])
+                                 for p in exact.words_by_person)))
+    print(f"  top 5 per person: {same}/{total} the same")
+    print(f"  worst overcount {worst} (bound {bound})")
+
+
+def bench_topn(count=2_000_000):
+    """Full sorts vs heap-based top_n over a large vocabulary with many ties."""
+    rng = random.Random(0)
+    counts = {f"w{i:07d}x": int(rng.paretovariate(1.2)) for i in range(count)}
+    print(f"Selecting from {count:,} word counts")
+
+    def by_count(x):
+        return x[1]
+
+    for label, n in (('top 500', 500), ('top 5', 5)):
+        start = time.perf_counter()
+        expected = dict(sorted(counts.items(), key=by_count, reverse=True)[:n])
+        slow = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = top_counts(counts, n)
+        fast = time.perf_counter() - start
+        assert list(actual.items()) == list(expected.items()), f'{label} differs from the full sort'
+        print(f"  {label:<10} sorted {slow:6.3f}s  top_counts {fast:6.3f}s  ({slow / fast:.1f}x faster)")
+
+    start = time.perf_counter()
+    expected = dict(sorted(counts.items(), key=by_count)[:10])
+    slow = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = bottom_counts(counts, 10)
+    fast = time.perf_counter() - start
+    assert list(actual.items()) == list(expected.items()), 'bottom 10 differs from the full sort'
+    print(f"  {'bottom 10':<10} sorted {slow:6.3f}s  bottom_counts {fast:6.3f}s  ({slow / fast:.1f}x faster)")
+
+
+# SHA-256 of the page for synthetic_messages(count) with PAGE_SEED, recorded
+# from a known-good build. bench_page checks both ways of writing the page
+# against these rather than against each other (they share iter_html). A
+# deliberate change to the page's markup means recording them again.
+PAGE_SEED = 2025
+PAGE_DIGESTS = {
+    2_000: 'afba7d92f93bdc9df19e5cf43e63207c70bfccf52916b79aa23a5313d7318eea',
+    200_000: '070b75ed19c4e007dc4197cef5f43d72821fde3a2f0f28c5d69eca718e1add19',
+}
+
+
+def bench_page(count=200_000):
+    """Whole page in memory vs streamed to the file: lower peak, same page as recorded."""
+    messages = list(synthetic_messages(count))
+    stats_obj = accumulate(messages)
+    stats = stats_to_dict(stats_obj)
+    args = (stats, messages, stats_obj.word_index, 2025, stats_obj.day_index)
+    print(f"Writing the page for {count:,} synthetic messages")
+
+    def run(label, write):
+        tracemalloc.start()
+        start = time.perf_counter()
+        write()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        with open(path, 'rb') as f:
+            data = f.read()
+        print(f"  {label:<10} {elapsed:7.3f}s  peak {peak / 1e6:6.2f} MB  ({len(data):,} bytes)")
+        return hashlib.sha256(data).hexdigest()
+
+    def in_memory():
+        html = generate_html(*args, seed=PAGE_SEED)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.html')
+        digests = {'string': run('string', in_memory),
+                   'streamed': run('streamed', lambda: write_html(path, *args, seed=PAGE_SEED))}
+    expected = PAGE_DIGESTS.get(count)
+    if expected is None:
+        print(f"  no recorded page for {count:,} messages, output not checked")
+        return
+    for label, digest in digests.items():
+        assert digest == expected, f'{label} page differs from the recorded one ({digest})'
+    print("  both match the recorded page")
+
+
+def bench_sample(count=2_000_000, k=90):
+    """Shuffling a copy of the list vs one reservoir pass, and how uniform the picks are."""
+    files = [f"IMG-{i:08d}.jpg" for i in range(count)]
+    print(f"Picking {k} of {count:,} items")
+
+    start = time.perf_counter()
+    shuffled = list(files)
+    random.Random(0).shuffle(shuffled)
+    picked = shuffled[:k]
+    slow = time.perf_counter() - start
+    start = time.perf_counter()
+    sample = reservoir_sample(iter(files), k, random.Random(0))
+    fast = time.perf_counter() - start
+    assert len(set(sample)) == len(picked) == k
+    assert sample == reservoir_sample(iter(files), k, random.Random(0)), 'same seed, different picks'
+    print(f"  shuffle {slow:6.3f}s  reservoir {fast:6.3f}s  ({slow / fast:.1f}x faster)")
+
+    # Every item should get in k / n of the time; allow 5 standard deviations
+    n, k, trials = 50, 5, 40_000
+    rng = random.Random(1)
+    hits = [0] * n
+    for _ in range(trials):
+        for item in reservoir_sample(range(n), k, rng):
+            hits[item] += 1
+    p = k / n
+    spread = 5 * (trials * p * (1 - p)) ** 0.5
+    worst = max(abs(h - trials * p) for h in hits)
+    assert worst <= spread, f'an item got picked {worst:.0f} times off the mean (allowed {spread:.0f})'
+    print(f"  {k} of {n}, {trials:,} times: every item within {worst:.0f} of {trials * p:.0f} picks")
+
+
+def bench_wordcloud(count=500):
+    """Laying out the word cloud, reusing the cached layout, and drawing it as SVG and PNG."""
+    rng = random.Random(0)
+    letters = 'abcdefghijklmnopqrstuvwxyzáéíóúñ'
+    words = {}
+    while len(words) < count:
+        words[''.join(rng.choice(letters) for _ in range(rng.randint(3, 10)))] = int(5000 / (len(words) + 1)) + 1
+    print(f"Word cloud of {count:,} words")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings = {}
+        start = time.perf_counter()
+        layout = cached_layout(words, cache_dir=tmp)
+        timings['layout'] = time.perf_counter() - start
+        start = time.perf_counter()
+        again = cached_layout(words, cache_dir=tmp)
+        timings['cached'] = time.perf_counter() - start
+        assert again == layout, 'cached layout differs'
+        start = time.perf_counter()
+        to_svg(layout)
+        timings['svg'] = time.perf_counter() - start
+        start = time.perf_counter()
+        to_png(layout, os.path.join(tmp, 'wordcloud.png'))
+        timings['png'] = time.perf_counter() - start
+
+    # No two words' ink may touch
+    rows = [0] * layout.height
+    for p in layout.placements:
+        mask = _glyph_mask(p.word, _font(None, p.size), p.vertical)[0]
+        for i, bits in enumerate(_row_bits(mask, p.x)):
+            assert not rows[p.y + i] & bits, f'{p.word} overlaps another word'
+            rows[p.y + i] |= bits
+    print(f"  {len(layout.placements)} words placed; " + '  '.join(f'{k} {v:.3f}s' for k, v in timings.items()))
+
+
+BENCHMARKS = {
+    'timestamps': bench_timestamps,
+    'stats': bench_stats,
+    'sketch': bench_sketch,
+    'topn': bench_topn,
+    'page': bench_page,
+    'sample': bench_sample,
+    'wordcloud': bench_wordcloud,
+}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('benchmark', nargs='*', help=f"any of: {', '.join(BENCHMARKS)} (default: all)")
+    ap.add_argument('-n', '--count', type=int, help='how many items to run each benchmark on')
+    args = ap.parse_args()
+
+    for name in args.benchmark or BENCHMARKS:
+        if name not in BENCHMARKS:
+            ap.error(f'unknown benchmark: {name}')
+        BENCHMARKS[name](*([args.count] if args.count else []))
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Build records for incremental Wrapped 2025 rebuilds.
+
+Every stage of a page build (parse, stats, each HTML section) is keyed by the
+fingerprints of its inputs and of its code. Its output and the fingerprint of
+that output are saved in .build_cache/, so the next run can reuse the output
+whenever the key still matches, without even loading the inputs. A stage
+whose output comes out the same as last time doesn't invalidate the stages
+after it.
+
+Code fingerprints follow a function into everything in its module it uses by
+name: other functions (also in other modules), classes and constant tables.
+Editing the page template or CSS therefore leaves the sections alone, while
+editing a section's helper rebuilds just the sections that use it.
+"""
+
+import datetime
+import filecmp
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import types
+from typing import Callable, Dict, Optional
+
+BUILD_CACHE_DIR = '.build_cache'
+
+
+def fingerprint(*parts) -> str:
+    """sha1 of the parts' reprs."""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _plain(value):
+    """For json.dumps: what it can't write itself, as something it can."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=repr)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    # Objects by their fields; a class can list the ones that say what it holds
+    # in __fingerprint_fields__, leaving out bookkeeping like a cache's own mtime
+    fields = getattr(type(value), '__fingerprint_fields__', None)
+    if fields is None and hasattr(value, '__dict__'):
+        fields = vars(value)
+    if fields is None:
+        fields = getattr(type(value), '__slots__', None)
+    if fields is not None:
+        return {'__class__': type(value).__qualname__,
+                **{name: getattr(value, name) for name in fields if hasattr(value, name)}}
+    raise TypeError(f'no fingerprint for {type(value).__qualname__}')
+
+
+def _normalized(value):
+    """The value with every dict turned into its items sorted by key, for keys json can't sort."""
+    if isinstance(value, dict):
+        items = [(_normalized(k), _normalized(v)) for k, v in value.items()]
+        return sorted(items, key=lambda item: json.dumps(item[0], default=_plain))
+    if isinstance(value, (list, tuple)):
+        return [_normalized(v) for v in value]
+    if isinstance(value, (str, int, float, type(None))):
+        return value
+    return _normalized(_plain(value))
+
+
+def value_fingerprint(value) -> str:
+    """sha1 of a value's contents: equal values hash the same however they were built.
+
+    Dicts are hashed by sorted keys and objects by their fields, so neither
+    insertion order nor which objects happen to be shared changes it.
+    """
+    try:
+        text = json.dumps(value, sort_keys=True, default=_plain)
+    except TypeError:
+        # Tuple keys, or keys of mixed types
+        text = json.dumps(_normalized(value), default=_plain)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+_code_fingerprints: Dict[Callable, str] = {}
+
+
+def code_fingerprint(fn: Callable) -> str:
+    """Hash of a function's code and of the functions, classes and constants it reaches by name."""
+    if fn in _code_fingerprints:
+        return _code_fingerprints[fn]
+
+    digest = hashlib.sha1()
+    seen = set()
+
+    def visit_code(code, module_globals):
+        # Bytecode and constants only: moving a function doesn't change it
+        digest.update(code.co_code)
+        digest.update(repr(code.co_names).encode('utf-8'))
+        for const in code.co_consts:
+            if isinstance(const, types.CodeType):
+                visit_code(const, module_globals)
+            else:
+                digest.update(repr(const).encode('utf-8'))
+        for name in code.co_names:
+            if name in module_globals:
+                visit_value(module_globals[name])
+
+    def visit_default(value):
+        if isinstance(value, (types.FunctionType, type)):
+            visit_value(value)
+        else:
+            # Not visit_value: a default of None or 0 must still count
+            digest.update(repr(value).encode('utf-8'))
+
+    def visit_value(value):
+        if id(value) in seen:
+            return
+        seen.add(id(value))
+        value = getattr(value, '__wrapped__', value)  # lru_cache and friends
+        if isinstance(value, types.FunctionType):
+            visit_code(value.__code__, value.__globals__)
+            # Default arguments live on the function, not in its code
+            for default in value.__defaults__ or ():
+                visit_default(default)
+            for name, default in sorted((value.__kwdefaults__ or {}).items()):
+                digest.update(name.encode('utf-8'))
+                visit_default(default)
+        elif isinstance(value, type):
+            try:
+                digest.update(inspect.getsource(value).encode('utf-8'))
+            except (OSError, TypeError):
+                digest.update(value.__qualname__.encode('utf-8'))
+        elif isinstance(value, (set, frozenset)):
+            digest.update(repr(sorted(value, key=repr)).encode('utf-8'))
+        elif isinstance(value, (dict, list, tuple, str, bytes, int, float, bool)):
+            digest.update(repr(value).encode('utf-8'))
+        # Modules and builtins aren't ours to track
+
+    visit_value(fn)
+    result = _code_fingerprints[fn] = digest.hexdigest()
+    return result
+
+
+class Lazy:
+    """A build input known by its fingerprint, loaded only if a stage has to run."""
+
+    def __init__(self, fingerprint: str, load: Callable[[], object]):
+        self.fingerprint = fingerprint
+        self.load = load
+
+
+def why_rebuilt(record: Optional[dict], inputs: Dict[str, str], code: str) -> str:
+    """Why a stage with this record can't be reused for these inputs and code."""
+    if record is None:
+        return 'not built before'
+    reasons = []
+    if record['code'] != code:
+        reasons.append('code changed')
+    changed = [name for name, fp in inputs.items() if record['inputs'].get(name) != fp]
+    if changed:
+        reasons.append(f"{', '.join(changed)} changed")
+    return '; '.join(reasons) or 'forced'
+
+
+class BuildCache:
+    """Records of one page's stages, one pickle per stage in .build_cache/."""
+
+    def __init__(self, folder: str = BUILD_CACHE_DIR, prefix: str = ''):
+        self.folder = folder
+        self.prefix = prefix
+
+    def _path(self, stage: str) -> str:
+        name = hashlib.sha1(f'{self.prefix}/{stage}'.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.folder, name + '.pickle')
+
+    def get(self, stage: str) -> Optional[dict]:
+        try:
+            with open(self._path(stage), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+
+    def lookup(self, stage: str, inputs: Dict[str, str], code: str = ''):
+        """(record, None) if the saved record matches, else (None, why it has to be rebuilt)."""
+        record = self.get(stage)
+        if record is not None and record['inputs'] == inputs and record['code'] == code:
+            return record, None
+        return None, why_rebuilt(record, inputs, code)
+
+    def put(self, stage: str, inputs: Dict[str, str], code: str, outputs: dict, digests: Dict[str, str]):
+        """Save a stage's outputs (and their fingerprints), written atomically."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(stage)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'inputs': inputs, 'code': code, 'outputs': outputs, 'digests': digests},
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+def write_if_changed(path: str, chunks) -> bool:
+    """Write the chunks to `path` unless the file already holds exactly that.
+
+    Chunks are streamed to a temporary file; an unchanged file is left alone,
+    mtime and all. Returns whether the file was (re)written.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+    if os.path.exists(path) and filecmp.cmp(tmp_path, path, shallow=False):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
@@ -1,18 +1,28 @@
 #!/usr/bin/env python3
 """
 Generate a rectangular word cloud image from chat stats.
+
+The layout is cached (see wordcloud_layout), so rerunning with the same words
+only redraws it. A .svg output file gets an SVG, anything else a PNG.
 """
 
 import json
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from parse_chat import compute_stats, stats_to_dict
+from wordcloud_layout import cached_layout, to_png, to_svg
+
+def generate_wordcloud(stats_file='stats_2025.json', output_file='wordcloud.png', chat_file=None):
+    """Generate a rectangular word cloud from the stats file.
 
-def generate_wordcloud(stats_file='stats_2025.json', output_file='wordcloud.png'):
-    """Generate a rectangular word cloud from the stats file."""
+    If chat_file is given, stats are streamed straight from the chat export
+    instead (no message list is kept in memory).
+    """
 
     # Load stats
-    with open(stats_file, 'r', encoding='utf-8') as f:
-        stats = json.load(f)
+    if chat_file:
+        stats = stats_to_dict(compute_stats(chat_file))
+    else:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            stats = json.load(f)
 
     top_words = stats.get('top_words', {})
 
@@ -20,30 +30,31 @@ def generate_wordcloud(stats_file='stats_2025.json', output_file='wordcloud.png'
         print("No words found in stats!")
         return
 
-    # Generate word cloud
-    wordcloud = WordCloud(
+    # Lay out the word cloud (or reuse the last layout of these words)
+    layout = cached_layout(
+        top_words,
         width=800,
         height=500,
-        background_color='#1a1a2e',
-        colormap='plasma',
         max_words=500,
         min_font_size=8,
         max_font_size=120,
         prefer_horizontal=0.7,
         relative_scaling=0.5,
         margin=5,
-    ).generate_from_frequencies(top_words)
+    )
 
-    # Save to file
-    plt.figure(figsize=(10, 6.25), facecolor='#1a1a2e')
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.tight_layout(pad=0)
-    plt.savefig(output_file, dpi=150, facecolor='#1a1a2e', bbox_inches='tight', pad_inches=0.1)
-    plt.close()
+    # Save to file, drawn straight at the output size
+    if output_file.endswith('.svg'):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(to_svg(layout, background='#1a1a2e'))
+    else:
+        to_png(layout, output_file, background='#1a1a2e', scale=2)
 
     print(f"Word cloud saved to {output_file}")
 
 
 if __name__ == '__main__':
-    generate_wordcloud()
+    import sys
+
+    generate_wordcloud(chat_file=sys.argv[1] if len(sys.argv) > 1 else None,
+                       output_file=sys.argv[2] if len(sys.argv) > 2 else 'wordcloud.png')
@@ -5,7 +5,17 @@ Creates a mobile-friendly, Spotify Wrapped-style HTML presentation.
 """
 
 import json
-from parse_chat import parse_whatsapp_chat, stats_to_dict
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+from build_cache import BuildCache, Lazy, code_fingerprint, fingerprint, value_fingerprint, write_if_changed
+from media_catalog import MediaCatalog
+from parse_chat import ActivityIndex, is_gibberish, media_prefixes, split_by_year, stats_to_dict
+from parse_cache import cached_parse_whatsapp_chat, cached_parse_whatsapp_years, export_fingerprint
+from sampling import Reservoir, reservoir_sample
+from thumbnails import build_thumbnails
+from topk import top_counts, top_n
 from datetime import datetime
 import random
 
@@ -362,17 +372,15 @@ def build_rare_emoji_display_html(rare_emojis):
     return ''.join(emojis_html)
 
 
-def build_person_buttons_html(persons_data, images_by_sender):
+def build_person_buttons_html(persons_data, images_by_sender, rng=random):
     """Build the person selector buttons with image backgrounds - show everyone."""
-    import random
     buttons = []
     for p in persons_data:
         name = p['name']
         # Get up to 4 random images for this person
-        person_images = images_by_sender.get(name, [])
-        if person_images:
-            random.shuffle(person_images)
-            selected = person_images[:4]
+        selected = reservoir_sample(images_by_sender.get(name, []), 4, rng)
+        if selected:
+            rng.shuffle(selected)
             # Create image grid background - use contain to keep aspect ratio
             if len(selected) >= 4:
                 img_style = f'''background-image:
@@ -391,36 +399,41 @@ def build_person_buttons_html(persons_data, images_by_sender):
     return ''.join(buttons)
 
 
-def build_media_gallery_html(media_files):
-    """Build the media gallery with many small images/videos to create an overwhelming effect."""
-    import random
-    if not media_files:
-        return ''
+def media_manifest_item(filename, is_video, thumbs=None):
+    """A media cell for the page's lazy grids: ['i'|'v', shown src, original, poster].
 
-    # Separate images and videos
-    images = [f for f in media_files if f.startswith('IMG-')]
-    videos = [f for f in media_files if f.startswith('VID-')]
+    The cell shows the thumbnail if there is one, and opens the original.
+    """
+    thumb = (thumbs or {}).get(filename, {})
+    item = ['v' if is_video else 'i', thumb.get('src', f'media/{filename}'), f'media/{filename}']
+    if 'poster' in thumb:
+        item.append(thumb['poster'])
+    return item
 
-    # Select random items - 90 images and 10 videos for overwhelming effect
-    random.shuffle(images)
-    random.shuffle(videos)
 
-    selected_images = images[:90]
-    selected_videos = videos[:10]
+def select_gallery_media(media_files, rng=random):
+    """Pick the gallery's many small images/videos to create an overwhelming effect: [(file, 'img'|'vid')]."""
+    if not media_files:
+        return []
+
+    # Select random items - 90 images and 10 videos for overwhelming effect
+    images, videos = Reservoir(90, rng), Reservoir(10, rng)
+    for f in media_files:
+        if f.startswith('IMG-'):
+            images.add(f)
+        elif f.startswith('VID-'):
+            videos.add(f)
+    selected_images, selected_videos = images.items, videos.items
 
     # Mix them together
     all_items = [(img, 'img') for img in selected_images] + [(vid, 'vid') for vid in selected_videos]
-    random.shuffle(all_items)
+    rng.shuffle(all_items)
+    return all_items
 
-    gallery_items = []
-
-    for item, item_type in all_items:
-        if item_type == 'img':
-            gallery_items.append(f'''<div class="gallery-item"><img src="media/{item}" alt="" loading="lazy" onclick="openMedia(this.src)"></div>''')
-        else:
-            gallery_items.append(f'''<div class="gallery-item"><video autoplay muted loop playsinline onclick="openMedia(this.src)"><source src="media/{item}" type="video/mp4"></video></div>''')
 
-    return ''.join(gallery_items)
+def build_gallery_manifest(all_items, thumbs=None):
+    """The media gallery's cells, from select_gallery_media()'s picks."""
+    return [media_manifest_item(item, item_type == 'vid', thumbs) for item, item_type in all_items]
 
 
 def get_comparison_text(total_words, total_messages, media_count):
@@ -445,17 +458,22 @@ def get_comparison_text(total_words, total_messages, media_count):
     return words_comparison, messages_comparison, media_comparison
 
 
-def calculate_data_by_sender(media_files_by_sender, media_folder='media'):
-    """Calculate total MB of media sent by each person."""
-    import os
+def calculate_data_by_sender(media_files_by_sender, media_folder='media', catalog=None):
+    """Calculate total MB of media sent by each person, from the media catalog.
+
+    Sizes come from catalog.fresh(), so a file rewritten in place (which
+    leaves the folder's mtime alone) is counted at its new size.
+    """
+    if catalog is None:
+        catalog = MediaCatalog.load(media_folder)
     data_by_sender = {}
 
     for sender, files in media_files_by_sender.items():
         total_bytes = 0
         for filename in files:
-            filepath = os.path.join(media_folder, filename)
-            if os.path.exists(filepath):
-                total_bytes += os.path.getsize(filepath)
+            entry = catalog.fresh(filename)
+            if entry:
+                total_bytes += entry.size
         # Convert to MB
         data_by_sender[sender] = total_bytes / (1024 * 1024)
 
@@ -520,12 +538,17 @@ def build_data_ranking_html(data_by_sender):
     return ''.join(items)
 
 
-def get_day_excerpts(messages: list, date_str: str, max_items: int = 80) -> dict:
-    """Get all messages from a specific day for grid display."""
+def get_day_excerpts(messages: list, date_str: str, max_items: int = 80, day_index=None, rng=random) -> dict:
+    """Get all messages from a specific day for grid display.
+
+    With the parser's day_index (date -> (start, end) in messages), only that
+    day's slice is looked at instead of every message.
+    """
     from datetime import datetime
 
     text_items = []
-    media_items = []
+    # Up to 30 photos/videos, picked at random as they come
+    media_messages = Reservoir(30, rng)
 
     # Parse target date
     try:
@@ -533,20 +556,19 @@ def get_day_excerpts(messages: list, date_str: str, max_items: int = 80) -> dict
     except:
         return {'items': [], 'total_count': 0}
 
+    if day_index is not None:
+        start, end = day_index.get(date_str, (0, 0))
+        messages = messages[start:end]
+
+    visual_prefixes = media_prefixes(target_date.year)[0]
     for msg in messages:
         if msg.timestamp.date() == target_date.date():
             content = msg.content.strip()
 
             # Check if it's media
             if msg.is_media and msg.media_filename:
-                if msg.media_filename.startswith(('IMG-2025', 'VID-2025')):
-                    media_items.append({
-                        'type': 'media',
-                        'filename': msg.media_filename,
-                        'sender': msg.sender,
-                        'time': msg.timestamp.strftime('%H:%M'),
-                        'media_type': 'video' if msg.media_filename.startswith('VID') else 'image'
-                    })
+                if msg.media_filename.startswith(visual_prefixes):
+                    media_messages.add(msg)
             # Text message
             elif not msg.is_media and not msg.is_deleted and len(content) > 3:
                 # Skip links-only messages
@@ -566,20 +588,21 @@ def get_day_excerpts(messages: list, date_str: str, max_items: int = 80) -> dict
                     'length': len(full_content)
                 })
 
-    total_count = len(text_items) + len(media_items)
-
-    # Prioritize longer text messages
-    text_items.sort(key=lambda x: x['length'], reverse=True)
+    total_count = len(text_items) + media_messages.seen
 
-    # Take more text items (50) and fewer media items (30)
-    import random
-    random.shuffle(media_items)
-    selected_texts = text_items[:50]
-    selected_media = media_items[:30]
+    # Take more text items (50, longest first) and fewer media items (30)
+    selected_texts = top_n(text_items, 50, key=lambda x: x['length'])
+    selected_media = [{
+        'type': 'media',
+        'filename': msg.media_filename,
+        'sender': msg.sender,
+        'time': msg.timestamp.strftime('%H:%M'),
+        'media_type': 'video' if msg.media_filename.startswith('VID') else 'image'
+    } for msg in media_messages.items]
 
     # Mix them together
     all_items = selected_texts + selected_media
-    random.shuffle(all_items)
+    rng.shuffle(all_items)
 
     return {
         'items': all_items[:max_items],
@@ -587,42 +610,31 @@ def get_day_excerpts(messages: list, date_str: str, max_items: int = 80) -> dict
     }
 
 
-def build_day_excerpts_html(day_data: dict) -> str:
-    """Build HTML for day excerpts as a 10x8 grid."""
-    import html as html_escape
-    items = day_data.get('items', [])
-    if not items:
-        return ''
-
-    html_parts = ['<div class="day-grid">']
-
-    for item in items:
+def build_day_manifest(day_data: dict, thumbs=None) -> list:
+    """A day's excerpt cells: media cells, and ['t', sender, shown text, full text]."""
+    cells = []
+    for item in day_data.get('items', []):
         if item['type'] == 'media':
-            if item['media_type'] == 'video':
-                html_parts.append(f'''<div class="day-grid-item media-item" onclick="openMedia('media/{item['filename']}')">
-                    <video autoplay muted loop playsinline>
-                        <source src="media/{item['filename']}" type="video/mp4">
-                    </video>
-                </div>''')
-            else:
-                html_parts.append(f'''<div class="day-grid-item media-item" onclick="openMedia('media/{item['filename']}')">
-                    <img src="media/{item['filename']}" alt="" loading="lazy">
-                </div>''')
+            cells.append(media_manifest_item(item['filename'], item['media_type'] == 'video', thumbs))
         else:
-            # Text message with tooltip for full content
-            full_content = html_escape.escape(item.get('full_content', item['content']))
-            display_content = html_escape.escape(item['content'])
-            html_parts.append(f'''<div class="day-grid-item text-item" title="{full_content}">
-                <span class="grid-sender">{item['sender']}</span>
-                <span class="grid-content">{display_content}</span>
-            </div>''')
+            cells.append(['t', item['sender'], item['content'], item.get('full_content', item['content'])])
+    return cells
 
-    html_parts.append('</div>')
-    return ''.join(html_parts)
 
+def build_lazy_grid_html(grid_class: str, key: str) -> str:
+    """An empty grid that the page's script fills from mediaManifest[key] as it scrolls into view."""
+    return f'<div class="lazy-grid" data-grid="{grid_class}" data-items="{key}"></div>'
 
-def build_github_calendar_html(messages_by_date):
-    """Build a GitHub-style contribution calendar for 2025."""
+
+def build_day_excerpts_html(date_str: str, day_data: dict) -> str:
+    """Day excerpts as a 10x8 grid, rendered lazily from the media manifest."""
+    if not day_data.get('items'):
+        return ''
+    return build_lazy_grid_html('day-grid', date_str)
+
+
+def build_github_calendar_html(messages_by_date, year=2025):
+    """Build a GitHub-style contribution calendar for the year."""
     from datetime import datetime, timedelta
 
     if not messages_by_date:
@@ -637,26 +649,14 @@ def build_github_calendar_html(messages_by_date):
     if max_count == 0:
         return ''
 
-    # Calculate quartiles for color levels
-    p25 = max_count * 0.25
-    p50 = max_count * 0.50
-    p75 = max_count * 0.75
-
-    def get_level(count):
-        if count == 0:
-            return 0
-        elif count <= p25:
-            return 1
-        elif count <= p50:
-            return 2
-        elif count <= p75:
-            return 3
-        else:
-            return 4
+    # Color levels (active, then above 25/50/75% of the busiest day) as one
+    # bitmap of days per level
+    activity = ActivityIndex(year)
+    planes = activity.level_planes(messages_by_date)
 
-    # Generate calendar for 2025 (Jan 1 to Dec 31)
-    start_date = datetime(2025, 1, 1)
-    end_date = datetime(2025, 12, 31)
+    # Generate calendar for the year (Jan 1 to Dec 31)
+    start_date = datetime(year, 1, 1)
+    end_date = datetime(year, 12, 31)
 
     # Build grid (7 rows for days of week, 53 columns for weeks)
     calendar_cells = []
@@ -669,7 +669,7 @@ def build_github_calendar_html(messages_by_date):
     while current_date <= end_date or current_date.weekday() != 6:
         date_str = current_date.strftime('%Y-%m-%d')
         count = messages_by_date.get(date_str, 0)
-        level = get_level(count) if current_date.year == 2025 else 0
+        level = ActivityIndex.level(planes, activity.day_index(current_date)) if current_date.year == year else 0
 
         title = f"{date_str}: {count} mensajes" if count > 0 else date_str
         calendar_cells.append(f'<div class="calendar-day level-{level}" title="{title}"></div>')
@@ -681,35 +681,16 @@ def build_github_calendar_html(messages_by_date):
     return ''.join(calendar_cells)
 
 
-def filter_gibberish_word(word):
-    """Filter out gibberish/URL parameter words."""
-    url_params = {'mibextid', 'wwxifr', 'gasearch', 'source', 'fbclid', 'utm', 'ref', 'share', 'thefork',
-                  'edited', 'sharing', 'shared', 'this', 'message', 'was', 'deleted', 'you', 'attached', 'file'}
-    if len(word) < 3 or len(word) > 15:
-        return False
-    if any(c.isdigit() for c in word):
-        return False
-    if word.lower() in url_params:
-        return False
-    # Skip words with too many consonants in a row (gibberish)
-    vowels = set('aeiouáéíóú')
-    consonant_streak = 0
-    max_streak = 0
-    for c in word.lower():
-        if c.isalpha() and c not in vowels:
-            consonant_streak += 1
-            max_streak = max(max_streak, consonant_streak)
-        else:
-            consonant_streak = 0
-    if max_streak > 4:
-        return False
-    return True
-
+def build_person_details_html(persons_data, words_by_person, unique_words_by_person=None, word_index=None):
+    """Build the person detail cards - show everyone.
 
-def build_person_details_html(persons_data, words_by_person, unique_words_by_person=None):
-    """Build the person detail cards - show everyone."""
+    With the parser's word_index, favorite words are the top 5 non-gibberish
+    words; otherwise the (top 5) words_by_person from the stats are filtered.
+    """
     if unique_words_by_person is None:
         unique_words_by_person = {}
+    if word_index is not None:
+        words_by_person = word_index.top_words_by_person(5, skip_gibberish=True)
     details = []
     for p in persons_data:
         safe_name = p['name'].replace(' ', '-')
@@ -717,9 +698,7 @@ def build_person_details_html(persons_data, words_by_person, unique_words_by_per
 
         # Get top words for this person (with filtering for gibberish)
         person_words = words_by_person.get(p['name'], {})
-        # Filter out gibberish/URL params
-        filtered_words = {w: c for w, c in person_words.items() if filter_gibberish_word(w)}
-        top_words_list = list(filtered_words.items())[:5]
+        top_words_list = [(w, c) for w, c in person_words.items() if not is_gibberish(w)][:5]
         words_html = ''
         if top_words_list:
             words_html = '<div class="person-words"><div class="words-title">Palabras favoritas:</div><div class="words-list">'
@@ -768,30 +747,66 @@ def build_person_details_html(persons_data, words_by_person, unique_words_by_per
     return ''.join(details)
 
 
-def generate_html(stats: dict, messages: list) -> str:
-    """Generate the Wrapped 2025 HTML."""
+def format_day_es(date_str):
+    """'2025-03-07' -> '7 de Marzo'."""
+    from datetime import datetime
+    try:
+        dt = datetime.strptime(date_str, '%Y-%m-%d')
+        formatted = dt.strftime('%d de %B').lstrip('0')
+        # Translate month
+        for en, es in MONTH_NAMES_ES.items():
+            formatted = formatted.replace(en, es)
+        return formatted
+    except:
+        return date_str
+
+
+def build_day_slide_html(title, day_formatted, date_str, day_data):
+    """A 'what happened that day' slide for a highlighted day."""
+    return f'''
+        <div class="slide" style="padding: 1rem;">
+            <div class="slide-title">{title}: {day_formatted}</div>
+            <div class="slide-subtitle">Lo que pasó ese día</div>
+            {build_day_excerpts_html(date_str, day_data)}
+        </div>
+'''
 
+
+# Page sections. Each renderer is registered with the name(s) of what it makes
+# and the names of its inputs: the page context (stats, messages, word_index,
+# year, day_index, seed, catalog), other sections, or 'rng' for a random.Random
+# of its own. Those are seeded from the page's seed and the section's name, so
+# the same seed gives the same page however the sections end up scheduled.
+# Sections that look at files on disk are registered with cache=False, so an
+# incremental build always runs them.
+SECTIONS = {}
+
+
+def section(outputs, *inputs, cache=True):
+    """Register a section renderer; with several outputs it returns a tuple."""
+    if isinstance(outputs, str):
+        outputs = (outputs,)
+
+    def register(fn):
+        SECTIONS[outputs] = (fn, inputs, cache)
+        return fn
+    return register
+
+
+@section('sorted_senders', 'stats')
+def _sorted_senders(stats):
     # Sort senders by message count
-    sorted_senders = sorted(
-        stats['messages_by_sender'].items(),
-        key=lambda x: x[1],
-        reverse=True
-    )
+    return sorted(stats['messages_by_sender'].items(), key=lambda x: x[1], reverse=True)
 
-    # Get top words
-    top_words = list(stats['top_words'].items())[:20]
 
-    # Generate fun facts
-    fun_facts = get_fun_facts(stats, messages)
+@section('fun_facts', 'stats', 'messages')
+def _fun_facts(stats, messages):
+    return get_fun_facts(stats, messages)
 
-    # Calculate percentages for charts
-    total = stats['total_messages']
-    sender_percentages = [
-        (name, count, round(count / total * 100, 1))
-        for name, count in sorted_senders if count > 10
-    ]
 
-    # Build person cards data
+@section('persons_data', 'stats', 'sorted_senders')
+def build_persons_data(stats, sorted_senders):
+    """Person cards data, with a personality guessed from each one's stats."""
     persons_data = []
     for sender, count in sorted_senders:
         if count < 5:
@@ -838,42 +853,245 @@ def generate_html(stats: dict, messages: list) -> str:
             'traits': traits[:3] if traits else [],
             'color': COLORS[len(persons_data) % len(COLORS)]
         })
+    return persons_data
+
+
+@section(('msg_ranking_html', 'words_ranking_html'), 'stats')
+def _dual_ranking(stats):
+    return build_dual_ranking_html(stats['messages_by_sender'], stats['words_by_sender'],
+                                   stats.get('media_by_sender', {}))
+
+
+@section('carousel_html', 'fun_facts')
+def _carousel(fun_facts):
+    return build_carousel_html(fun_facts)
+
+
+@section('emoji_display_html', 'stats')
+def _emoji_display(stats):
+    return build_emoji_display_html(stats.get('top_emojis', {}))
+
+
+@section('rare_emoji_html', 'stats')
+def _rare_emoji_display(stats):
+    return build_rare_emoji_display_html(stats.get('rare_emojis', {}))
+
+
+@section('person_buttons_html', 'persons_data', 'stats', 'rng')
+def _person_buttons(persons_data, stats, rng):
+    return build_person_buttons_html(persons_data, stats.get('images_by_sender', {}), rng)
+
+
+@section('person_details_html', 'persons_data', 'stats', 'word_index')
+def _person_details(persons_data, stats, word_index):
+    return build_person_details_html(persons_data, stats.get('words_by_person', {}),
+                                     stats.get('unique_words_by_person', {}), word_index)
+
+
+@section('gallery_items', 'stats', 'catalog', 'rng')
+def _gallery_items(stats, catalog, rng):
+    # Only files that are actually in the media folder
+    return select_gallery_media(catalog.present(stats.get('media_files', [])), rng)
+
+
+@section('media_manifest', 'gallery_items', 'day_excerpts', 'thumbs')
+def _media_manifest(gallery_items, day_excerpts, thumbs):
+    # Cells of every lazy grid on the page: the gallery, and each highlighted day
+    manifest = {'gallery': build_gallery_manifest(gallery_items, thumbs)}
+    for date_str, day_data in day_excerpts.items():
+        manifest[date_str] = build_day_manifest(day_data, thumbs)
+    return manifest
+
+
+@section('calendar_html', 'stats', 'year')
+def _calendar(stats, year):
+    return build_github_calendar_html(stats.get('messages_by_date', {}), year)
+
+
+@section('data_by_sender', 'stats', 'catalog', cache=False)
+def _data_by_sender(stats, catalog):
+    return calculate_data_by_sender(stats.get('media_files_by_sender', {}), catalog=catalog)
+
+
+@section('data_ranking_html', 'data_by_sender')
+def _data_ranking(data_by_sender):
+    return build_data_ranking_html(data_by_sender)
+
 
-    # Pre-build all dynamic HTML parts
-    ranking_html = build_ranking_html(sender_percentages)
-    msg_ranking_html, words_ranking_html = build_dual_ranking_html(
-        stats['messages_by_sender'], stats['words_by_sender'], stats.get('media_by_sender', {})
+@section(('audio_ranking_html', 'audio_comparison'), 'stats')
+def _audio_ranking(stats):
+    return build_audio_ranking_html(stats.get('audio_duration_by_sender', {}))
+
+
+@section('highlights', 'stats')
+def _highlights(stats):
+    # Highlighted days, date -> slide title: most active day, then the days
+    # of the peak hour and of the longest conversation if they are different
+    highlights = {}
+    for title, date_str in (('Día Más Activo', stats.get('most_active_date', '')),
+                            ('La Hora Pico', stats.get('peak_hour_datetime', '')[:10]),
+                            ('Conversación Más Larga', stats.get('longest_conversation', {}).get('date', ''))):
+        if date_str and date_str not in highlights:
+            highlights[date_str] = title
+    return highlights
+
+
+@section('day_excerpts', 'messages', 'highlights', 'day_index', 'rng')
+def _day_excerpts(messages, highlights, day_index, rng):
+    return {date_str: get_day_excerpts(messages, date_str, day_index=day_index, rng=rng) for date_str in highlights}
+
+
+@section('thumbs', 'gallery_items', 'day_excerpts', 'catalog', cache=False)
+def _thumbs(gallery_items, day_excerpts, catalog):
+    # Only the media the page shows gets a thumbnail
+    filenames = [item for item, _ in gallery_items]
+    for day_data in day_excerpts.values():
+        filenames += [item['filename'] for item in day_data['items'] if item['type'] == 'media']
+    return build_thumbnails(filenames, catalog=catalog)
+
+
+@section(('day_excerpts_html', 'more_day_slides_html'), 'stats', 'highlights', 'day_excerpts')
+def _day_slides(stats, highlights, day_excerpts):
+    # The most active day has its own slide; the others get one each after it
+    most_active_date = stats.get('most_active_date', '')
+    more_day_slides_html = ''.join(
+        build_day_slide_html(title, format_day_es(date_str), date_str, day_excerpts[date_str])
+        for date_str, title in highlights.items() if date_str != most_active_date
     )
-    carousel_html = build_carousel_html(fun_facts)
-    word_cloud_html = build_word_cloud_html(top_words)
-    emoji_display_html = build_emoji_display_html(stats.get('top_emojis', {}))
-    rare_emoji_html = build_rare_emoji_display_html(stats.get('rare_emojis', {}))
-    person_buttons_html = build_person_buttons_html(persons_data, stats.get('images_by_sender', {}))
-    person_details_html = build_person_details_html(persons_data, stats.get('words_by_person', {}), stats.get('unique_words_by_person', {}))
-    media_gallery_html = build_media_gallery_html(stats.get('media_files', []))
-    calendar_html = build_github_calendar_html(stats.get('messages_by_date', {}))
-    data_by_sender = calculate_data_by_sender(stats.get('media_files_by_sender', {}))
-    data_ranking_html = build_data_ranking_html(data_by_sender)
-    total_data_mb = sum(data_by_sender.values())
-    audio_ranking_html, audio_comparison = build_audio_ranking_html(stats.get('audio_duration_by_sender', {}))
-
-    # Get excerpts from most active day
+    return build_day_excerpts_html(most_active_date, day_excerpts.get(most_active_date, {})), more_day_slides_html
+
+
+def _timed(fn, args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class _Values(dict):
+    """Section inputs and outputs; Lazy context values are loaded on first use."""
+
+    def __init__(self, lazies: dict):
+        super().__init__()
+        self.lazies = lazies
+
+    def __missing__(self, name):
+        if name not in self.lazies:
+            raise KeyError(name)
+        value = self[name] = self.lazies[name].load()
+        return value
+
+
+def render_sections(context: dict, workers: int = 4, timings: Optional[dict] = None,
+                    cache: Optional[BuildCache] = None, explain: Optional[dict] = None) -> dict:
+    """Render every registered section on a thread pool, each as soon as its
+    inputs are ready. Returns the context plus every section's outputs, and
+    fills `timings` (if given) with seconds per rendered section.
+
+    With a BuildCache, a section whose inputs and code have the same
+    fingerprints as last time is loaded from it instead, without loading its
+    inputs; context values can be Lazy for that. `explain` (if given) gets
+    why each section was rendered, or None for the ones that were reused.
+    """
+    lazies = {name: value for name, value in context.items() if isinstance(value, Lazy)}
+    values = _Values(lazies)
+    fingerprints = {}
+    for name, value in context.items():
+        if isinstance(value, Lazy):
+            fingerprints[name] = value.fingerprint
+        else:
+            values[name] = value
+            if cache is not None:
+                fingerprints[name] = value_fingerprint(value)
+    seed = context.get('seed')
+    ready = set(context)
+    pending = dict(SECTIONS)
+    running = {}
+
+    def start_ready(pool):
+        # Reused sections make their outputs ready at once, so go round until
+        # nothing more can start
+        started = True
+        while started:
+            started = False
+            for outputs, (fn, inputs, cacheable) in list(pending.items()):
+                if not all(name in ready or name == 'rng' for name in inputs):
+                    continue
+                del pending[outputs]
+                started = True
+                stage = '/'.join(outputs)
+                key, code = None, None
+                if cache is not None:
+                    key = {name: fingerprint(seed, stage) if name == 'rng' else fingerprints[name] for name in inputs}
+                    code = code_fingerprint(fn)
+                    record, reason = cache.lookup(stage, key, code) if cacheable else (None, 'always rendered')
+                    if explain is not None:
+                        explain[stage] = reason
+                    if record is not None:
+                        values.update(record['outputs'])
+                        fingerprints.update(record['digests'])
+                        ready.update(outputs)
+                        continue
+                args = [random.Random(f"{seed}/{stage}") if name == 'rng' else values[name] for name in inputs]
+                running[pool.submit(_timed, fn, args)] = (outputs, key, code, cacheable)
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        while True:
+            start_ready(pool)
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                outputs, key, code, cacheable = running.pop(future)
+                result, elapsed = future.result()
+                produced = dict(zip(outputs, result if len(outputs) > 1 else (result,)))
+                values.update(produced)
+                ready.update(outputs)
+                if timings is not None:
+                    timings['/'.join(outputs)] = elapsed
+                if cache is not None:
+                    digests = {name: value_fingerprint(value) for name, value in produced.items()}
+                    fingerprints.update(digests)
+                    if cacheable:
+                        cache.put('/'.join(outputs), key, code, produced, digests)
+
+    if pending:
+        raise ValueError(f"sections with inputs nobody makes: {', '.join('/'.join(o) for o in pending)}")
+    return values
+
+
+def iter_html(stats: dict, messages: list, word_index=None, year: int = 2025, day_index=None,
+              workers: int = 4, timings: Optional[dict] = None, seed: Optional[int] = None,
+              catalog: Optional[MediaCatalog] = None, cache: Optional[BuildCache] = None,
+              explain: Optional[dict] = None):
+    """Generate the Wrapped HTML for one year, in chunks.
+
+    The sections are rendered concurrently by render_sections(); pass a dict
+    as `timings` to get how long each one took. Each section comes out as a
+    chunk of its own instead of being copied into the page. The random picks
+    (gallery, day grids, person buttons) follow `seed`, by default the year,
+    so the same chat always gives the same page. With a BuildCache, sections
+    are reused from the last build where nothing they use changed.
+    """
+    parts = render_sections({'stats': stats, 'messages': messages, 'word_index': word_index,
+                             'year': year, 'day_index': day_index, 'seed': year if seed is None else seed,
+                             'catalog': MediaCatalog.load('media') if catalog is None else catalog},
+                            workers, timings, cache, explain)
+    stats = parts['stats']
+    persons_data, fun_facts = parts['persons_data'], parts['fun_facts']
+    msg_ranking_html, words_ranking_html = parts['msg_ranking_html'], parts['words_ranking_html']
+    carousel_html = parts['carousel_html']
+    emoji_display_html, rare_emoji_html = parts['emoji_display_html'], parts['rare_emoji_html']
+    person_buttons_html, person_details_html = parts['person_buttons_html'], parts['person_details_html']
+    calendar_html = parts['calendar_html']
+    data_ranking_html = parts['data_ranking_html']
+    total_data_mb = sum(parts['data_by_sender'].values())
+    audio_ranking_html, audio_comparison = parts['audio_ranking_html'], parts['audio_comparison']
+    day_excerpts_html, more_day_slides_html = parts['day_excerpts_html'], parts['more_day_slides_html']
     most_active_date = stats.get('most_active_date', '')
-    day_excerpts_data = get_day_excerpts(messages, most_active_date) if most_active_date else {}
-    day_excerpts_html = build_day_excerpts_html(day_excerpts_data)
 
     # Most active date formatting
-    most_active_date_formatted = ''
-    if most_active_date:
-        from datetime import datetime
-        try:
-            dt = datetime.strptime(most_active_date, '%Y-%m-%d')
-            most_active_date_formatted = dt.strftime('%d de %B').lstrip('0')
-            # Translate month
-            for en, es in MONTH_NAMES_ES.items():
-                most_active_date_formatted = most_active_date_formatted.replace(en, es)
-        except:
-            most_active_date_formatted = most_active_date
+    most_active_date_formatted = format_day_es(most_active_date) if most_active_date else ''
 
     # Get comparison texts
     words_comparison, messages_comparison, media_comparison = get_comparison_text(
@@ -883,6 +1101,9 @@ def generate_html(stats: dict, messages: list) -> str:
     # JSON data for JavaScript
     persons_json = json.dumps(persons_data, ensure_ascii=False)
     facts_json = json.dumps(fun_facts, ensure_ascii=False)
+    # Chat text goes in here, so no '</script>' may come out of it
+    media_manifest_json = json.dumps(parts['media_manifest'], ensure_ascii=False,
+                                     separators=(',', ':')).replace('</', '<\\/')
 
     # Monthly data for chart
     months_order = ['January', 'February', 'March', 'April', 'May', 'June',
@@ -901,12 +1122,12 @@ def generate_html(stats: dict, messages: list) -> str:
     total_words = f"{stats['total_words']:,}"
     num_participants = len([p for p in persons_data])
 
-    html = f'''<!DOCTYPE html>
+    yield f'''<!DOCTYPE html>
 <html lang="es">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>Familia Wrapped 2025</title>
+    <title>Familia Wrapped {year}</title>
     <link href="https://fonts.googleapis.com/css2?family=Outfit:wght@300;400;600;700;800;900&display=swap" rel="stylesheet">
     <style>
         * {{
@@ -1709,12 +1930,27 @@ def generate_html(stats: dict, messages: list) -> str:
         .media-gallery {{
             display: grid;
             grid-template-columns: repeat(10, 1fr);
-            gap: 2px;
+            --grid-gap: 2px;
+            gap: var(--grid-gap);
             max-width: 100%;
             width: 100%;
             padding: 0.5rem;
         }}
 
+        /* Lazy grids: the gallery and day grids are split into pages (each one
+           a grid of its own) that only hold their cells while near the screen */
+        .lazy-grid {{
+            width: 100%;
+        }}
+
+        .lazy-page:not(:first-child) {{
+            padding-top: var(--grid-gap);
+        }}
+
+        .lazy-page:not(:last-child) {{
+            padding-bottom: 0;
+        }}
+
         .gallery-item {{
             aspect-ratio: 1;
             border-radius: 4px;
@@ -1881,7 +2117,8 @@ def generate_html(stats: dict, messages: list) -> str:
         .day-grid {{
             display: grid;
             grid-template-columns: repeat(10, 1fr);
-            gap: 3px;
+            --grid-gap: 3px;
+            gap: var(--grid-gap);
             width: 100%;
             max-width: 100%;
             padding: 0.5rem;
@@ -1990,7 +2227,7 @@ def generate_html(stats: dict, messages: list) -> str:
     <!-- Intro Screen -->
     <div class="intro-screen" id="intro">
         <div class="intro-title">Familia WhatsApp</div>
-        <div class="intro-year">2025</div>
+        <div class="intro-year">{year}</div>
         <div class="intro-subtitle">Tu Año en Mensajes</div>
         <button class="start-btn" onclick="startWrapped()">Empezar</button>
     </div>
@@ -2032,11 +2269,11 @@ def generate_html(stats: dict, messages: list) -> str:
 
         <!-- Slide 2: Media Gallery (overwhelming) -->
         <div class="slide" style="padding: 1rem;">
-            <div class="slide-title" style="margin-bottom: 0.5rem;">Recuerdos de 2025</div>
+            <div class="slide-title" style="margin-bottom: 0.5rem;">Recuerdos de {year}</div>
             <div class="comparison-text" style="margin-bottom: 0.5rem;">{media_comparison}</div>
-            <div class="media-gallery">
-                {media_gallery_html}
-            </div>
+            '''
+    yield build_lazy_grid_html('media-gallery', 'gallery')
+    yield f'''
         </div>
 
         <!-- Slide 3: Top Writers (dual columns) -->
@@ -2046,13 +2283,17 @@ def generate_html(stats: dict, messages: list) -> str:
                 <div class="ranking-column">
                     <div class="column-title">Más Textos</div>
                     <div class="mini-ranking">
-                        {msg_ranking_html}
+                        '''
+    yield msg_ranking_html
+    yield f'''
                     </div>
                 </div>
                 <div class="ranking-column">
                     <div class="column-title">Más Palabras</div>
                     <div class="mini-ranking">
-                        {words_ranking_html}
+                        '''
+    yield words_ranking_html
+    yield f'''
                     </div>
                 </div>
             </div>
@@ -2063,7 +2304,9 @@ def generate_html(stats: dict, messages: list) -> str:
             <div class="slide-title">Los Que Más Hablaron</div>
             <div class="comparison-text" style="margin-bottom: 1rem;">{audio_comparison}</div>
             <div class="audio-ranking">
-                {audio_ranking_html}
+                '''
+    yield audio_ranking_html
+    yield f'''
             </div>
         </div>
 
@@ -2072,7 +2315,9 @@ def generate_html(stats: dict, messages: list) -> str:
             <div class="slide-title">Los Que Te Consumieron Más Datos</div>
             <div class="comparison-text" style="margin-bottom: 1rem;">Total: {total_data_mb:.1f} MB en fotos y videos</div>
             <div class="data-ranking">
-                {data_ranking_html}
+                '''
+    yield data_ranking_html
+    yield f'''
             </div>
         </div>
 
@@ -2081,7 +2326,9 @@ def generate_html(stats: dict, messages: list) -> str:
             <div class="slide-title">Datos Curiosos</div>
             <div class="carousel" id="carousel">
                 <div class="carousel-track" id="carouselTrack">
-                    {carousel_html}
+                    '''
+    yield carousel_html
+    yield f'''
                 </div>
             </div>
             <div class="carousel-dots" id="carouselDots"></div>
@@ -2093,10 +2340,12 @@ def generate_html(stats: dict, messages: list) -> str:
 
         <!-- Slide 5: Activity Calendar -->
         <div class="slide">
-            <div class="slide-title">Actividad 2025</div>
+            <div class="slide-title">Actividad {year}</div>
             <div class="calendar-container">
                 <div class="calendar-grid">
-                    {calendar_html}
+                    '''
+    yield calendar_html
+    yield f'''
                 </div>
             </div>
             <div class="chart-container" style="margin-top: 1rem;">
@@ -2114,9 +2363,13 @@ def generate_html(stats: dict, messages: list) -> str:
         <div class="slide" style="padding: 1rem;">
             <div class="slide-title">Día Más Activo: {most_active_date_formatted}</div>
             <div class="slide-subtitle">Lo que pasó ese día</div>
-            {day_excerpts_html}
+            '''
+    yield day_excerpts_html
+    yield f'''
         </div>
-
+'''
+    yield more_day_slides_html
+    yield f'''
         <!-- Slide 6: Top Words -->
         <div class="slide" style="padding-top: 1rem; padding-bottom: 1rem;">
             <div class="slide-title" style="margin-bottom: 1rem;">Palabras Más Usadas</div>
@@ -2127,11 +2380,15 @@ def generate_html(stats: dict, messages: list) -> str:
         <div class="slide">
             <div class="slide-title">Emojis Favoritos</div>
             <div class="emoji-grid">
-                {emoji_display_html}
+                '''
+    yield emoji_display_html
+    yield f'''
             </div>
             <div class="slide-title" style="margin-top: 2.5rem; font-size: 1.5rem;">Emojis Más Raros</div>
             <div class="emoji-grid">
-                {rare_emoji_html}
+                '''
+    yield rare_emoji_html
+    yield f'''
             </div>
         </div>
 
@@ -2139,22 +2396,26 @@ def generate_html(stats: dict, messages: list) -> str:
         <div class="slide">
             <div class="slide-title">Estadísticas Personales</div>
             <div class="person-selector" id="personSelector">
-                {person_buttons_html}
+                '''
+    yield person_buttons_html
+    yield f'''
             </div>
             <div id="personDetails">
-                {person_details_html}
+                '''
+    yield person_details_html
+    yield f'''
             </div>
         </div>
 
         <!-- Slide 9: Thank You -->
         <div class="slide">
-            <div class="slide-title">Gracias por un 2025 increíble!</div>
+            <div class="slide-title">Gracias por un {year} increíble!</div>
             <div class="card" style="text-align: center;">
                 <div style="font-size: 4rem; margin-bottom: 1rem;">&#10084;&#65039;</div>
                 <p style="font-size: 1.2rem; line-height: 1.6;">
                     {num_participants} miembros de la familia compartieron {total_messages} momentos juntos.
                     <br><br>
-                    Por más conversaciones en 2026!
+                    Por más conversaciones en {year + 1}!
                 </p>
             </div>
             <div class="share-section">
@@ -2164,7 +2425,7 @@ def generate_html(stats: dict, messages: list) -> str:
     </div>
 
     <div class="footer">
-        <p class="footer-text">Familia Wrapped 2025</p>
+        <p class="footer-text">Familia Wrapped {year}</p>
     </div>
 
     <!-- Confetti Container -->
@@ -2183,9 +2444,18 @@ def generate_html(stats: dict, messages: list) -> str:
     </audio>
 
     <script>
-        const personsData = {persons_json};
-        const factsData = {facts_json};
-        const monthlyData = {monthly_json};
+        const personsData = '''
+    yield persons_json
+    yield f''';
+        const factsData = '''
+    yield facts_json
+    yield f''';
+        const monthlyData = '''
+    yield monthly_json
+    yield f''';
+        const mediaManifest = '''
+    yield media_manifest_json
+    yield f''';
         const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
 
         let currentSlide = 0;
@@ -2208,6 +2478,7 @@ def generate_html(stats: dict, messages: list) -> str:
         document.addEventListener('DOMContentLoaded', function() {{
             initCarousel();
             initMonthlyChart();
+            initLazyGrids();
 
             // Hide scroll indicator after scrolling
             window.addEventListener('scroll', function() {{
@@ -2367,8 +2638,8 @@ def generate_html(stats: dict, messages: list) -> str:
         function shareWrapped() {{
             if (navigator.share) {{
                 navigator.share({{
-                    title: 'Familia Wrapped 2025',
-                    text: 'Mirá nuestro Wrapped de WhatsApp familiar 2025!',
+                    title: 'Familia Wrapped {year}',
+                    text: 'Mirá nuestro Wrapped de WhatsApp familiar {year}!',
                     url: window.location.href
                 }});
             }} else {{
@@ -2376,6 +2647,167 @@ def generate_html(stats: dict, messages: list) -> str:
             }}
         }}
 
+        // Lazy grids: cells come from mediaManifest and are only in the DOM
+        // while their page is within a screen of the viewport; videos only
+        // play while they are on screen
+        var LAZY_PAGE_ROWS = 4;
+        var lazyGrids = [];
+        var hasObserver = 'IntersectionObserver' in window;
+
+        var videoObserver = hasObserver ? new IntersectionObserver(function(entries) {{
+            entries.forEach(function(entry) {{
+                if (entry.isIntersecting) {{
+                    entry.target.play().catch(function() {{}});
+                }} else {{
+                    entry.target.pause();
+                }}
+            }});
+        }}) : null;
+
+        var pageObserver = hasObserver ? new IntersectionObserver(function(entries) {{
+            entries.forEach(function(entry) {{
+                if (entry.isIntersecting) {{
+                    fillPage(entry.target);
+                }} else {{
+                    emptyPage(entry.target);
+                }}
+            }});
+        }}, {{ rootMargin: '100% 0px' }}) : null;
+
+        function makeGridCell(item, gridClass) {{
+            var cell = document.createElement('div');
+            if (item[0] === 't') {{
+                cell.className = 'day-grid-item text-item';
+                cell.title = item[3];
+                var sender = document.createElement('span');
+                sender.className = 'grid-sender';
+                sender.textContent = item[1];
+                var content = document.createElement('span');
+                content.className = 'grid-content';
+                content.textContent = item[2];
+                cell.appendChild(sender);
+                cell.appendChild(content);
+                return cell;
+            }}
+
+            cell.className = gridClass === 'day-grid' ? 'day-grid-item media-item' : 'gallery-item';
+            cell.onclick = function() {{ openMedia(item[2]); }};
+            var media;
+            if (item[0] === 'v') {{
+                media = document.createElement('video');
+                media.muted = true;
+                media.loop = true;
+                media.playsInline = true;
+                media.preload = 'none';
+                if (item[3]) media.poster = item[3];
+                media.src = item[1];
+                if (videoObserver) {{
+                    videoObserver.observe(media);
+                }} else {{
+                    media.autoplay = true;
+                }}
+            }} else {{
+                media = document.createElement('img');
+                media.alt = '';
+                media.decoding = 'async';
+                media.src = item[1];
+            }}
+            cell.appendChild(media);
+            return cell;
+        }}
+
+        function fillPage(page) {{
+            if (page.filled) return;
+            var cells = document.createDocumentFragment();
+            page.items.forEach(function(item) {{
+                cells.appendChild(makeGridCell(item, page.gridClass));
+            }});
+            page.appendChild(cells);
+            page.style.height = '';
+            page.filled = true;
+        }}
+
+        function emptyPage(page) {{
+            if (!page.filled) return;
+            page.style.height = page.offsetHeight + 'px';
+            page.querySelectorAll('video').forEach(function(video) {{
+                if (videoObserver) videoObserver.unobserve(video);
+                // Let go of the decoder, not just the element
+                video.removeAttribute('src');
+                video.load();
+            }});
+            page.textContent = '';
+            page.filled = false;
+        }}
+
+        function gridColumns(page) {{
+            return getComputedStyle(page).gridTemplateColumns.split(' ').length;
+        }}
+
+        function estimatePageHeight(page) {{
+            // Cells are square, so an empty page's height follows from its width
+            var style = getComputedStyle(page);
+            var cols = gridColumns(page);
+            var gap = parseFloat(style.rowGap) || 0;
+            var width = page.clientWidth - parseFloat(style.paddingLeft) - parseFloat(style.paddingRight);
+            var rows = Math.ceil(page.items.length / cols);
+            var cell = (width - gap * (cols - 1)) / cols;
+            page.style.height = (rows * cell + (rows - 1) * gap +
+                                 parseFloat(style.paddingTop) + parseFloat(style.paddingBottom)) + 'px';
+        }}
+
+        function newPage(grid) {{
+            var page = document.createElement('div');
+            page.className = grid.dataset.grid + ' lazy-page';
+            page.gridClass = grid.dataset.grid;
+            grid.appendChild(page);
+            return page;
+        }}
+
+        function layoutGrid(grid) {{
+            // Pages hold whole rows, so the column count sets the page size
+            Array.prototype.forEach.call(grid.children, function(page) {{
+                emptyPage(page);
+                if (pageObserver) pageObserver.unobserve(page);
+            }});
+            grid.textContent = '';
+            var items = mediaManifest[grid.dataset.items] || [];
+            if (!items.length) return;
+
+            var cols = gridColumns(newPage(grid));
+            grid.columns = cols;
+            grid.textContent = '';
+            var pageSize = cols * LAZY_PAGE_ROWS;
+            for (var i = 0; i < items.length; i += pageSize) {{
+                var page = newPage(grid);
+                page.items = items.slice(i, i + pageSize);
+                if (pageObserver) {{
+                    estimatePageHeight(page);
+                    pageObserver.observe(page);
+                }} else {{
+                    fillPage(page);
+                }}
+            }}
+        }}
+
+        function initLazyGrids() {{
+            lazyGrids = Array.prototype.slice.call(document.querySelectorAll('.lazy-grid'));
+            lazyGrids.forEach(layoutGrid);
+
+            window.addEventListener('resize', function() {{
+                lazyGrids.forEach(function(grid) {{
+                    if (!grid.firstChild) return;
+                    if (gridColumns(grid.firstChild) !== grid.columns) {{
+                        layoutGrid(grid);
+                        return;
+                    }}
+                    Array.prototype.forEach.call(grid.children, function(page) {{
+                        if (!page.filled) estimatePageHeight(page);
+                    }});
+                }});
+            }});
+        }}
+
         function openMedia(src) {{
             var lightbox = document.getElementById('lightbox');
             var img = document.getElementById('lightbox-img');
@@ -2418,35 +2850,162 @@ def generate_html(stats: dict, messages: list) -> str:
 </body>
 </html>'''
 
-    return html
 
+def generate_html(stats: dict, messages: list, word_index=None, year: int = 2025, day_index=None,
+                  workers: int = 4, timings: Optional[dict] = None, seed: Optional[int] = None) -> str:
+    """Generate the Wrapped HTML for one year as one string."""
+    return ''.join(iter_html(stats, messages, word_index, year, day_index, workers, timings, seed))
 
-def main():
-    import sys
 
-    chat_file = sys.argv[1] if len(sys.argv) > 1 else 'chats.txt'
-    output_file = sys.argv[2] if len(sys.argv) > 2 else 'index.html'
+def write_html(output_file: str, stats: dict, messages: list, word_index=None, year: int = 2025, day_index=None,
+               workers: int = 4, timings: Optional[dict] = None, seed: Optional[int] = None,
+               catalog: Optional[MediaCatalog] = None, cache: Optional[BuildCache] = None,
+               explain: Optional[dict] = None) -> bool:
+    """Write the Wrapped HTML for one year chunk by chunk, never holding the
+    whole page. An unchanged page is left alone; returns whether it was written."""
+    return write_if_changed(output_file, iter_html(stats, messages, word_index, year, day_index, workers,
+                                                   timings, seed, catalog, cache, explain))
 
-    print("Parsing WhatsApp chat...")
-    messages, stats_obj = parse_whatsapp_chat(chat_file, year_filter=2025)
-    stats = stats_to_dict(stats_obj)
 
-    print(f"   Found {stats['total_messages']:,} messages in 2025")
-    print(f"   {len(stats['messages_by_sender'])} participants")
+class ParsedChat:
+    """The chat parse for a build, run the first time something needs it."""
+
+    def __init__(self, chat_file: str, year: Optional[int], catalog: MediaCatalog):
+        self.chat_file = chat_file
+        self.year = year
+        # The parse also looks at the media folder (audio durations)
+        self.inputs = dict(export_fingerprint(chat_file, year), media=value_fingerprint(catalog.files))
+        self.fingerprint = fingerprint(sorted(self.inputs.items()))
+        self.cache = BuildCache(prefix=f'parse/{year}')
+        self.reason = self.cache.lookup('parse', self.inputs)[1]
+        self.result = None
+
+    def load(self):
+        if self.result is None:
+            if self.year is None:
+                self.result = cached_parse_whatsapp_years(self.chat_file)
+            else:
+                self.result = cached_parse_whatsapp_chat(self.chat_file, year_filter=self.year)
+            self.cache.put('parse', self.inputs, '', {}, {})
+        return self.result
+
+    def explain(self) -> Optional[str]:
+        """Why the chat was parsed, or None if nothing needed it."""
+        if self.result is None:
+            return None
+        return self.reason or 'needed by a rebuilt stage'
+
+    def lazy(self, name: str, load) -> Lazy:
+        """A Lazy input for one of the parse's results."""
+        return Lazy(fingerprint(self.fingerprint, name), load)
+
 
-    print("\nGenerating Wrapped 2025...")
-    html = generate_html(stats, messages)
+def cached_stage(cache: BuildCache, stage: str, inputs: dict, fn, *args, explain: Optional[dict] = None):
+    """fn(*args) for a stage outside the section graph, reused while `inputs` and fn's code are unchanged.
 
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html)
+    `args` are callables, called only if the stage has to run.
+    """
+    code = code_fingerprint(fn)
+    record, reason = cache.lookup(stage, inputs, code)
+    if explain is not None:
+        explain[stage] = reason
+    if record is not None:
+        return record['outputs'][stage]
+    value = fn(*(arg() for arg in args))
+    cache.put(stage, inputs, code, {stage: value}, {stage: value_fingerprint(value)})
+    return value
+
+
+def print_explain(explain: dict):
+    """Print why each stage was rebuilt, or that it was up to date."""
+    for stage, reason in explain.items():
+        print(f"   {stage:<40} {'up to date' if reason is None else 'rebuilt: ' + reason}")
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description='Generate the family WhatsApp Wrapped page')
+    ap.add_argument('chat_file', nargs='?', default='chats.txt')
+    ap.add_argument('output_file', nargs='?', default='index.html')
+    ap.add_argument('--year', type=int, default=2025, help='year to build the page for')
+    ap.add_argument('--all-years', action='store_true',
+                    help='parse once and write one page per year (index_<year>.html) plus all-time stats')
+    ap.add_argument('--seed', type=int,
+                    help='seed for the random photos and messages shown (default: the year, so reruns match)')
+    ap.add_argument('--explain', action='store_true', help='print why each stage was rebuilt or reused')
+    args = ap.parse_args()
+
+    # Every stage (parse, stats, each section) is reused from .build_cache/
+    # while its inputs and code are unchanged; the chat is only parsed if a
+    # stage that needs it has to run
+    print("Parsing WhatsApp chat...")
+    catalog = MediaCatalog.load('media')
+    if not args.all_years:
+        parsed = ParsedChat(args.chat_file, args.year, catalog)
+        write_year(args.year, parsed, lambda: parsed.load()[0], lambda: parsed.load()[1], args.output_file,
+                   args.seed, catalog, args.explain)
+        if args.explain:
+            print_explain({'parse': parsed.explain()})
+        return
+
+    parsed = ParsedChat(args.chat_file, None, catalog)
+    cache = BuildCache(prefix='all')
+    explain = {} if args.explain else None
+    inputs = {'chat': parsed.fingerprint}
+    years = cached_stage(cache, 'years', inputs, lambda result: sorted(result[1]), parsed.load, explain=explain)
+    all_time = cached_stage(cache, 'stats', inputs, stats_to_dict, lambda: parsed.load()[2], explain=explain)
+    if explain is not None:
+        print_explain(explain)
+
+    by_year = {}
+
+    def messages_of(year):
+        if not by_year:
+            by_year.update(split_by_year(parsed.load()[0]))
+        return by_year[year]
+
+    stem, ext = os.path.splitext(args.output_file)
+    for year in years:
+        write_year(year, parsed, lambda year=year: messages_of(year), lambda year=year: parsed.load()[1][year],
+                   f'{stem}_{year}{ext}', args.seed, catalog, args.explain)
+
+    write_if_changed('stats_all_time.json', [json.dumps(all_time, ensure_ascii=False, indent=2)])
+    print(f"\nAll-time stats ({all_time['total_messages']:,} messages) saved to stats_all_time.json")
+    if args.explain:
+        print_explain({'parse': parsed.explain()})
+
+
+def write_year(year, parsed, load_messages, load_stats, output_file, seed=None, catalog=None, explain=False):
+    """Write one year's page and its stats_<year>.json, reusing what the last build of them can."""
+    cache = BuildCache(prefix=str(year))
+    reasons = {} if explain else None
+    stats = cached_stage(cache, 'stats', {'chat': parsed.fingerprint}, stats_to_dict, load_stats, explain=reasons)
+
+    print(f"   Found {stats['total_messages']:,} messages in {year}")
+    print(f"   {len(stats['messages_by_sender'])} participants")
 
-    print(f"\nGenerated {output_file}")
-    print(f"   Open in a browser to view your Family Wrapped 2025!")
+    print(f"\nGenerating Wrapped {year}...")
+    timings = {}
+    start = time.perf_counter()
+    written = write_html(output_file, stats, parsed.lazy(f'messages/{year}', load_messages),
+                         parsed.lazy(f'word_index/{year}', lambda: load_stats().word_index), year,
+                         parsed.lazy(f'day_index/{year}', lambda: load_stats().day_index),
+                         timings=timings, seed=seed, catalog=catalog, cache=cache, explain=reasons)
+    slowest = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in top_counts(timings, 3).items())
+    reused = len(SECTIONS) - len(timings)
+    print(f"   Rendered {len(timings)} sections ({reused} reused) in {time.perf_counter() - start:.2f}s"
+          + (f" (slowest: {slowest})" if slowest else ''))
+    if reasons is not None:
+        print_explain(reasons)
+
+    print(f"\n{'Generated' if written else 'Up to date:'} {output_file}")
+    print(f"   Open in a browser to view your Family Wrapped {year}!")
 
     # Also save stats for reference
-    with open('stats_2025.json', 'w', encoding='utf-8') as f:
-        json.dump(stats, f, ensure_ascii=False, indent=2)
-    print(f"   Stats saved to stats_2025.json")
+    stats_file = f'stats_{year}.json'
+    write_if_changed(stats_file, [json.dumps(stats, ensure_ascii=False, indent=2)])
+    print(f"   Stats saved to {stats_file}")
 
 
 if __name__ == '__main__':
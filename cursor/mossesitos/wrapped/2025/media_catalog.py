@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Catalog of the media folder for Wrapped 2025.
+
+One os.scandir pass records the name, size, mtime and kind of every file, and
+everything else (MB per person, audio durations, thumbnails, which photos the
+gallery can show) looks files up in it instead of asking the file system
+about each one. The catalog is saved in the media folder and reused as long
+as the folder's own mtime hasn't changed, which it does whenever a file is
+added, removed or renamed. A file rewritten in place doesn't change it, so
+whatever reads a file's contents (audio durations, thumbnails) asks for
+fresh() instead, which stats that one file again.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+CATALOG_FILE = '.catalog.json'
+
+# File name prefixes WhatsApp gives each kind of media
+KINDS = {'IMG': 'image', 'VID': 'video', 'AUD': 'audio', 'PTT': 'audio'}
+
+
+class MediaFile(NamedTuple):
+    size: int
+    mtime_ns: int
+    kind: str  # image, video, audio or other
+
+
+def media_kind(filename: str) -> str:
+    return KINDS.get(filename[:3], 'other')
+
+
+class MediaCatalog:
+    """What's in the media folder, by file name."""
+
+    # Build fingerprints go by the files; the folder's mtime only says when to rescan
+    __fingerprint_fields__ = ('media_folder', 'files')
+
+    def __init__(self, media_folder: str = 'media', files: Optional[Dict[str, MediaFile]] = None,
+                 folder_mtime_ns: int = 0):
+        self.media_folder = media_folder
+        self.files = files if files is not None else {}
+        self.folder_mtime_ns = folder_mtime_ns
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, filename):
+        return filename in self.files
+
+    def get(self, filename: str) -> Optional[MediaFile]:
+        return self.files.get(filename)
+
+    def size(self, filename: str) -> int:
+        """Size in bytes; 0 for a file that isn't there."""
+        entry = self.files.get(filename)
+        return entry.size if entry else 0
+
+    def fresh(self, filename: str) -> Optional[MediaFile]:
+        """The file's entry as it is on disk now, updating (and saving) the catalog if it changed."""
+        try:
+            st = os.stat(os.path.join(self.media_folder, filename))
+            entry = MediaFile(st.st_size, st.st_mtime_ns, media_kind(filename))
+        except OSError:
+            entry = None
+        if entry != self.files.get(filename):
+            if entry is None:
+                self.files.pop(filename, None)
+            else:
+                self.files[filename] = entry
+            self.save()
+        return entry
+
+    def present(self, filenames: Iterable[str]) -> List[str]:
+        """The given files that are in the folder, in the same order."""
+        files = self.files
+        return [filename for filename in filenames if filename in files]
+
+    @classmethod
+    def scan(cls, media_folder: str = 'media') -> 'MediaCatalog':
+        """Walk the folder once. A missing folder gives an empty catalog."""
+        files = {}
+        try:
+            folder_mtime_ns = os.stat(media_folder).st_mtime_ns
+            with os.scandir(media_folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.') or not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    files[entry.name] = MediaFile(st.st_size, st.st_mtime_ns, media_kind(entry.name))
+        except OSError:
+            return cls(media_folder)
+        return cls(media_folder, files, folder_mtime_ns)
+
+    @classmethod
+    def load(cls, media_folder: str = 'media', refresh: bool = False) -> 'MediaCatalog':
+        """The saved catalog if the folder hasn't changed since, else a fresh scan (saved for next time)."""
+        path = os.path.join(media_folder, CATALOG_FILE)
+        try:
+            folder_mtime_ns = os.stat(media_folder).st_mtime_ns
+        except OSError:
+            return cls(media_folder)
+
+        if not refresh:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    saved = json.load(f)
+                if saved['folder_mtime_ns'] == folder_mtime_ns:
+                    files = {name: MediaFile(*entry) for name, entry in saved['files'].items()}
+                    return cls(media_folder, files, folder_mtime_ns)
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        catalog = cls.scan(media_folder)
+        catalog.save()
+        return catalog
+
+    def save(self):
+        """Write the catalog into the media folder, if it exists."""
+        path = os.path.join(self.media_folder, CATALOG_FILE)
+        try:
+            # Creating the file changes the folder's mtime, rewriting it doesn't,
+            # so the saved mtime is taken after it exists
+            if not os.path.exists(path):
+                open(path, 'a').close()
+            self.folder_mtime_ns = os.stat(self.media_folder).st_mtime_ns
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'folder_mtime_ns': self.folder_mtime_ns,
+                           'files': {name: list(entry) for name, entry in self.files.items()}}, f)
+        except OSError:
+            pass
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description='Rescan the media folder and save its catalog')
+    ap.add_argument('media_folder', nargs='?', default='media')
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    catalog = MediaCatalog.load(args.media_folder, refresh=True)
+    by_kind = {}
+    for entry in catalog.files.values():
+        count, size = by_kind.get(entry.kind, (0, 0))
+        by_kind[entry.kind] = (count + 1, size + entry.size)
+    print(f"{len(catalog):,} files in {args.media_folder} ({time.perf_counter() - start:.2f}s)")
+    for kind, (count, size) in sorted(by_kind.items()):
+        print(f"  {kind:<6} {count:6,}  {size / (1024 * 1024):9.1f} MB")
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of parsed chats for Wrapped 2025.
+
+WhatsApp exports only ever grow at the end, so the parse state (and, for
+generate_wrapped, the messages) is saved up to the start of the last message.
+The next run checks the export still starts the same way and only parses what
+came after that point, merging it into the saved state.
+"""
+
+import hashlib
+import os
+import pickle
+from typing import Dict, List, Optional
+
+import parse_chat
+import topk
+from parse_chat import (
+    ChatStats, Message, StatsAccumulator, YearlyAccumulator, accumulate_parallel,
+    detect_day_first, iter_range_messages, last_header_offset,
+)
+
+CACHE_DIR = '.parse_cache'
+
+# Bytes hashed at the start of the export, and just before the saved offset
+HEAD_BYTES = 64 * 1024
+SEAM_BYTES = 4 * 1024
+
+
+def _hash_range(file_path: str, start: int, end: int) -> str:
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(end - start)).hexdigest()
+
+
+def _parser_version() -> str:
+    """Hash of the parser's source, so a parser change drops old caches."""
+    digest = hashlib.sha1()
+    for module in (parse_chat, topk):
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def export_fingerprint(file_path: str, year_filter: Optional[int]) -> Dict[str, str]:
+    """What a parse of this export depends on, for build records: the export
+    (path, size, mtime, year) and the parser's version. Cheap, nothing is read."""
+    st = os.stat(file_path)
+    chat = f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}|{year_filter}"
+    return {'chat': hashlib.sha1(chat.encode('utf-8')).hexdigest(), 'parser': _parser_version()}
+
+
+def _cache_path(file_path: str, year_filter: Optional[int], media_folder: str, keep_messages: bool,
+                word_sketch: Optional[int]) -> str:
+    """Cache file for one (export, year, media folder, messages kept, sketch) combination."""
+    file_path = os.path.abspath(file_path)
+    key = f"{file_path}|{year_filter}|{os.path.abspath(media_folder)}|{keep_messages}|{word_sketch}"
+    name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.pickle'
+    return os.path.join(os.path.dirname(file_path), CACHE_DIR, name)
+
+
+def _load_entry(cache_path: str, file_path: str, size: int) -> Optional[dict]:
+    """Load a cache entry if it still describes the start of this export."""
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+    if entry.get('version') != _parser_version() or size < entry['size']:
+        return None
+    if _hash_range(file_path, 0, min(HEAD_BYTES, entry['size'])) != entry['head_hash']:
+        return None
+    offset = entry['offset']
+    if _hash_range(file_path, max(0, offset - SEAM_BYTES), offset) != entry['seam_hash']:
+        return None
+    return entry
+
+
+def _save_entry(cache_path: str, entry: dict):
+    """Write a cache entry atomically."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+
+
+def _parse_cached(file_path: str, year_filter: Optional[int], media_folder: str, keep_messages: bool,
+                  workers: int, word_sketch: Optional[int] = None):
+    """Parse the export, reusing and refreshing the cache.
+
+    Returns the messages (if kept) and what the accumulator's finish() gives:
+    a ChatStats, or with year_filter=None, the ChatStats per year and all-time.
+    """
+    new_accumulator = StatsAccumulator if year_filter is not None else YearlyAccumulator
+    size = os.path.getsize(file_path)
+    cache_path = _cache_path(file_path, year_filter, media_folder, keep_messages, word_sketch)
+    entry = _load_entry(cache_path, file_path, size)
+
+    if entry:
+        acc, messages, offset, day_first = entry['acc'], entry['messages'], entry['offset'], entry['day_first']
+    else:
+        acc, messages, offset = new_accumulator(media_folder, word_sketch), [] if keep_messages else None, 0
+        day_first = detect_day_first(file_path)
+
+    # The last message may still grow, so only cache up to its header
+    seam = last_header_offset(file_path, offset)
+    if seam is None:
+        seam = offset
+
+    def parse_range(start, end):
+        if workers > 1 and not keep_messages and year_filter is not None:
+            return accumulate_parallel(file_path, start, end, year_filter, media_folder, day_first, workers,
+                                       word_sketch)
+        part = new_accumulator(media_folder, word_sketch)
+        for msg in iter_range_messages(file_path, start, end, year_filter, day_first):
+            part.add(msg)
+            if keep_messages:
+                msg.words = None
+                messages.append(msg)
+        return part
+
+    if seam > offset:
+        acc.merge(parse_range(offset, seam))
+        # Conversation sessions are cached too, so only new rows get cut
+        acc.segment()
+        _save_entry(cache_path, {
+            'version': _parser_version(),
+            'size': seam,
+            'head_hash': _hash_range(file_path, 0, min(HEAD_BYTES, seam)),
+            'seam_hash': _hash_range(file_path, max(0, seam - SEAM_BYTES), seam),
+            'offset': seam,
+            'day_first': day_first,
+            'acc': acc,
+            'messages': messages,
+        })
+
+    acc.merge(parse_range(seam, size))
+    return messages, acc.finish()
+
+
+def cached_compute_stats(file_path: str, year_filter: int = 2025, media_folder: str = 'media',
+                         workers: int = 1, word_sketch: Optional[int] = None) -> ChatStats:
+    """compute_stats, but only parsing what was appended since the last run."""
+    return _parse_cached(file_path, year_filter, media_folder, False, workers, word_sketch)[1]
+
+
+def cached_parse_whatsapp_chat(file_path: str, year_filter: int = 2025,
+                               media_folder: str = 'media') -> tuple[List[Message], ChatStats]:
+    """parse_whatsapp_chat, but only parsing what was appended since the last run."""
+    return _parse_cached(file_path, year_filter, media_folder, True, 1)
+
+
+def cached_parse_whatsapp_years(file_path: str, media_folder: str = 'media') -> tuple[List[Message], Dict[int, ChatStats], ChatStats]:
+    """parse_whatsapp_years, but only parsing what was appended since the last run."""
+    messages, (by_year, all_time) = _parse_cached(file_path, None, media_folder, True, 1)
+    return messages, by_year, all_time
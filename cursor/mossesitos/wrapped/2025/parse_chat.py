@@ -4,12 +4,27 @@ WhatsApp Chat Parser for Wrapped 2025
 Parses WhatsApp exported chat files and extracts message data.
 """
 
+import bisect
+import functools
+import io
+import itertools
+import math
+import mmap
+import os
+import pickle
 import re
-from datetime import datetime
-from collections import defaultdict
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from collections import Counter, defaultdict
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 import json
+from operator import itemgetter
+
+from media_catalog import MediaCatalog
+from topk import SpaceSaving, bottom_counts, top_counts, top_n
+
 
 @dataclass
 class Message:
@@ -22,6 +37,8 @@ class Message:
     has_link: bool = False
     word_count: int = 0
     media_filename: str = None
+    words: List[str] = field(default=None, repr=False, compare=False)  # Counted words, lowercased
+    emojis: str = field(default='', repr=False, compare=False)  # Every emoji character, in order
 
 @dataclass
 class ChatStats:
@@ -45,15 +62,15 @@ class ChatStats:
     emoji_by_sender: Dict[str, int] = field(default_factory=dict)
     links_by_sender: Dict[str, int] = field(default_factory=dict)
     avg_message_length: Dict[str, float] = field(default_factory=dict)
-    response_times: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
-    streaks: Dict[str, int] = field(default_factory=dict)
+    response_times: Dict[str, 'LatencyHistogram'] = field(default_factory=dict)  # Reply latency per person
+    streaks: Dict[str, int] = field(default_factory=dict)  # Longest run of consecutive active days per person
     most_active_day: str = ""
     most_active_hour: int = 0
     conversation_starters: Dict[str, int] = field(default_factory=dict)
     night_owls: Dict[str, int] = field(default_factory=dict)  # Messages between 12am-5am
     early_birds: Dict[str, int] = field(default_factory=dict)  # Messages between 5am-8am
     deleted_by_sender: Dict[str, int] = field(default_factory=dict)  # "This message was deleted" count
-    media_files: List[str] = field(default_factory=list)  # List of media filenames from 2025
+    media_files: List[str] = field(default_factory=list)  # Photo/video filenames from the message's year
     messages_by_date: Dict[str, int] = field(default_factory=dict)  # Messages per day (YYYY-MM-DD format)
     media_files_by_sender: Dict[str, List[str]] = field(default_factory=dict)  # Media files per person
     most_active_date: str = ""  # Most active single day
@@ -65,6 +82,12 @@ class ChatStats:
     peak_hour_datetime: str = ""  # Single hour with most messages (YYYY-MM-DD HH)
     unique_words_by_person: Dict[str, List[str]] = field(default_factory=dict)  # Words only this person uses
     longest_conversation: Dict = field(default_factory=dict)  # Info about longest conversation
+    conversations_by_size: Dict[str, int] = field(default_factory=dict)  # Conversations by message count
+    current_streaks: Dict[str, int] = field(default_factory=dict)  # Active days in a row up to the last day
+    active_days_by_sender: Dict[str, int] = field(default_factory=dict)  # Days with at least one message
+    activity: Optional['ActivityIndex'] = None  # Per-person day bitmaps for the year
+    day_index: Dict[str, tuple] = field(default_factory=dict)  # YYYY-MM-DD -> (start, end) rows of its messages
+    word_index: Optional['WordIndex'] = None  # Every word -> per-person counts (not exported)
 
 # Name mappings (WhatsApp name -> Display name)
 NAME_MAPPINGS = {
@@ -134,8 +157,8 @@ STOP_WORDS = {
     'sharing', 'shared'
 }
 
-def get_audio_duration(filepath: str) -> float:
-    """Get audio file duration in seconds using mutagen."""
+def get_audio_duration(filepath: str) -> Optional[float]:
+    """Get audio file duration in seconds using mutagen, or None if it can't be read."""
     try:
         from mutagen import File
         audio = File(filepath)
@@ -143,278 +166,1111 @@ def get_audio_duration(filepath: str) -> float:
             return audio.info.length
     except Exception:
         pass
-    return 0.0
+    return None
 
 
-def parse_whatsapp_chat(file_path: str, year_filter: int = 2025, media_folder: str = 'media') -> tuple[List[Message], ChatStats]:
-    """Parse WhatsApp chat export file and return messages and stats."""
+# Sidecar cache of audio durations, kept inside the media folder
+AUDIO_CACHE_FILE = '.audio_durations.json'
 
-    messages = []
-    stats = ChatStats()
-
-    # WhatsApp message pattern: M/D/YY, H:MM AM/PM - Sender: Message
-    message_pattern = re.compile(
-        r'^(\d{1,2}/\d{1,2}/\d{2,4}),?\s+(\d{1,2}:\d{2})\s*(AM|PM|am|pm)?\s*-\s*([^:]+):\s*(.*)$'
-    )
-
-    # Emoji pattern (simplified)
-    emoji_pattern = re.compile(
-        r'[\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF'
-        r'\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF'
-        r'\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF'
-        r'\U00002702-\U000027B0\U0001F1E0-\U0001F1FF]+'
-    )
-
-    # URL pattern
-    url_pattern = re.compile(r'https?://\S+|www\.\S+')
-
-    word_counts = defaultdict(int)
-    emoji_counts = defaultdict(int)
-    words_by_person = defaultdict(lambda: defaultdict(int))  # person -> word -> count
-    current_message = None
 
+def probe_audio_durations(filenames: List[str], media_folder: str = 'media', workers: int = 8,
+                          catalog: Optional[MediaCatalog] = None) -> Dict[str, float]:
+    """Get the duration of every audio file, probing uncached ones in a thread pool.
+
+    Durations are cached in media_folder/.audio_durations.json keyed by file
+    name, size and mtime (as catalog.fresh() finds them), so later runs only open
+    new or changed files. Missing files and files that couldn't be probed count
+    as 0 seconds; failed probes aren't cached, so they are retried next run.
+    """
+    if catalog is None:
+        catalog = MediaCatalog.load(media_folder)
+    cache_path = os.path.join(media_folder, AUDIO_CACHE_FILE)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    durations = {}
+    to_probe = {}  # filename -> [size, mtime_ns]
+    for filename in dict.fromkeys(filenames):
+        entry = catalog.fresh(filename)
+        if entry is None:
+            durations[filename] = 0.0
+            continue
+        key = [entry.size, entry.mtime_ns]
+        cached = cache.get(filename)
+        # A cached 0 is most likely a failed probe from before they were skipped
+        if cached and cached[:2] == key and cached[2]:
+            durations[filename] = cached[2]
+        else:
+            to_probe[filename] = key
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            paths = [os.path.join(media_folder, filename) for filename in to_probe]
+            for (filename, key), duration in zip(to_probe.items(), pool.map(get_audio_duration, paths)):
+                if duration is None:
+                    durations[filename] = 0.0
+                    cache.pop(filename, None)
+                else:
+                    durations[filename] = duration
+                    cache[filename] = key + [duration]
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    return durations
+
+
+# WhatsApp message pattern: M/D/YY, H:MM AM/PM - Sender: Message
+MESSAGE_PATTERN = re.compile(
+    r'^(\d{1,2}/\d{1,2}/\d{2,4}),?\s+(\d{1,2}:\d{2})\s*(AM|PM|am|pm)?\s*-\s*([^:]+):\s*(.*)$'
+)
+
+# Emoji characters (simplified)
+EMOJI_CHARS = (
+    r'\U0001F600-\U0001F64F\U0001F300-\U0001F5FF\U0001F680-\U0001F6FF'
+    r'\U0001F700-\U0001F77F\U0001F780-\U0001F7FF\U0001F800-\U0001F8FF'
+    r'\U0001F900-\U0001F9FF\U0001FA00-\U0001FA6F\U0001FA70-\U0001FAFF'
+    r'\U00002702-\U000027B0\U0001F1E0-\U0001F1FF'
+)
+
+# Everything we look for in a message body, in one pattern. Alternatives are
+# tried in order at each position: links first, so their pieces (fbclid, utm,
+# ...) never reach the word stream, then WhatsApp's deleted/media markers,
+# emoji runs, and finally plain words.
+TOKEN_PATTERN = re.compile(
+    r'(?P<url>https?://\S+|www\.\S+)'
+    r'|(?P<deleted>this message was deleted)'
+    r'|(?P<media>\(file attached\)|\bomitted\b)'
+    rf'|(?P<emoji>[{EMOJI_CHARS}]+)'
+    r'|(?P<word>\b\w+\b)'
+)
+
+# Flag bits for messages (see tokenize_into and MessageTable.flags)
+FLAG_MEDIA = 1
+FLAG_DELETED = 2
+FLAG_LINK = 4
+FLAG_EMOJI = 8
+
+_TOKEN_FLAGS = {'url': FLAG_LINK, 'deleted': FLAG_DELETED, 'media': FLAG_MEDIA}
+
+# Words inside a link stay out of the rankings but still count toward a
+# message's length, as they always have
+LINK_WORD_PATTERN = re.compile(r'\b\w+\b')
+
+
+def tokenize(text: str) -> List[tuple]:
+    """Split message text into (kind, token) pairs: word, emoji, url, media or deleted."""
+    return [(m.lastgroup, m.group()) for m in TOKEN_PATTERN.finditer(text.lower())]
+
+
+def tokenize_into(text: str, words: List[str], emojis: List[str]) -> Tuple[int, int]:
+    """Scan one line of a message once, appending its words and emoji runs.
+
+    Returns the FLAG_* bits for the links, markers and emojis it contains,
+    and how many words its links hold (counted in word_count, not in words).
+    """
+    flags = 0
+    link_words = 0
+    for m in TOKEN_PATTERN.finditer(text.lower()):
+        kind = m.lastgroup
+        if kind == 'word':
+            words.append(m.group())
+        elif kind == 'emoji':
+            emojis.append(m.group())
+            flags |= FLAG_EMOJI
+        else:
+            if kind == 'url':
+                link_words += len(LINK_WORD_PATTERN.findall(m.group()))
+            flags |= _TOKEN_FLAGS[kind]
+    return flags, link_words
+
+
+class TimestampDecoder:
+    """Build message timestamps straight from the header's date/time groups.
+
+    Replaces a datetime.strptime call per line. A family chat has thousands of
+    messages per day and only 1,440 distinct minutes, so dates and times are
+    each decoded once and then looked up. Malformed dates raise ValueError,
+    like strptime does.
+    """
+
+    def __init__(self, day_first: bool = False):
+        self.day_first = day_first
+        self._dates = {}  # date string -> date (None if invalid)
+        self._times = {}  # (time string, AM/PM) -> (hour, minute) (None if invalid)
+
+    def _decode_date(self, date_str: str) -> Optional[date]:
+        first, second, year = date_str.split('/')
+        month, day = (second, first) if self.day_first else (first, second)
+        if len(year) == 2:
+            # Same pivot as strptime's %y
+            year = int(year) + (2000 if int(year) < 69 else 1900)
+        elif len(year) == 4:
+            year = int(year)
+        else:
+            return None
+        try:
+            return date(year, int(month), int(day))
+        except ValueError:
+            return None
+
+    def _decode_time(self, time_str: str, ampm: Optional[str]) -> Optional[tuple]:
+        hour, minute = time_str.split(':')
+        hour, minute = int(hour), int(minute)
+        if minute > 59:
+            return None
+        if ampm:
+            if not 1 <= hour <= 12:
+                return None
+            hour %= 12
+            if ampm.upper() == 'PM':
+                hour += 12
+        elif hour > 23:
+            return None
+        return hour, minute
+
+    def decode(self, date_str: str, time_str: str, ampm: Optional[str]) -> datetime:
+        """Return the timestamp for one header's date, time and AM/PM groups."""
+        try:
+            d = self._dates[date_str]
+        except KeyError:
+            d = self._dates[date_str] = self._decode_date(date_str)
+        try:
+            t = self._times[time_str, ampm]
+        except KeyError:
+            t = self._times[time_str, ampm] = self._decode_time(time_str, ampm)
+        if d is None or t is None:
+            raise ValueError(f"bad timestamp: {date_str} {time_str} {ampm or ''}".rstrip())
+        return datetime(d.year, d.month, d.day, t[0], t[1])
+
+
+def detect_day_first(file_path: str, max_lines: int = 20000) -> bool:
+    """Guess whether the export writes dates as D/M/YY instead of M/D/YY.
+
+    Reads headers from the start of the file until one of the first two date
+    fields is larger than 12. Ambiguous files are treated as M/D/YY.
+    """
     with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
+        for line in itertools.islice(f, max_lines):
+            match = MESSAGE_PATTERN.match(line.strip())
+            if not match:
                 continue
+            first, second, _ = match.group(1).split('/')
+            if int(first) > 12:
+                return True
+            if int(second) > 12:
+                return False
+    return False
+
+
+def iter_messages(file_path: str, year_filter: Optional[int] = 2025) -> Iterator[Message]:
+    """Yield messages from a WhatsApp export one at a time.
+
+    Continuation lines are folded into the message they belong to, so each
+    message is only yielded once it is complete. Nothing else is kept in memory.
+    With year_filter=None, messages from every year are yielded.
+    """
+    decoder = TimestampDecoder(day_first=detect_day_first(file_path))
+    with open(file_path, 'r', encoding='utf-8') as f:
+        yield from _iter_messages_from_lines(f, year_filter, decoder)
+
+
+def _iter_messages_from_lines(lines: Iterable[str], year_filter: Optional[int],
+                              decoder: TimestampDecoder) -> Iterator[Message]:
+    """Group raw export lines into messages (see iter_messages)."""
+    current_message = None
 
-            match = message_pattern.match(line)
-            if match:
-                # Save previous message if exists
-                if current_message:
-                    messages.append(current_message)
-
-                date_str, time_str, ampm, sender, content = match.groups()
-
-                # Parse date
-                try:
-                    # Handle both M/D/YY and M/D/YYYY formats
-                    if len(date_str.split('/')[-1]) == 2:
-                        date_format = "%m/%d/%y"
-                    else:
-                        date_format = "%m/%d/%Y"
-
-                    # Parse time with AM/PM
-                    if ampm:
-                        full_datetime = f"{date_str} {time_str} {ampm.upper()}"
-                        timestamp = datetime.strptime(full_datetime, f"{date_format} %I:%M %p")
-                    else:
-                        full_datetime = f"{date_str} {time_str}"
-                        timestamp = datetime.strptime(full_datetime, f"{date_format} %H:%M")
-
-                    # Filter by year
-                    if timestamp.year != year_filter:
-                        current_message = None
-                        continue
-
-                    sender = sender.strip()
-
-                    # Skip excluded senders
-                    if sender in EXCLUDED_SENDERS:
-                        current_message = None
-                        continue
-
-                    # Apply name mappings
-                    sender = NAME_MAPPINGS.get(sender, sender)
-                    content = content.strip()
-
-                    # Check for deleted messages
-                    is_deleted = 'this message was deleted' in content.lower()
-
-                    # Check for media - both old format and new format with (file attached)
-                    is_media = '<Media omitted>' in content or 'omitted' in content.lower() or '(file attached)' in content.lower()
-
-                    # Extract media filename if present (format: "FILENAME (file attached)")
-                    media_filename = None
-                    if '(file attached)' in content.lower():
-                        # Get the filename before "(file attached)"
-                        media_match = re.match(r'^(.+?)\s*\(file attached\)', content, re.IGNORECASE)
-                        if media_match:
-                            media_filename = media_match.group(1).strip()
-
-                    # Check for emojis and count individual ones
-                    emojis = emoji_pattern.findall(content)
-                    has_emoji = len(emojis) > 0
-                    emoji_count = sum(len(e) for e in emojis)
-                    # Count individual emojis
-                    for emoji_group in emojis:
-                        for char in emoji_group:
-                            emoji_counts[char] += 1
-
-                    # Check for links
-                    links = url_pattern.findall(content)
-                    has_link = len(links) > 0
-
-                    # Word count (excluding media omitted messages and deleted messages)
-                    if not is_media and not is_deleted:
-                        words = re.findall(r'\b\w+\b', content.lower())
-                        word_count = len(words)
-
-                        # Count words for top words (filter stop words and short words)
-                        for word in words:
-                            if word not in STOP_WORDS and len(word) > 2:
-                                word_counts[word] += 1
-                                words_by_person[sender][word] += 1
-                    else:
-                        word_count = 0
-
-                    current_message = Message(
-                        timestamp=timestamp,
-                        sender=sender,
-                        content=content,
-                        is_media=is_media,
-                        is_deleted=is_deleted,
-                        has_emoji=has_emoji,
-                        has_link=has_link,
-                        word_count=word_count,
-                        media_filename=media_filename
-                    )
-
-                except ValueError as e:
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        match = MESSAGE_PATTERN.match(line)
+        if match:
+            # Previous message is complete
+            if current_message:
+                yield current_message
+
+            date_str, time_str, ampm, sender, content = match.groups()
+
+            # Parse date
+            try:
+                timestamp = decoder.decode(date_str, time_str, ampm)
+
+                # Filter by year
+                if year_filter is not None and timestamp.year != year_filter:
+                    current_message = None
+                    continue
+
+                sender = sender.strip()
+
+                # Skip excluded senders
+                if sender in EXCLUDED_SENDERS:
+                    current_message = None
                     continue
-            elif current_message:
-                # Continuation of previous message
-                current_message.content += '\n' + line
-                if not current_message.is_media:
-                    words = re.findall(r'\b\w+\b', line.lower())
-                    current_message.word_count += len(words)
-                    for word in words:
-                        if word not in STOP_WORDS and len(word) > 2:
-                            word_counts[word] += 1
+
+                # Apply name mappings
+                sender = NAME_MAPPINGS.get(sender, sender)
+                content = content.strip()
+
+                # One scan for words, emojis, links and the deleted/media
+                # markers (old "<Media omitted>" and new "(file attached)")
+                words, emojis = [], []
+                flags, link_words = tokenize_into(content, words, emojis)
+                is_deleted = bool(flags & FLAG_DELETED)
+                is_media = bool(flags & FLAG_MEDIA)
+
+                # Extract media filename if present (format: "FILENAME (file attached)")
+                media_filename = None
+                if is_media:
+                    # Get the filename before "(file attached)"
+                    media_match = re.match(r'^(.+?)\s*\(file attached\)', content, re.IGNORECASE)
+                    if media_match:
+                        media_filename = media_match.group(1).strip()
+
+                # Words don't count for media omitted messages and deleted messages
+                if is_media or is_deleted:
+                    words = []
+                    link_words = 0
+
+                current_message = Message(
+                    timestamp=timestamp,
+                    sender=sender,
+                    content=content,
+                    is_media=is_media,
+                    is_deleted=is_deleted,
+                    has_emoji=bool(flags & FLAG_EMOJI),
+                    has_link=bool(flags & FLAG_LINK),
+                    word_count=len(words) + link_words,
+                    media_filename=media_filename,
+                    words=words,
+                    emojis=''.join(emojis),
+                )
+
+            except ValueError as e:
+                continue
+        elif current_message:
+            # Continuation of previous message: scanned for words and emojis
+            # like the first line, but only the first line can mark a message
+            # as media, deleted or having a link
+            current_message.content += '\n' + line
+            words, emojis = [], []
+            _, link_words = tokenize_into(line, words, emojis)
+            if emojis:
+                current_message.has_emoji = True
+                current_message.emojis += ''.join(emojis)
+            if not current_message.is_media and not current_message.is_deleted:
+                current_message.words.extend(words)
+                current_message.word_count += len(words) + link_words
 
     # Don't forget the last message
     if current_message:
-        messages.append(current_message)
-
-    # Calculate statistics
-    if messages:
-        stats.total_messages = len(messages)
-        stats.first_message_date = messages[0].timestamp
-        stats.last_message_date = messages[-1].timestamp
-
-        sender_words = defaultdict(int)
-        sender_msg_count = defaultdict(int)
-
-        prev_sender = None
-        prev_time = None
-        conversation_gap = 60 * 60  # 1 hour gap = new conversation
-
-        for msg in messages:
-            sender = msg.sender
-
-            # Message counts
-            stats.messages_by_sender[sender] = stats.messages_by_sender.get(sender, 0) + 1
-            sender_msg_count[sender] += 1
-
-            # Word counts
-            stats.total_words += msg.word_count
-            stats.words_by_sender[sender] = stats.words_by_sender.get(sender, 0) + msg.word_count
-            sender_words[sender] += msg.word_count
-
-            # Media counts
-            if msg.is_media:
-                stats.media_count += 1
-                stats.media_by_sender[sender] = stats.media_by_sender.get(sender, 0) + 1
-                # Track 2025 media filenames and by sender
-                if msg.media_filename:
-                    if msg.media_filename.startswith(('IMG-2025', 'VID-2025')):
-                        stats.media_files.append(msg.media_filename)
-                        if sender not in stats.media_files_by_sender:
-                            stats.media_files_by_sender[sender] = []
-                        stats.media_files_by_sender[sender].append(msg.media_filename)
-
-                    # Track images separately
-                    if msg.media_filename.startswith('IMG-2025'):
-                        if sender not in stats.images_by_sender:
-                            stats.images_by_sender[sender] = []
-                        stats.images_by_sender[sender].append(msg.media_filename)
-
-                    # Track audio files and duration
-                    if msg.media_filename.startswith(('PTT-2025', 'AUD-2025')):
-                        stats.audio_by_sender[sender] = stats.audio_by_sender.get(sender, 0) + 1
-                        if sender not in stats.audio_files_by_sender:
-                            stats.audio_files_by_sender[sender] = []
-                        stats.audio_files_by_sender[sender].append(msg.media_filename)
-                        # Calculate duration
-                        import os
-                        audio_path = os.path.join(media_folder, msg.media_filename)
-                        duration = get_audio_duration(audio_path)
-                        stats.audio_duration_by_sender[sender] = stats.audio_duration_by_sender.get(sender, 0) + duration
-
-            # Deleted message counts
-            if msg.is_deleted:
-                stats.deleted_by_sender[sender] = stats.deleted_by_sender.get(sender, 0) + 1
-
-            # Link counts
-            if msg.has_link:
-                stats.link_count += 1
-                stats.links_by_sender[sender] = stats.links_by_sender.get(sender, 0) + 1
-
-            # Emoji counts
-            if msg.has_emoji:
-                stats.emoji_count += 1
-                stats.emoji_by_sender[sender] = stats.emoji_by_sender.get(sender, 0) + 1
-
-            # Time-based stats
-            stats.messages_by_hour[msg.timestamp.hour] += 1
-            day_key = msg.timestamp.strftime('%A')
-            stats.messages_by_day[day_key] += 1
-            month_key = msg.timestamp.strftime('%B')
-            stats.messages_by_month[month_key] += 1
-            date_key = msg.timestamp.strftime('%Y-%m-%d')
-            stats.messages_by_date[date_key] = stats.messages_by_date.get(date_key, 0) + 1
-            # Track by date+hour for peak hour
-            datetime_key = msg.timestamp.strftime('%Y-%m-%d %H')
-            stats.messages_by_datetime[datetime_key] = stats.messages_by_datetime.get(datetime_key, 0) + 1
-
-            # Calculate local hour based on timezone
-            # WhatsApp exports are in local time of the exporter (assuming Buenos Aires UTC-3)
-            # We need to convert to each person's local time
-            export_tz_offset = -3  # Buenos Aires
-            location = LOCATIONS.get(sender, 'buenos_aires')
-            person_tz_offset = TIMEZONE_OFFSETS.get(location, -3)
-
-            # Convert: UTC hour = export_hour - export_offset
-            # Local hour = UTC hour + person_offset
-            # Simplified: local_hour = export_hour + (person_offset - export_offset)
-            tz_diff = person_tz_offset - export_tz_offset
-            local_hour = (msg.timestamp.hour + tz_diff) % 24
-
-            # Night owls (12am-5am local time)
-            if 0 <= local_hour < 5:
-                stats.night_owls[sender] = stats.night_owls.get(sender, 0) + 1
-
-            # Early birds (5am-8am local time)
-            if 5 <= local_hour < 8:
-                stats.early_birds[sender] = stats.early_birds.get(sender, 0) + 1
-
-            # Conversation starters
-            if prev_time is None or (msg.timestamp - prev_time).total_seconds() > conversation_gap:
-                stats.conversation_starters[sender] = stats.conversation_starters.get(sender, 0) + 1
-
-            prev_sender = sender
-            prev_time = msg.timestamp
+        yield current_message
+
+
+def _merge_counts(dst: dict, src: dict):
+    """Add src's counts into dst, keeping first-seen key order."""
+    for key, value in src.items():
+        dst[key] = dst.get(key, 0) + value
+
+
+def _merge_lists(dst: dict, src: dict):
+    """Extend dst's per-key lists with src's, keeping first-seen key order."""
+    for key, values in src.items():
+        dst.setdefault(key, []).extend(values)
+
+
+# datetime.toordinal() of 1970-01-01
+_EPOCH_ORDINAL = 719163
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _numpy():
+    """numpy if it is installed (it is optional), else None."""
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def _group_counts(keys, domain: int, mask=None, weights=None) -> Dict[int, int]:
+    """Sum weights (or count rows) per integer key in [0, domain).
+
+    Keys come back in the order they first appear, which is the order the old
+    per-message dict increments produced. Uses numpy's bincount when available.
+    """
+    np = _numpy()
+    if np is not None:
+        keys = np.asarray(keys)
+        if mask is not None:
+            keys = keys[mask]
+            if weights is not None:
+                weights = np.asarray(weights)[mask]
+        if not len(keys):
+            return {}
+        sums = np.bincount(keys, weights=weights, minlength=domain)
+        # Assigning in reverse leaves each key's first row
+        first = np.full(domain, len(keys))
+        first[keys[::-1]] = np.arange(len(keys))[::-1]
+        present = np.flatnonzero(first < len(keys))
+        present = present[np.argsort(first[present], kind='stable')]
+        return {int(k): int(sums[k]) for k in present}
+
+    counts = {}
+    for i, key in enumerate(keys):
+        if mask is not None and not mask[i]:
+            continue
+        counts[key] = counts.get(key, 0) + (1 if weights is None else weights[i])
+    return counts
+
+
+class MessageTable:
+    """Columnar store of the per-message fields behind the count stats.
+
+    One row per message: timestamp (seconds since 1970, in the export's local
+    time), sender code, word count and FLAG_* bits. Sender codes are handed
+    out in first-seen order. The time and sender breakdowns of ChatStats are
+    group-bys over these columns (see aggregate_into).
+    """
+
+    def __init__(self):
+        self.timestamps = array('q')
+        self.senders = array('l')
+        self.word_counts = array('l')
+        self.flags = array('B')
+        self.sender_names = []  # code -> name
+        self.sender_codes = {}  # name -> code
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def _sender_code(self, sender: str) -> int:
+        code = self.sender_codes.get(sender)
+        if code is None:
+            code = self.sender_codes[sender] = len(self.sender_names)
+            self.sender_names.append(sender)
+        return code
+
+    def append(self, msg: Message):
+        """Add one message's row."""
+        ts = msg.timestamp
+        self.timestamps.append((ts.toordinal() - _EPOCH_ORDINAL) * 86400
+                               + ts.hour * 3600 + ts.minute * 60 + ts.second)
+        self.senders.append(self._sender_code(msg.sender))
+        self.word_counts.append(msg.word_count)
+        self.flags.append((FLAG_MEDIA if msg.is_media else 0)
+                          | (FLAG_DELETED if msg.is_deleted else 0)
+                          | (FLAG_LINK if msg.has_link else 0)
+                          | (FLAG_EMOJI if msg.has_emoji else 0))
+
+    def extend(self, other: 'MessageTable'):
+        """Append another table's rows, mapping its sender codes onto ours."""
+        remap = [self._sender_code(name) for name in other.sender_names]
+        self.timestamps.extend(other.timestamps)
+        self.senders.extend(array('l', [remap[code] for code in other.senders]))
+        self.word_counts.extend(other.word_counts)
+        self.flags.extend(other.flags)
+
+    def day_ranges(self) -> Dict[str, tuple]:
+        """YYYY-MM-DD -> (start, end) rows of that day's messages.
+
+        Rows are in export order, so a day is normally one run. If a day turns
+        up again later (clock changes), its range covers both runs.
+        """
+        np = _numpy()
+        if np is not None:
+            days = np.frombuffer(self.timestamps, dtype=np.int64) // 86400
+            starts = [0] + (np.flatnonzero(np.diff(days)) + 1).tolist()
+            run_days = days[starts].tolist()
+        else:
+            days = [ts // 86400 for ts in self.timestamps]
+            starts = [0] + [i for i in range(1, len(days)) if days[i] != days[i - 1]]
+            run_days = [days[i] for i in starts]
+        ranges = {}
+        for day, start, end in zip(run_days, starts, starts[1:] + [len(self)]):
+            key = date.fromordinal(day + _EPOCH_ORDINAL).strftime('%Y-%m-%d')
+            if key in ranges:
+                start = ranges[key][0]
+            ranges[key] = (start, end)
+        return ranges
+
+    def activity(self, year: int) -> 'ActivityIndex':
+        """Per-sender bitmaps of the days of `year` with at least one message."""
+        index = ActivityIndex(year)
+        first_day = index.first_ordinal - _EPOCH_ORDINAL
+        np = _numpy()
+        if np is not None:
+            days = np.frombuffer(self.timestamps, dtype=np.int64) // 86400 - first_day
+            senders = np.frombuffer(self.senders, dtype=np.dtype(f'i{self.senders.itemsize}')).astype(np.int64)
+            in_year = (days >= 0) & (days < index.days)
+            pairs = np.unique(senders[in_year] * index.days + days[in_year]).tolist()
+        else:
+            pairs = sorted({code * index.days + ts // 86400 - first_day
+                            for code, ts in zip(self.senders, self.timestamps)
+                            if 0 <= ts // 86400 - first_day < index.days})
+        bitmaps = {}
+        for pair in pairs:
+            code, day = divmod(pair, index.days)
+            bitmaps[code] = bitmaps.get(code, 0) | 1 << day
+        # Senders in first-seen order, like the other per-sender stats
+        index.bitmaps = {name: bitmaps[code] for code, name in enumerate(self.sender_names) if code in bitmaps}
+        return index
+
+    def aggregate_into(self, stats: ChatStats):
+        """Fill the count, sender and time breakdowns of stats from the columns."""
+        np = _numpy()
+        names = self.sender_names
+        n_senders = len(names)
+
+        if np is not None:
+            timestamps = np.frombuffer(self.timestamps, dtype=np.int64)
+            senders = np.frombuffer(self.senders, dtype=np.dtype(f'i{self.senders.itemsize}')).astype(np.intp)
+            word_counts = np.frombuffer(self.word_counts, dtype=np.dtype(f'i{self.word_counts.itemsize}'))
+            flags = np.frombuffer(self.flags, dtype=np.uint8)
+            days = timestamps // 86400
+            hours = timestamps // 3600
+            first_day, first_hour = int(days.min()), int(hours.min())
+            day_index = days - first_day
+            hour_index = hours - first_hour
+            hour_of_day = hours % 24
+            has = lambda flag: (flags & flag) != 0
+        else:
+            timestamps, senders, word_counts, flags = self.timestamps, self.senders, self.word_counts, self.flags
+            days = [ts // 86400 for ts in timestamps]
+            hours = [ts // 3600 for ts in timestamps]
+            first_day, first_hour = min(days), min(hours)
+            day_index = [d - first_day for d in days]
+            hour_index = [h - first_hour for h in hours]
+            hour_of_day = [h % 24 for h in hours]
+            has = lambda flag: [f & flag != 0 for f in flags]
+        n_days = (int(day_index.max()) if np is not None else max(day_index)) + 1
+        n_hours = (int(hour_index.max()) if np is not None else max(hour_index)) + 1
+
+        # Labels are only made once per distinct bucket
+        day_dates = [date.fromordinal(first_day + i + _EPOCH_ORDINAL) for i in range(n_days)]
+        day_of_week = [d.weekday() for d in day_dates]
+        day_month = [d.month - 1 for d in day_dates]
+        if np is not None:
+            weekdays = np.asarray(day_of_week, dtype=np.intp)[day_index]
+            months = np.asarray(day_month, dtype=np.intp)[day_index]
+        else:
+            weekdays = [day_of_week[i] for i in day_index]
+            months = [day_month[i] for i in day_index]
+
+        def by_sender(mask=None, weights=None):
+            counts = _group_counts(senders, n_senders, mask, weights)
+            return {names[code]: count for code, count in counts.items()}
+
+        stats.total_messages = len(self)
+        stats.total_words = int(sum(word_counts))
+        stats.messages_by_sender = by_sender()
+        stats.words_by_sender = by_sender(weights=word_counts)
+        media, deleted, links, emojis = has(FLAG_MEDIA), has(FLAG_DELETED), has(FLAG_LINK), has(FLAG_EMOJI)
+        stats.media_count = int(sum(media))
+        stats.media_by_sender = by_sender(media)
+        stats.deleted_by_sender = by_sender(deleted)
+        stats.link_count = int(sum(links))
+        stats.links_by_sender = by_sender(links)
+        stats.emoji_count = int(sum(emojis))
+        stats.emoji_by_sender = by_sender(emojis)
+
+        # Time-based stats
+        stats.messages_by_hour.update(_group_counts(hour_of_day, 24))
+        for weekday, count in _group_counts(weekdays, 7).items():
+            stats.messages_by_day[day_dates[day_of_week.index(weekday)].strftime('%A')] = count
+        for month, count in _group_counts(months, 12).items():
+            stats.messages_by_month[day_dates[day_month.index(month)].strftime('%B')] = count
+        stats.messages_by_date = {
+            day_dates[i].strftime('%Y-%m-%d'): count for i, count in _group_counts(day_index, n_days).items()
+        }
+        # Track by date+hour for peak hour
+        stats.messages_by_datetime = {
+            date.fromordinal((first_hour + i) // 24 + _EPOCH_ORDINAL).strftime('%Y-%m-%d ')
+            + f'{(first_hour + i) % 24:02d}': count
+            for i, count in _group_counts(hour_index, n_hours).items()
+        }
+
+        # Calculate local hour based on timezone
+        # WhatsApp exports are in local time of the exporter (assuming Buenos Aires UTC-3)
+        # We need to convert to each person's local time:
+        # local_hour = export_hour + (person_offset - export_offset)
+        export_tz_offset = -3  # Buenos Aires
+        tz_diffs = [TIMEZONE_OFFSETS.get(LOCATIONS.get(name, 'buenos_aires'), -3) - export_tz_offset
+                    for name in names]
+        if np is not None:
+            local_hours = (hour_of_day + np.asarray(tz_diffs, dtype=np.int64)[senders]) % 24
+            night = local_hours < 5
+            early = (local_hours >= 5) & (local_hours < 8)
+        else:
+            local_hours = [(h + tz_diffs[s]) % 24 for h, s in zip(hour_of_day, senders)]
+            night = [h < 5 for h in local_hours]
+            early = [5 <= h < 8 for h in local_hours]
+        # Night owls (12am-5am local time), early birds (5am-8am local time)
+        stats.night_owls = by_sender(night)
+        stats.early_birds = by_sender(early)
 
         # Calculate average message length
-        for sender, count in sender_msg_count.items():
-            if count > 0:
-                stats.avg_message_length[sender] = round(sender_words[sender] / count, 1)
+        words_by_sender = stats.words_by_sender
+        for sender, count in stats.messages_by_sender.items():
+            stats.avg_message_length[sender] = round(words_by_sender[sender] / count, 1)
+
+
+class ActivityIndex:
+    """Which days of a year each person wrote on, as one bitmap per person.
+
+    Bit d of a bitmap is day d of the year (Jan 1 is bit 0), so active days,
+    streaks and calendar levels are a few big-int operations per person
+    instead of walks over dates.
+    """
+
+    def __init__(self, year: int, bitmaps: Optional[Dict[str, int]] = None):
+        self.year = year
+        self.first_ordinal = date(year, 1, 1).toordinal()
+        self.days = date(year + 1, 1, 1).toordinal() - self.first_ordinal
+        self.bitmaps = bitmaps if bitmaps is not None else {}
+
+    def day_index(self, day: date) -> int:
+        return day.toordinal() - self.first_ordinal
+
+    def mark(self, person: str, day: date):
+        self.bitmaps[person] = self.bitmaps.get(person, 0) | 1 << self.day_index(day)
+
+    def active_days(self, person: str) -> int:
+        return self.bitmaps.get(person, 0).bit_count()
+
+    def longest_streak(self, person: str) -> int:
+        # Each step drops the last day of every run, so it takes as many
+        # steps as the longest run is long
+        bits, streak = self.bitmaps.get(person, 0), 0
+        while bits:
+            bits &= bits >> 1
+            streak += 1
+        return streak
+
+    def current_streak(self, person: str, day: date) -> int:
+        """Active days in a row ending on `day`."""
+        last = self.day_index(day)
+        if last < 0:
+            return 0
+        last = min(last, self.days - 1)
+        gaps = ~self.bitmaps.get(person, 0) & ((1 << (last + 1)) - 1)
+        return last + 1 - gaps.bit_length() if gaps else last + 1
+
+    def level_planes(self, counts_by_date: Dict[str, int], levels: int = 4) -> List[int]:
+        """Bitmaps of the days whose count passes each calendar level.
+
+        Plane 0 is every day with messages; plane k (k > 0) the days above
+        k / levels of the busiest day. A day's level is how many planes have
+        its bit set.
+        """
+        if not counts_by_date:
+            return []
+        max_count = max(counts_by_date.values())
+        thresholds = [0] + [max_count * k / levels for k in range(1, levels)]
+        planes = [0] * levels
+        for date_str, count in counts_by_date.items():
+            day = self.day_index(date.fromisoformat(date_str))
+            if 0 <= day < self.days:
+                for k, threshold in enumerate(thresholds):
+                    if count > threshold:
+                        planes[k] |= 1 << day
+        return planes
+
+    @staticmethod
+    def level(planes: List[int], day: int) -> int:
+        return sum((plane >> day) & 1 for plane in planes)
+
+    def to_dict(self) -> dict:
+        return {'year': self.year, 'bitmaps': {person: format(bits, 'x') for person, bits in self.bitmaps.items()}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ActivityIndex':
+        return cls(data['year'], {person: int(bits, 16) for person, bits in data['bitmaps'].items()})
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of durations, `resolution` seconds per bucket.
+
+    Export timestamps are to the minute, so with the default resolution the
+    buckets hold exact values up to max_seconds; longer ones share the last.
+    """
+
+    def __init__(self, resolution: int = 60, max_seconds: int = 3600, counts: Optional[List[int]] = None):
+        self.resolution = resolution
+        self.n_buckets = max_seconds // resolution + 1
+        self.counts = list(counts) if counts is not None else [0] * self.n_buckets
+
+    def add(self, seconds: int, count: int = 1):
+        self.counts[min(max(seconds // self.resolution, 0), self.n_buckets - 1)] += count
+
+    def merge(self, other: 'LatencyHistogram') -> 'LatencyHistogram':
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Nearest-rank quantile in seconds (bucket start), None if empty."""
+        total = self.total
+        if not total:
+            return None
+        rank = max(math.ceil(q * total), 1)
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket * self.resolution
+        return (self.n_buckets - 1) * self.resolution
+
+    def percentiles(self) -> Dict[str, Optional[int]]:
+        return {'count': self.total, 'p50': self.quantile(0.5), 'p90': self.quantile(0.9), 'p99': self.quantile(0.99)}
+
+
+@dataclass
+class Session:
+    """One conversation: messages start..end-1 of a MessageTable."""
+    start: int
+    end: int
+    start_time: datetime
+    duration: int  # Seconds from the first to the last message
+    counts: Dict[str, int]  # Messages per sender, in first-seen order
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+    @property
+    def participants(self) -> List[str]:
+        return list(self.counts)
+
+
+class SessionTable:
+    """A MessageTable split into sessions: runs with no gap over `gap` seconds.
+
+    starts holds the row of each session's first message. segment() only
+    looks at rows added since its last call, so a table kept with a cached
+    accumulator is extended instead of rebuilt.
+    """
+
+    def __init__(self, gap: int):
+        self.gap = gap
+        self.starts = array('l')
+        self.rows = 0  # Rows segmented so far
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment(self, table: MessageTable) -> 'SessionTable':
+        """Split the rows added to table since the last call."""
+        timestamps, begin, end = table.timestamps, self.rows, len(table)
+        if end <= begin:
+            return self
+        if begin == 0:
+            self.starts.append(0)
+        # A row starts a session if it comes more than gap after the one before
+        offset = max(begin - 1, 0)
+        np = _numpy()
+        if np is not None:
+            gaps = np.diff(np.frombuffer(timestamps, dtype=np.int64)[offset:end])
+            self.starts.extend((np.flatnonzero(gaps > self.gap) + offset + 1).tolist())
+        else:
+            gap = self.gap
+            self.starts.extend(i for i, (prev, ts) in enumerate(zip(timestamps[offset:end], timestamps[offset + 1:end]),
+                                                               offset + 1)
+                               if ts - prev > gap)
+        self.rows = end
+        return self
+
+    def bounds(self, i: int) -> tuple:
+        """(start, end) rows of session i."""
+        return self.starts[i], self.starts[i + 1] if i + 1 < len(self.starts) else self.rows
+
+    def lengths(self) -> List[int]:
+        return [end - start for start, end in zip(self.starts, list(self.starts[1:]) + [self.rows])]
+
+    def session(self, i: int, table: MessageTable) -> Session:
+        start, end = self.bounds(i)
+        names = table.sender_names
+        counts = {}
+        for code in table.senders[start:end]:
+            name = names[code]
+            counts[name] = counts.get(name, 0) + 1
+        first, last = table.timestamps[start], table.timestamps[end - 1]
+        return Session(start, end, _EPOCH + timedelta(seconds=first), last - first, counts)
+
+    def sessions(self, table: MessageTable) -> Iterator[Session]:
+        for i in range(len(self.starts)):
+            yield self.session(i, table)
+
+    def starters(self, table: MessageTable) -> Dict[str, int]:
+        """Sessions started per sender, in first-seen order."""
+        names, senders = table.sender_names, table.senders
+        counts = {}
+        for start in self.starts:
+            name = names[senders[start]]
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def reply_times(self, table: MessageTable, resolution: int = 60) -> Dict[str, 'LatencyHistogram']:
+        """How long each sender took to answer someone else within a session.
+
+        A reply is a message straight after someone else's; its latency is the
+        time between the two. Each sender gets a fixed-size histogram.
+        """
+        names, n_senders = table.sender_names, len(table.sender_names)
+        n_buckets = LatencyHistogram(resolution, self.gap).n_buckets
+        np = _numpy()
+        if np is not None:
+            timestamps = np.frombuffer(table.timestamps, dtype=np.int64)[:self.rows]
+            senders = np.frombuffer(table.senders, dtype=np.dtype(f'i{table.senders.itemsize}'))[:self.rows]
+            gaps = np.diff(timestamps)
+            replies = (senders[1:] != senders[:-1]) & (gaps <= self.gap)
+            buckets = np.clip(gaps[replies] // resolution, 0, n_buckets - 1)
+            keys = senders[1:][replies].astype(np.intp) * n_buckets + buckets
+            grid = np.bincount(keys, minlength=n_senders * n_buckets).reshape(n_senders, n_buckets).tolist()
+        else:
+            timestamps, senders = table.timestamps, table.senders
+            grid = [[0] * n_buckets for _ in range(n_senders)]
+            gap = self.gap
+            for i in range(1, self.rows):
+                sender, seconds = senders[i], timestamps[i] - timestamps[i - 1]
+                if sender != senders[i - 1] and seconds <= gap:
+                    grid[sender][min(max(seconds // resolution, 0), n_buckets - 1)] += 1
+
+        histograms = {}
+        for code, counts in enumerate(grid):
+            if any(counts):
+                histograms[names[code]] = LatencyHistogram(resolution, self.gap, counts)
+        return histograms
+
+    def histogram(self, edges=(1, 5, 20, 50, 100)) -> Dict[str, int]:
+        """Number of sessions by message count, bucketed at `edges`."""
+        labels = [str(edges[0])] + [f'{lo + 1}-{hi}' for lo, hi in zip(edges, edges[1:])] + [f'{edges[-1] + 1}+']
+        counts = dict.fromkeys(labels, 0)
+        for length in self.lengths():
+            counts[labels[bisect.bisect_left(edges, length)]] += 1
+        return counts
+
+
+@functools.lru_cache(maxsize=None)
+def media_prefixes(year: int) -> tuple:
+    """Filename prefixes of (photos and videos, photos, audio) sent in a year."""
+    return (f'IMG-{year}', f'VID-{year}'), f'IMG-{year}', (f'PTT-{year}', f'AUD-{year}')
+
+
+def is_gibberish(word: str) -> bool:
+    """Odd lengths, digits mixed in (URL params) or long consonant runs."""
+    if len(word) < 3 or len(word) > 15:
+        return True
+    if any(c.isdigit() for c in word):
+        return True
+    vowels = set('aeiouáéíóú')
+    consonant_streak = 0
+    max_streak = 0
+    for c in word.lower():
+        if c.isalpha() and c not in vowels:
+            consonant_streak += 1
+            max_streak = max(max_streak, consonant_streak)
+        else:
+            consonant_streak = 0
+    return max_streak > 4
+
+
+class WordIndex:
+    """Inverted index of the words people use.
+
+    postings maps word -> {person: count}, in the order words were first used,
+    so a word's document frequency (how many people use it) is just the size
+    of its postings. Whether a word is gibberish is decided once, when it is
+    first added.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.gibberish: Dict[str, bool] = {}
+        self.people: Dict[str, None] = {}  # In order of their first indexed word
+
+    @classmethod
+    def from_person_counts(cls, words_by_person: Dict[str, Dict[str, int]]) -> 'WordIndex':
+        """Index from person -> word -> count (e.g. per-person SpaceSaving counters)."""
+        index = cls()
+        for person, counts in words_by_person.items():
+            for word, count in counts.items():
+                index.add(word, person, count)
+        return index
+
+    def add(self, word: str, person: str, count: int = 1):
+        postings = self.postings.get(word)
+        if postings is None:
+            postings = self.postings[word] = {}
+            self.gibberish[word] = is_gibberish(word)
+        current = postings.get(person)
+        if current is None:
+            postings[person] = count
+            if person not in self.people:
+                self.people[person] = None
+        else:
+            postings[person] = current + count
+
+    def add_words(self, words: Iterable[str], person: str):
+        for word in words:
+            self.add(word, person)
+
+    def merge(self, other: 'WordIndex') -> 'WordIndex':
+        """Fold in the index of a later part of the chat."""
+        for word, theirs in other.postings.items():
+            mine = self.postings.get(word)
+            if mine is None:
+                self.postings[word] = dict(theirs)
+                self.gibberish[word] = other.gibberish[word]
+            else:
+                _merge_counts(mine, theirs)
+        for person in other.people:
+            if person not in self.people:
+                self.people[person] = None
+        return self
+
+    def df(self, word: str) -> int:
+        """How many people use a word."""
+        return len(self.postings.get(word, ()))
+
+    def word_counts(self) -> Dict[str, int]:
+        """Total uses of every word, in first-use order."""
+        return {word: sum(postings.values()) for word, postings in self.postings.items()}
+
+    def top_words_by_person(self, n: int = 5, skip_gibberish: bool = False) -> Dict[str, Dict[str, int]]:
+        """Each person's n most used words."""
+        by_person = {person: [] for person in self.people}
+        gibberish = self.gibberish
+        for word, postings in self.postings.items():
+            if skip_gibberish and gibberish[word]:
+                continue
+            for person, count in postings.items():
+                by_person[person].append((word, count))
+        return {person: dict(top_n(words, n, key=itemgetter(1))) for person, words in by_person.items()}
+
+    def unique_words_by_person(self, n: int = 5, min_count: int = 3) -> Dict[str, List[str]]:
+        """Each person's n most used words that nobody else uses (no gibberish)."""
+        by_person = {person: [] for person in self.people}
+        gibberish = self.gibberish
+        for word, postings in self.postings.items():
+            if len(postings) == 1 and not gibberish[word]:
+                (person, count), = postings.items()
+                if count >= min_count:
+                    by_person[person].append((word, count))
+        return {person: [word for word, _ in top_n(words, n, key=itemgetter(1))]
+                for person, words in by_person.items()}
+
+
+class StatsAccumulator:
+    """Fold messages into ChatStats one at a time.
+
+    Only running counters are kept, so stats for a whole export can be built
+    without holding the message list. Call add() for every message in order,
+    then finish() to get the ChatStats.
+
+    Accumulators over consecutive slices of the chat can be combined with
+    merge(), which gives exactly the same result as one accumulator over the
+    whole chat.
+
+    With word_sketch set, word counts (overall and per person) are kept in
+    SpaceSaving counters of that many slots instead of exact dicts, so memory
+    stays flat however large the export; see topk.py for the error bounds.
+    """
+
+    def __init__(self, media_folder: str = 'media', word_sketch: Optional[int] = None):
+        self.media_folder = media_folder
+        self.word_sketch = word_sketch
+        self.stats = ChatStats()
+
+        # Exact word counts live in the index; with word_sketch, word_counts and
+        # words_by_person are SpaceSaving counters and the index is built from
+        # them in finish()
+        self.index = WordIndex()
+        self.word_counts = SpaceSaving(word_sketch) if word_sketch else None
+        self.emoji_counts = defaultdict(int)
+        self.words_by_person = {}  # person -> word -> count (word_sketch only)
+        # With word_sketch, words are tallied exactly for a while and fed to the
+        # counters in batches (SpaceSaving.update), about one counter's worth
+        # per person, so the tallies never outgrow the counters themselves
+        self.pending_words = {}  # person -> Counter of words
+        self.pending_count = 0
+        self.table = MessageTable()
+
+        # Sessions are cut from the table by gap (see sessions()): a 1 hour
+        # gap starts a new conversation (starters, reply times, sizes), and
+        # the longest conversation is messages within 5 min of each other
+        self.conversation_gap = 60 * 60
+        self.burst_gap = 5 * 60
+        self.session_tables = {}  # gap -> SessionTable
+
+    def flush_words(self):
+        """Feed the pending word tallies into the SpaceSaving counters (word_sketch only)."""
+        totals = {}
+        for person, words in self.pending_words.items():
+            if not words:
+                continue
+            person_words = self.words_by_person.get(person)
+            if person_words is None:
+                person_words = self.words_by_person[person] = SpaceSaving(self.word_sketch)
+            person_words.update(words)
+            for word, count in words.items():
+                totals[word] = totals.get(word, 0) + count
+        self.word_counts.update(totals)
+        self.pending_words = {}
+        self.pending_count = 0
+
+    def add(self, msg: Message):
+        """Fold a single message into the running stats."""
+        stats = self.stats
+        sender = msg.sender
+
+        if stats.first_message_date is None:
+            stats.first_message_date = msg.timestamp
+        stats.last_message_date = msg.timestamp
+        self.table.append(msg)
+
+        # Word and emoji frequencies, from the tokens the parser found
+        for char in msg.emojis:
+            self.emoji_counts[char] += 1
+        if msg.words and self.word_sketch:
+            person_words = self.pending_words.get(sender)
+            if person_words is None:
+                person_words = self.pending_words[sender] = Counter()
+            tallied = len(person_words)
+            person_words.update([word for word in msg.words if word not in STOP_WORDS and len(word) > 2])
+            self.pending_count += len(person_words) - tallied
+            if self.pending_count >= self.word_sketch * (1 + len(self.pending_words)):
+                self.flush_words()
+        elif msg.words:
+            self.index.add_words([word for word in msg.words if word not in STOP_WORDS and len(word) > 2],
+                                 sender)
+
+        # Media files
+        if msg.is_media:
+            # Track media filenames from the message's year, and by sender
+            if msg.media_filename:
+                visual, image, audio = media_prefixes(msg.timestamp.year)
+                if msg.media_filename.startswith(visual):
+                    stats.media_files.append(msg.media_filename)
+                    if sender not in stats.media_files_by_sender:
+                        stats.media_files_by_sender[sender] = []
+                    stats.media_files_by_sender[sender].append(msg.media_filename)
+
+                # Track images separately
+                if msg.media_filename.startswith(image):
+                    if sender not in stats.images_by_sender:
+                        stats.images_by_sender[sender] = []
+                    stats.images_by_sender[sender].append(msg.media_filename)
+
+                # Track audio files and duration
+                if msg.media_filename.startswith(audio):
+                    stats.audio_by_sender[sender] = stats.audio_by_sender.get(sender, 0) + 1
+                    if sender not in stats.audio_files_by_sender:
+                        stats.audio_files_by_sender[sender] = []
+                    stats.audio_files_by_sender[sender].append(msg.media_filename)
+
+    def sessions(self, gap: int) -> SessionTable:
+        """The messages so far split into sessions at gaps over `gap` seconds."""
+        table = self.session_tables.get(gap)
+        if table is None:
+            table = self.session_tables[gap] = SessionTable(gap)
+        return table.segment(self.table)
+
+    def segment(self):
+        """Bring the session tables finish() uses up to date (e.g. before caching)."""
+        for gap in (self.conversation_gap, self.burst_gap):
+            self.sessions(gap)
+
+    def merge(self, other: 'StatsAccumulator') -> 'StatsAccumulator':
+        """Fold in an accumulator over the messages that directly follow ours."""
+        if not len(other.table):
+            return self
+        if not len(self.table):
+            self.__dict__.update(other.__dict__)
+            return self
+
+        stats, theirs = self.stats, other.stats
+        stats.last_message_date = theirs.last_message_date
+        self.table.extend(other.table)
+
+        _merge_counts(stats.audio_by_sender, theirs.audio_by_sender)
+        for name in ('media_files_by_sender', 'images_by_sender', 'audio_files_by_sender'):
+            _merge_lists(getattr(stats, name), getattr(theirs, name))
+        stats.media_files.extend(theirs.media_files)
+
+        _merge_counts(self.emoji_counts, other.emoji_counts)
+        if self.word_sketch:
+            self.flush_words()
+            other.flush_words()
+            self.word_counts.merge(other.word_counts)
+            for person, person_words in other.words_by_person.items():
+                self.words_by_person.setdefault(person, SpaceSaving(self.word_sketch)).merge(person_words)
+        else:
+            self.index.merge(other.index)
+
+        # Our session tables still cover our rows; theirs are cut again
+        return self
+
+    def finish(self) -> ChatStats:
+        """Compute the derived stats and return the finished ChatStats."""
+        stats = self.stats
+        if not len(self.table):
+            return stats
+
+        self.table.aggregate_into(stats)
+        stats.day_index = self.table.day_ranges()
+
+        # Conversations: who starts them, how fast people answer, how long they run
+        conversations = self.sessions(self.conversation_gap)
+        stats.conversation_starters = conversations.starters(self.table)
+        stats.response_times = conversations.reply_times(self.table)
+        stats.conversations_by_size = conversations.histogram()
+
+        # Day streaks, from per-person day bitmaps of the (last) year
+        last_day = stats.last_message_date.date()
+        stats.activity = activity = self.table.activity(last_day.year)
+        for sender in activity.bitmaps:
+            stats.streaks[sender] = activity.longest_streak(sender)
+            stats.current_streaks[sender] = activity.current_streak(sender, last_day)
+            stats.active_days_by_sender[sender] = activity.active_days(sender)
+
+        # Audio durations are probed in one batch, then summed in message order
+        all_audio = [f for files in stats.audio_files_by_sender.values() for f in files]
+        durations = probe_audio_durations(all_audio, self.media_folder)
+        for sender, files in stats.audio_files_by_sender.items():
+            total = 0
+            for filename in files:
+                total += durations[filename]
+            stats.audio_duration_by_sender[sender] = total
+
+        if self.word_sketch:
+            self.flush_words()
+            self.index = WordIndex.from_person_counts(self.words_by_person)
+            word_counts = self.word_counts
+        else:
+            word_counts = self.index.word_counts()
+        stats.word_index = self.index
 
         # Top words (500 for word cloud)
-        stats.top_words = dict(sorted(word_counts.items(), key=lambda x: x[1], reverse=True)[:500])
+        stats.top_words = top_counts(word_counts, 500)
 
         # Top emojis
-        stats.top_emojis = dict(sorted(emoji_counts.items(), key=lambda x: x[1], reverse=True)[:20])
+        stats.top_emojis = top_counts(self.emoji_counts, 20)
 
         # Rare emojis (bottom 10, but only those used at least once)
-        all_emojis_sorted = sorted(emoji_counts.items(), key=lambda x: x[1])
-        stats.rare_emojis = dict(all_emojis_sorted[:10])
+        stats.rare_emojis = bottom_counts(self.emoji_counts, 10)
 
         # Top words per person (top 5 for each)
-        for person, person_words in words_by_person.items():
-            top_5 = dict(sorted(person_words.items(), key=lambda x: x[1], reverse=True)[:5])
-            stats.words_by_person[person] = top_5
+        stats.words_by_person = self.index.top_words_by_person(5)
 
         # Most active day and hour
         if stats.messages_by_day:
@@ -426,83 +1282,216 @@ def parse_whatsapp_chat(file_path: str, year_filter: int = 2025, media_folder: s
         if stats.messages_by_datetime:
             stats.peak_hour_datetime = max(stats.messages_by_datetime.items(), key=lambda x: x[1])[0]
 
-        # Calculate unique words per person (words only they use)
-        all_words_by_person = words_by_person  # Already tracked
-        word_usage = defaultdict(set)  # word -> set of people who use it
-        for person, person_words in all_words_by_person.items():
-            for word in person_words.keys():
-                word_usage[word].add(person)
-
-        # Find words unique to each person (used by only 1 person, at least 3 times)
-        # Filter out gibberish/URL parameters
-        url_params = {'mibextid', 'wwxifr', 'gasearch', 'source', 'fbclid', 'utm', 'ref', 'share', 'thefork'}
-        for person, person_words in all_words_by_person.items():
-            unique = []
-            for word, count in sorted(person_words.items(), key=lambda x: x[1], reverse=True):
-                if len(word_usage[word]) == 1 and count >= 3 and word not in STOP_WORDS:
-                    # Filter out gibberish
-                    if len(word) < 3 or len(word) > 15:
-                        continue
-                    # Skip words with numbers mixed in (URL params)
-                    if any(c.isdigit() for c in word):
-                        continue
-                    # Skip known URL params
-                    if word.lower() in url_params:
-                        continue
-                    # Skip words with too many consonants in a row (gibberish)
-                    vowels = set('aeiouáéíóú')
-                    consonant_streak = 0
-                    max_streak = 0
-                    for c in word.lower():
-                        if c.isalpha() and c not in vowels:
-                            consonant_streak += 1
-                            max_streak = max(max_streak, consonant_streak)
-                        else:
-                            consonant_streak = 0
-                    if max_streak > 4:
-                        continue
-                    unique.append(word)
-                if len(unique) >= 5:
-                    break
-            stats.unique_words_by_person[person] = unique
-
-        # Find longest conversation (messages within 5 min of each other)
-        if len(messages) > 1:
-            conversations = []
-            conv_start = 0
-            conv_participants = set()
-            for i in range(1, len(messages)):
-                time_diff = (messages[i].timestamp - messages[i-1].timestamp).total_seconds()
-                if time_diff <= 300:  # 5 minutes
-                    conv_participants.add(messages[i].sender)
-                    conv_participants.add(messages[i-1].sender)
-                else:
-                    # End of conversation
-                    if i - conv_start > 10 and len(conv_participants) >= 2:
-                        conversations.append({
-                            'start': conv_start,
-                            'end': i - 1,
-                            'length': i - conv_start,
-                            'participants': list(conv_participants),
-                            'date': messages[conv_start].timestamp.strftime('%Y-%m-%d')
-                        })
-                    conv_start = i
-                    conv_participants = set()
-
-            if conversations:
-                longest = max(conversations, key=lambda x: x['length'])
-                # Get top 2 participants by message count in that conversation
-                participant_counts = defaultdict(int)
-                for j in range(longest['start'], longest['end'] + 1):
-                    participant_counts[messages[j].sender] += 1
-                top_two = sorted(participant_counts.items(), key=lambda x: x[1], reverse=True)[:2]
+        # Words unique to each person (used by only 1 person, at least 3 times)
+        stats.unique_words_by_person = self.index.unique_words_by_person(5, min_count=3)
+
+        # Longest conversation: top 2 participants by message count in it.
+        # Only conversations of more than 10 messages between 2+ people count,
+        # the earliest wins ties, and the still-open last one never counts.
+        bursts = self.sessions(self.burst_gap)
+        lengths = bursts.lengths()[:-1]
+        for i in sorted((i for i, length in enumerate(lengths) if length > 10), key=lambda i: -lengths[i]):
+            longest = bursts.session(i, self.table)
+            if len(longest.counts) >= 2:
                 stats.longest_conversation = {
-                    'length': longest['length'],
-                    'participants': [p[0] for p in top_two],
-                    'date': longest['date']
+                    'length': longest.length,
+                    'participants': list(top_counts(longest.counts, 2)),
+                    'date': longest.start_time.strftime('%Y-%m-%d')
                 }
+                break
+
+        return stats
+
+
+class YearlyAccumulator:
+    """A StatsAccumulator per calendar year, so one parse reports every year.
+
+    Same add()/merge()/segment() interface as StatsAccumulator; finish()
+    returns the ChatStats of each year plus all-time totals.
+    """
+
+    def __init__(self, media_folder: str = 'media', word_sketch: Optional[int] = None):
+        self.media_folder = media_folder
+        self.word_sketch = word_sketch
+        self.years: Dict[int, StatsAccumulator] = {}
+
+    def add(self, msg: Message):
+        acc = self.years.get(msg.timestamp.year)
+        if acc is None:
+            acc = self.years[msg.timestamp.year] = StatsAccumulator(self.media_folder, self.word_sketch)
+        acc.add(msg)
+
+    def merge(self, other: 'YearlyAccumulator') -> 'YearlyAccumulator':
+        for year, acc in other.years.items():
+            if year in self.years:
+                self.years[year].merge(acc)
+            else:
+                self.years[year] = acc
+        return self
+
+    def segment(self):
+        for acc in self.years.values():
+            acc.segment()
+
+    def finish(self) -> tuple[Dict[int, ChatStats], ChatStats]:
+        """ChatStats per year (in year order) and for all years together."""
+        # Years follow each other in the export, so all-time is the years merged
+        # in order. merge() takes over the other side's state, so it gets copies.
+        all_time = StatsAccumulator(self.media_folder, self.word_sketch)
+        for year in sorted(self.years):
+            all_time.merge(pickle.loads(pickle.dumps(self.years[year], pickle.HIGHEST_PROTOCOL)))
+        by_year = {year: self.years[year].finish() for year in sorted(self.years)}
+        return by_year, all_time.finish()
+
+
+def _is_header_line(raw: bytes) -> bool:
+    """Whether a raw line (without its newline) starts a new message."""
+    line = raw.decode('utf-8', errors='replace')
+    # A lone \r splits the line when read as text, so it cannot be a boundary
+    return '\r' not in line.rstrip('\r') and MESSAGE_PATTERN.match(line.strip()) is not None
+
+
+def _chunk_offsets(file_path: str, chunks: int, start: int = 0, end: Optional[int] = None) -> List[int]:
+    """Split a byte range of a chat export into ranges that each start on a message header.
+
+    Returns the boundaries, starting at start and ending at end (the file size
+    by default). Continuation lines never start a range, so they stay with
+    their message.
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm) if end is None else end
+        offsets = [start]
+        for i in range(1, chunks):
+            pos = max(start + (size - start) * i // chunks, offsets[-1])
+            # Walk forward from the next line start to the next message header
+            pos = mm.find(b'\n', pos, size) + 1
+            while 0 < pos < size:
+                line_end = mm.find(b'\n', pos, size)
+                if line_end == -1:
+                    line_end = size
+                if _is_header_line(mm[pos:line_end]):
+                    break
+                pos = line_end + 1
+            if pos <= offsets[-1] or pos >= size:
+                break
+            offsets.append(pos)
+        offsets.append(size)
+    return offsets
+
+
+def last_header_offset(file_path: str, start: int = 0) -> Optional[int]:
+    """Byte offset of the last message header at or after start, if any."""
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        line_end = len(mm)
+        while line_end > start:
+            pos = max(mm.rfind(b'\n', start, line_end - 1) + 1, start)
+            if _is_header_line(mm[pos:line_end].rstrip(b'\n')):
+                return pos
+            line_end = pos
+    return None
+
+
+def iter_range_messages(file_path: str, start: int, end: int, year_filter: int,
+                        day_first: bool) -> Iterator[Message]:
+    """Yield the messages in one byte range of the export.
+
+    The range must start on a message header (see _chunk_offsets).
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        text = mm[start:end].decode('utf-8')
+    decoder = TimestampDecoder(day_first)
+    yield from _iter_messages_from_lines(io.StringIO(text, newline=None), year_filter, decoder)
+
+
+def accumulate_range(file_path: str, start: int, end: int, year_filter: int,
+                     media_folder: str, day_first: bool,
+                     word_sketch: Optional[int] = None) -> 'StatsAccumulator':
+    """Fold the messages in one byte range of the export (unfinished)."""
+    acc = StatsAccumulator(media_folder, word_sketch)
+    for msg in iter_range_messages(file_path, start, end, year_filter, day_first):
+        acc.add(msg)
+    return acc
+
+
+def accumulate_parallel(file_path: str, start: int, end: int, year_filter: int,
+                        media_folder: str, day_first: bool, workers: int,
+                        word_sketch: Optional[int] = None) -> 'StatsAccumulator':
+    """Fold a byte range of the export in a process pool (unfinished).
+
+    The range is split at message headers and the partial stats are merged in
+    file order, so the result is identical to accumulate_range.
+    """
+    offsets = _chunk_offsets(file_path, workers, start, end)
+    ranges = list(zip(offsets, offsets[1:]))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partials = pool.map(accumulate_range,
+                            [file_path] * len(ranges),
+                            [start for start, _ in ranges],
+                            [end for _, end in ranges],
+                            [year_filter] * len(ranges),
+                            [media_folder] * len(ranges),
+                            [day_first] * len(ranges),
+                            [word_sketch] * len(ranges))
+        acc = StatsAccumulator(media_folder, word_sketch)
+        for partial in partials:
+            acc.merge(partial)
+    return acc
+
+
+def compute_stats(file_path: str, year_filter: int = 2025, media_folder: str = 'media',
+                  workers: int = 1, word_sketch: Optional[int] = None) -> ChatStats:
+    """Stream a WhatsApp export straight into ChatStats without keeping the messages.
+
+    With workers > 1 the file is memory-mapped, split at message headers and
+    parsed in a process pool (see accumulate_parallel). With word_sketch, word
+    counts use bounded memory (see StatsAccumulator).
+    """
+    if workers <= 1 or os.path.getsize(file_path) == 0:
+        acc = StatsAccumulator(media_folder, word_sketch)
+        for msg in iter_messages(file_path, year_filter):
+            acc.add(msg)
+        return acc.finish()
+
+    # Date order is decided once for the whole file, not per chunk
+    day_first = detect_day_first(file_path)
+    size = os.path.getsize(file_path)
+    return accumulate_parallel(file_path, 0, size, year_filter, media_folder, day_first, workers,
+                               word_sketch).finish()
+
+
+def parse_whatsapp_chat(file_path: str, year_filter: int = 2025, media_folder: str = 'media') -> tuple[List[Message], ChatStats]:
+    """Parse WhatsApp chat export file and return messages and stats."""
+    messages = []
+    acc = StatsAccumulator(media_folder)
+    for msg in iter_messages(file_path, year_filter):
+        acc.add(msg)
+        # The tokens are only needed for folding; keep the stored messages small
+        msg.words = None
+        messages.append(msg)
+    return messages, acc.finish()
 
-    return messages, stats
+
+def split_by_year(messages: List[Message]) -> Dict[int, List[Message]]:
+    """Time-ordered messages as one list per year."""
+    by_year = {}
+    for year, group in itertools.groupby(messages, key=lambda msg: msg.timestamp.year):
+        by_year.setdefault(year, []).extend(group)
+    return by_year
+
+
+def parse_whatsapp_years(file_path: str, media_folder: str = 'media') -> tuple[List[Message], Dict[int, ChatStats], ChatStats]:
+    """Parse every year of a WhatsApp export at once.
+
+    Returns the messages, the ChatStats of each year and the all-time ChatStats.
+    """
+    messages = []
+    acc = YearlyAccumulator(media_folder)
+    for msg in iter_messages(file_path, year_filter=None):
+        acc.add(msg)
+        msg.words = None
+        messages.append(msg)
+    by_year, all_time = acc.finish()
+    return messages, by_year, all_time
 
 
 def stats_to_dict(stats: ChatStats) -> dict:
@@ -545,14 +1534,34 @@ def stats_to_dict(stats: ChatStats) -> dict:
         'peak_hour_datetime': stats.peak_hour_datetime,
         'unique_words_by_person': {k: list(v) for k, v in stats.unique_words_by_person.items()},
         'longest_conversation': stats.longest_conversation,
+        'response_times': {k: v.percentiles() for k, v in stats.response_times.items()},
+        'conversations_by_size': dict(stats.conversations_by_size),
+        'streaks': dict(stats.streaks),
+        'current_streaks': dict(stats.current_streaks),
+        'active_days_by_sender': dict(stats.active_days_by_sender),
+        'activity': stats.activity.to_dict() if stats.activity else None,
     }
 
 
 if __name__ == '__main__':
-    import sys
-
-    chat_file = sys.argv[1] if len(sys.argv) > 1 else 'chats.txt'
-    messages, stats = parse_whatsapp_chat(chat_file)
+    import argparse
+
+    ap = argparse.ArgumentParser(description='Parse a WhatsApp chat export into stats_2025.json')
+    ap.add_argument('chat_file', nargs='?', default='chats.txt')
+    ap.add_argument('-j', '--workers', type=int, default=1,
+                    help='parse in this many processes (useful for very large exports)')
+    ap.add_argument('--no-cache', action='store_true',
+                    help='parse the whole export instead of only what was appended since the last run')
+    ap.add_argument('--word-sketch', type=int, metavar='SLOTS',
+                    help='count words approximately in this many slots per table, for huge exports '
+                         '(counts are off by at most total words / SLOTS)')
+    args = ap.parse_args()
+
+    if args.no_cache:
+        stats = compute_stats(args.chat_file, workers=args.workers, word_sketch=args.word_sketch)
+    else:
+        from parse_cache import cached_compute_stats
+        stats = cached_compute_stats(args.chat_file, workers=args.workers, word_sketch=args.word_sketch)
 
     print(f"\n📊 WhatsApp Chat Stats for 2025")
     print("=" * 40)
@@ -561,7 +1570,7 @@ if __name__ == '__main__':
     print(f"Media shared: {stats.media_count}")
     print(f"Links shared: {stats.link_count}")
     print(f"\nTop senders:")
-    for sender, count in sorted(stats.messages_by_sender.items(), key=lambda x: x[1], reverse=True)[:10]:
+    for sender, count in top_counts(stats.messages_by_sender, 10).items():
         print(f"  {sender}: {count} messages")
 
     # Save stats to JSON
@@ -0,0 +1,64 @@
+"""
+Random picks for the Wrapped 2025 page.
+
+The gallery, the day grids and the person buttons each show a few random
+items out of many. Reservoir keeps a uniform sample of k items while the
+items stream past, so the full list is never copied or shuffled, and only
+O(k log(n/k)) random numbers are drawn. With a seeded random.Random the
+picks, and so the page, come out the same on every run.
+"""
+
+import math
+import random
+from typing import Iterable, List
+
+
+class Reservoir:
+    """Uniform random sample of up to k items from a stream (Li's Algorithm L).
+
+    Instead of drawing a number for every item, it draws how many items to
+    skip before the next one that gets in. The sample is in no particular
+    order; shuffle it if the order shows.
+    """
+
+    def __init__(self, k: int, rng: random.Random):
+        self.k = k
+        self.rng = rng
+        self.items: List = []
+        self.seen = 0
+        self._w = 1.0
+        self._next = 0  # index of the next item that gets in, once full
+
+    def _uniform(self) -> float:
+        """A random float in (0, 1)."""
+        u = self.rng.random()
+        while u == 0.0:
+            u = self.rng.random()
+        return u
+
+    def _skip(self):
+        self._w *= math.exp(math.log(self._uniform()) / self.k)
+        self._next += math.floor(math.log(self._uniform()) / math.log1p(-self._w)) + 1
+
+    def add(self, item):
+        index = self.seen
+        self.seen += 1
+        if index < self.k:
+            self.items.append(item)
+            if index == self.k - 1:
+                self._next = index
+                self._skip()
+        elif self.k and index == self._next:
+            self.items[self.rng.randrange(self.k)] = item
+            self._skip()
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.add(item)
+
+
+def reservoir_sample(items: Iterable, k: int, rng: random.Random) -> List:
+    """k items picked uniformly at random in one pass (all of them if fewer)."""
+    reservoir = Reservoir(k, rng)
+    reservoir.extend(items)
+    return reservoir.items
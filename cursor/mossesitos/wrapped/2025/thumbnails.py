@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Thumbnails and video previews for the Wrapped 2025 page.
+
+The gallery and day grids show media a few hundred pixels wide, so instead of
+the originals they get WebP thumbnails, and videos get a short, silent,
+low-bitrate looping preview plus a poster frame. Outputs go to media/thumbs/
+and are named by a hash of the original's content and the settings, so an
+unchanged file is never converted twice and a changed one never reuses a
+stale thumbnail. The originals are only loaded when a thumbnail is opened.
+
+Pillow makes the image thumbnails and ffmpeg the video previews; without one
+of them (or if a file can't be converted) that item keeps using the original.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from media_catalog import MediaCatalog
+
+THUMB_DIR = 'thumbs'
+THUMB_SIZE = 320        # longest side of image thumbnails, in pixels
+THUMB_QUALITY = 70
+PREVIEW_HEIGHT = 240    # video previews and posters
+PREVIEW_SECONDS = 4
+
+# Sidecar cache of content hashes keyed by file name, size and mtime (as the
+# catalog finds them on disk), so only new or changed originals are read in full
+HASH_CACHE_FILE = '.content_hashes.json'
+
+
+def content_hash(path: str) -> str:
+    """sha1 of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_image_thumb(src: str, dst: str, size: int = THUMB_SIZE, quality: int = THUMB_QUALITY):
+    """Shrink an image to fit size x size, upright, as WebP."""
+    from PIL import Image, ImageOps
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((size, size))
+        if im.mode not in ('RGB', 'RGBA'):
+            im = im.convert('RGB')
+        im.save(dst, 'WEBP', quality=quality, method=4)
+
+
+def make_video_preview(src: str, dst: str, poster: str, height: int = PREVIEW_HEIGHT,
+                       seconds: int = PREVIEW_SECONDS):
+    """The first seconds of a video, silent and small, plus its first frame as a JPEG poster."""
+    scale = f'scale=-2:{height}'
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-t', str(seconds), '-i', src, '-an', '-vf', scale,
+                    '-c:v', 'libx264', '-preset', 'veryfast', '-crf', '32', '-pix_fmt', 'yuv420p',
+                    '-movflags', '+faststart', dst], check=True, stdin=subprocess.DEVNULL)
+    subprocess.run(['ffmpeg', '-v', 'error', '-y', '-i', dst, '-frames:v', '1', '-q:v', '5', poster],
+                   check=True, stdin=subprocess.DEVNULL)
+
+
+def _can_make_images() -> bool:
+    try:
+        from PIL import Image  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _convert(job):
+    """Run one conversion into temporary files and move them into place."""
+    maker, src, outputs = job
+    tmp = [os.path.join(os.path.dirname(path), f'.tmp-{os.getpid()}-{os.path.basename(path)}') for path in outputs]
+    try:
+        maker(src, *tmp)
+        for tmp_path, path in zip(tmp, outputs):
+            os.replace(tmp_path, path)
+        return True
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        for tmp_path in tmp:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return False
+
+
+def build_thumbnails(filenames: Iterable[str], media_folder: str = 'media', workers: Optional[int] = None,
+                     catalog: Optional[MediaCatalog] = None) -> Dict[str, dict]:
+    """Make (or reuse) thumbnails for these media files, converting in a thread pool.
+
+    Returns {filename: {'src': thumbnail or preview path}} plus a 'poster'
+    for videos, with paths as the page uses them ('media/thumbs/...'). Files
+    that are missing or couldn't be converted are left out.
+    """
+    if catalog is None:
+        catalog = MediaCatalog.load(media_folder)
+    thumb_folder = os.path.join(media_folder, THUMB_DIR)
+    page_folder = f'{os.path.basename(os.path.normpath(media_folder))}/{THUMB_DIR}'
+    images, videos = _can_make_images(), shutil.which('ffmpeg') is not None
+
+    cache_path = os.path.join(media_folder, HASH_CACHE_FILE)
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    cache_changed = False
+    try:
+        existing = set(os.listdir(thumb_folder))
+    except OSError:
+        existing = set()
+
+    thumbs, jobs = {}, []
+    for filename in dict.fromkeys(filenames):
+        is_video = filename.startswith('VID-')
+        if not (videos if is_video else images):
+            continue
+        src = os.path.join(media_folder, filename)
+        entry = catalog.fresh(filename)
+        if entry is None:
+            continue
+        key = [entry.size, entry.mtime_ns]
+        cached = cache.get(filename)
+        if cached and cached[:2] == key:
+            digest = cached[2]
+        else:
+            try:
+                digest = content_hash(src)
+            except OSError:
+                continue
+            cache[filename] = key + [digest]
+            cache_changed = True
+
+        if is_video:
+            stem = f'{digest[:20]}-{PREVIEW_HEIGHT}p{PREVIEW_SECONDS}s'
+            names = (f'{stem}.mp4', f'{stem}.jpg')
+            maker = make_video_preview
+        else:
+            names = (f'{digest[:20]}-{THUMB_SIZE}.webp',)
+            maker = make_image_thumb
+        if not existing.issuperset(names):
+            jobs.append((filename, (maker, src, [os.path.join(thumb_folder, name) for name in names])))
+        thumbs[filename] = dict(zip(('src', 'poster'), (f'{page_folder}/{name}' for name in names)))
+
+    if jobs:
+        os.makedirs(thumb_folder, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            for (filename, _), ok in zip(jobs, pool.map(_convert, [job for _, job in jobs])):
+                if not ok:
+                    del thumbs[filename]
+
+    if cache_changed:
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(cache, f)
+        except OSError:
+            pass
+
+    return thumbs
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description='Make thumbnails for every image and video in the media folder')
+    ap.add_argument('media_folder', nargs='?', default='media')
+    ap.add_argument('-j', '--workers', type=int, help='conversions to run at once (default: one per CPU)')
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+    catalog = MediaCatalog.load(args.media_folder)
+    names = sorted(name for name, entry in catalog.files.items() if entry.kind in ('image', 'video'))
+    thumbs = build_thumbnails(names, args.media_folder, args.workers, catalog)
+    print(f"{len(thumbs)}/{len(names)} thumbnails ready in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,177 @@
+"""
+Top-K helpers for the Wrapped 2025 stats.
+
+top_n() and friends pick the head (or tail) of a ranking with a heap instead
+of sorting everything, and break ties the same way a stable sort does.
+
+SpaceSaving keeps approximate word counts in bounded memory: only the
+`capacity` most frequent items are tracked, and a new item takes over the
+slot of the least frequent one. Every item seen more than total / capacity
+times is guaranteed to be kept, and no count is off by more than that, so
+with a capacity well above the length of the lists we show (500 words, top 5
+per person) the lists come out the same as with exact counts.
+"""
+
+import heapq
+from operator import itemgetter
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class SpaceSaving:
+    """Space-Saving heavy-hitters counter (Metwally et al.).
+
+    Counts are upper bounds on the true counts; `errors[item]` is how much of
+    a count may be overestimated. Items are kept in the order they were
+    (last) admitted, so ties sort the same way as a plain dict of counts.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+        self.capacity = capacity
+        self.total = 0
+        self.counts: Dict[Hashable, int] = {}
+        self.errors: Dict[Hashable, int] = {}
+        # One (count, item) entry per tracked item. Increments don't touch the
+        # heap, so an entry may be stale (too low); _min() fixes those lazily.
+        self._heap = []
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __getitem__(self, item):
+        return self.counts[item]
+
+    def items(self) -> Iterable[Tuple[Hashable, int]]:
+        return self.counts.items()
+
+    def keys(self) -> Iterable[Hashable]:
+        return self.counts.keys()
+
+    def _min(self) -> Tuple[int, Hashable]:
+        """The (count, item) with the smallest count."""
+        heap, counts = self._heap, self.counts
+        while True:
+            count, item = heap[0]
+            current = counts[item]
+            if current == count:
+                return count, item
+            heapq.heapreplace(heap, (current, item))
+
+    def add(self, item: Hashable, count: int = 1):
+        """Count `count` more occurrences of `item`."""
+        self.total += count
+        counts = self.counts
+        if item in counts:
+            counts[item] += count
+            return
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+            heapq.heappush(self._heap, (count, item))
+            return
+
+        # Full: the new item inherits the smallest count as its error
+        floor, victim = self._min()
+        del counts[victim]
+        del self.errors[victim]
+        counts[item] = floor + count
+        self.errors[item] = floor
+        heapq.heapreplace(self._heap, (floor + count, item))
+
+    def update(self, counts: Dict[Hashable, int]):
+        """Count a batch of exact {item: count} tallies at once.
+
+        The same as merge() with a counter that missed nothing, done in
+        place: one pass over the batch and one trim, instead of an eviction
+        per item.
+        """
+        floor = self.floor()
+        mine, errors = self.counts, self.errors
+        for item, count in counts.items():
+            self.total += count
+            if item in mine:
+                mine[item] += count
+            else:
+                mine[item] = floor + count
+                errors[item] = floor
+        excess = len(mine) - self.capacity
+        if excess > 0:
+            # Keep what top_counts() would: everything above the cut-off count,
+            # then the earliest of the items tied at it
+            cutoff = sorted(mine.values())[excess - 1]
+            ties = sum(1 for c in mine.values() if c > cutoff) - self.capacity
+            kept = {}
+            for item, c in mine.items():
+                if c > cutoff or (c == cutoff and ties < 0):
+                    kept[item] = c
+                    if c == cutoff:
+                        ties += 1
+            self.counts = kept
+            self.errors = {item: errors[item] for item in kept}
+        self._heap = [(c, item) for item, c in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def floor(self) -> int:
+        """Most an untracked item can have been seen (0 while not full)."""
+        if len(self.counts) < self.capacity:
+            return 0
+        return self._min()[0]
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Fold in a counter over a later part of the stream, in place.
+
+        An item missing from one side may have been seen up to that side's
+        floor() times there, which keeps counts upper bounds after the merge.
+        """
+        mine, theirs = self.floor(), other.floor()
+        counts, errors = {}, {}
+        for item in _union(self.counts, other.counts):
+            counts[item] = self.counts.get(item, mine) + other.counts.get(item, theirs)
+            errors[item] = self.errors.get(item, mine) + other.errors.get(item, theirs)
+
+        if len(counts) > self.capacity:
+            kept = top_counts(counts, self.capacity)
+            counts = {item: c for item, c in counts.items() if item in kept}
+            errors = {item: errors[item] for item in counts}
+
+        self.total += other.total
+        self.counts, self.errors = counts, errors
+        self._heap = [(c, item) for item, c in counts.items()]
+        heapq.heapify(self._heap)
+        return self
+
+
+def _union(first: dict, second: dict) -> Iterable[Hashable]:
+    """Keys of both dicts, first-seen order."""
+    yield from first
+    for key in second:
+        if key not in first:
+            yield key
+
+
+def top_n(items: Iterable, n: int, key: Optional[Callable] = None) -> list:
+    """The n largest items, largest first; earlier items win ties.
+
+    Same result as sorted(items, key=key, reverse=True)[:n], but a heap of n
+    items is kept instead of sorting everything.
+    """
+    return heapq.nlargest(n, items, key=key)
+
+
+def bottom_n(items: Iterable, n: int, key: Optional[Callable] = None) -> list:
+    """The n smallest items, smallest first; earlier items win ties."""
+    return heapq.nsmallest(n, items, key=key)
+
+
+def top_counts(counts, n: int) -> dict:
+    """The n highest counts of a {key: count} mapping, highest first."""
+    return dict(top_n(counts.items(), n, key=itemgetter(1)))
+
+
+def bottom_counts(counts, n: int) -> dict:
+    """The n lowest counts of a {key: count} mapping, lowest first."""
+    return dict(bottom_n(counts.items(), n, key=itemgetter(1)))
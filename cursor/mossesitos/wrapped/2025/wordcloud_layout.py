@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Word cloud layout for Wrapped 2025.
+
+Places words the way the wordcloud package does (biggest first, each at a
+uniformly random free spot, shrinking or turning it when it doesn't fit), but
+keeps the placements: the word, its font size, where its ink sits and its
+colour. Those are saved in .wordcloud_cache/ under a key of the frequencies,
+the canvas size, the font and the settings, so the same cloud is never laid
+out twice. From a layout, to_svg() and to_png() draw the cloud directly at
+any scale.
+
+The canvas is tracked as one int per pixel row, one bit per pixel, with the
+actual glyphs marked in it, so small words still fit between the letters of
+big ones. Pillow measures and draws the text.
+"""
+
+import functools
+import hashlib
+import json
+import os
+import random
+from typing import Dict, List, NamedTuple, Optional
+
+CACHE_DIR = '.wordcloud_cache'
+LAYOUT_VERSION = 1
+DEFAULT_FONT = 'DejaVuSans.ttf'
+
+# matplotlib's plasma colormap at 0, 0.1, ..., 1
+PLASMA = ['#0d0887', '#41049d', '#6a00a8', '#8f0da4', '#b12a90', '#cc4778',
+          '#e16462', '#f2844b', '#fca636', '#fcce25', '#f0f921']
+
+# Any non-zero (inked) byte becomes '1', blank ones '0'
+_INK_BITS = bytes([48] + [49] * 255)
+
+
+class Placement(NamedTuple):
+    word: str
+    count: int
+    size: int       # font size in pixels
+    x: int          # top left corner of the ink, on the canvas
+    y: int
+    width: int      # ink size as placed (so swapped for vertical words)
+    height: int
+    vertical: bool  # turned 90 degrees, reading bottom to top
+    left: int       # ink box of the horizontal text, relative to its baseline origin
+    top: int
+    color: str
+
+
+class Layout(NamedTuple):
+    width: int
+    height: int
+    font: str
+    font_family: str
+    placements: List[Placement]
+
+
+@functools.lru_cache(maxsize=None)
+def _font(font_path: Optional[str], size: int):
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(font_path or DEFAULT_FONT, size)
+    except OSError:
+        if font_path:
+            raise
+        return ImageFont.load_default(size)
+
+
+def _glyph_mask(word: str, font, vertical: bool):
+    """The word's ink as an 'L' image cropped to it, and the ink box relative to the baseline origin."""
+    from PIL import Image, ImageDraw
+    left, top, right, bottom = font.getbbox(word, anchor='ls')
+    mask = Image.new('L', (max(1, right - left), max(1, bottom - top)))
+    ImageDraw.Draw(mask).text((-left, -top), word, fill=255, font=font, anchor='ls')
+    if vertical:
+        mask = mask.transpose(Image.Transpose.ROTATE_90)
+    return mask, left, top
+
+
+def _row_bits(mask, x: int) -> List[int]:
+    """The mask's rows as bitmasks, shifted to start at column x."""
+    width = mask.width
+    data = mask.tobytes()
+    return [int(data[i:i + width].translate(_INK_BITS)[::-1], 2) << x for i in range(0, len(data), width)]
+
+
+def _free_spots(rows: List[int], width: int, box_w: int, box_h: int) -> List[int]:
+    """For every top row y, a bitmask of the columns x where a box_w x box_h box is free."""
+    height = len(rows)
+    if box_w > width or box_h > height:
+        return []
+    # Bit x of a row becomes the OR of bits x..x+box_w-1, then the same down box_h rows
+    spans = []
+    for row in rows:
+        span = 1
+        while span < box_w:
+            step = min(span, box_w - span)
+            row |= row >> step
+            span += step
+        spans.append(row)
+    span = 1
+    while span < box_h:
+        step = min(span, box_h - span)
+        spans = [a | b for a, b in zip(spans, spans[step:])]
+        span += step
+    valid = (1 << (width - box_w + 1)) - 1
+    return [~row & valid for row in spans]
+
+
+def _pick_spot(free: List[int], rng: random.Random):
+    """A uniformly random (x, y) among the free spots, or None."""
+    counts = [row.bit_count() for row in free]
+    total = sum(counts)
+    if not total:
+        return None
+    index = rng.randrange(total)
+    for y, count in enumerate(counts):
+        if index < count:
+            row = free[y]
+            for _ in range(index):
+                row &= row - 1
+            return (row & -row).bit_length() - 1, y
+        index -= count
+
+
+def _color(rng: random.Random) -> str:
+    """A random colour along the plasma colormap."""
+    position = rng.random() * (len(PLASMA) - 1)
+    i = min(int(position), len(PLASMA) - 2)
+    t = position - i
+    a, b = (tuple(int(c[k:k + 2], 16) for k in (1, 3, 5)) for c in PLASMA[i:i + 2])
+    return '#' + ''.join(f'{round(p + (q - p) * t):02x}' for p, q in zip(a, b))
+
+
+def layout_words(frequencies: Dict[str, int], width: int = 800, height: int = 500, font_path: Optional[str] = None,
+                 max_words: int = 500, min_font_size: int = 8, max_font_size: int = 120,
+                 prefer_horizontal: float = 0.7, relative_scaling: float = 0.5, margin: int = 5,
+                 seed: int = 0) -> Layout:
+    """Place the most frequent words on a width x height canvas.
+
+    Same settings as WordCloud: each word's font size follows the previous
+    one scaled by relative_scaling of their frequency ratio; a word that
+    doesn't fit is tried turned, then one pixel smaller, and the layout
+    stops at the first word that doesn't fit at min_font_size.
+    """
+    rng = random.Random(seed)
+    words = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:max_words]
+    rows = [0] * height
+    placements = []
+    if not words:
+        return Layout(width, height, font_path or DEFAULT_FONT, 'sans-serif', placements)
+
+    font_size = max_font_size
+    last_freq = 1.0
+    top_count = words[0][1]
+    for word, count in words:
+        freq = count / top_count
+        if relative_scaling:
+            font_size = int(round((relative_scaling * (freq / last_freq) + (1 - relative_scaling)) * font_size))
+        vertical = rng.random() >= prefer_horizontal
+        tried_turning = False
+        while font_size >= min_font_size:
+            mask, left, top = _glyph_mask(word, _font(font_path, font_size), vertical)
+            spot = _pick_spot(_free_spots(rows, width, mask.width + margin, mask.height + margin), rng)
+            if spot is not None:
+                break
+            if not tried_turning and prefer_horizontal < 1:
+                vertical, tried_turning = not vertical, True
+            else:
+                font_size -= 1
+                vertical = False
+        if font_size < min_font_size:
+            break
+
+        x, y = spot[0] + margin // 2, spot[1] + margin // 2
+        for i, bits in enumerate(_row_bits(mask, x)):
+            if y + i < height:
+                rows[y + i] |= bits
+        placements.append(Placement(word, count, font_size, x, y, mask.width, mask.height, vertical,
+                                    left, top, _color(rng)))
+        last_freq = freq
+
+    family = _font(font_path, min_font_size).getname()[0]
+    return Layout(width, height, font_path or DEFAULT_FONT, family, placements)
+
+
+def cached_layout(frequencies: Dict[str, int], width: int = 800, height: int = 500, font_path: Optional[str] = None,
+                  max_words: int = 500, min_font_size: int = 8, max_font_size: int = 120,
+                  prefer_horizontal: float = 0.7, relative_scaling: float = 0.5, margin: int = 5,
+                  seed: int = 0, cache_dir: str = CACHE_DIR) -> Layout:
+    """layout_words(), saved in cache_dir and reused for the same frequencies, size, font and settings."""
+    words = sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))[:max_words]
+    settings = [max_words, min_font_size, max_font_size, prefer_horizontal, relative_scaling, margin, seed]
+    key = json.dumps([LAYOUT_VERSION, words, width, height, font_path or DEFAULT_FONT, settings], ensure_ascii=False)
+    path = os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        return Layout(*saved[:4], [Placement(*p) for p in saved[4]])
+    except (OSError, ValueError, TypeError):
+        pass
+
+    layout = layout_words(dict(words), width, height, font_path, *settings)
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(layout, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return layout
+
+
+def to_svg(layout: Layout, background: str = '#1a1a2e') -> str:
+    """The cloud as an SVG document, text and all."""
+    from html import escape
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {layout.width} {layout.height}" '
+             f'width="{layout.width}" height="{layout.height}" font-family="{escape(layout.font_family)}, sans-serif">',
+             f'<rect width="100%" height="100%" fill="{background}"/>']
+    for p in layout.placements:
+        if p.vertical:
+            # Turned about the baseline origin, which lands at (x - top, y + right)
+            origin = f'transform="translate({p.x - p.top} {p.y + p.left + p.height}) rotate(-90)"'
+        else:
+            origin = f'x="{p.x - p.left}" y="{p.y - p.top}"'
+        parts.append(f'<text {origin} font-size="{p.size}" fill="{p.color}">{escape(p.word)}</text>')
+    parts.append('</svg>\n')
+    return '\n'.join(parts)
+
+
+def to_png(layout: Layout, output_file: str, background: str = '#1a1a2e', scale: float = 2):
+    """Draw the cloud straight into a PNG, scale times the layout's size."""
+    from PIL import Image, ImageDraw
+    image = Image.new('RGB', (round(layout.width * scale), round(layout.height * scale)), background)
+    draw = ImageDraw.Draw(image)
+    font_path = None if layout.font == DEFAULT_FONT else layout.font
+    for p in layout.placements:
+        font = _font(font_path, max(1, round(p.size * scale)))
+        x, y = round(p.x * scale), round(p.y * scale)
+        if p.vertical:
+            mask = _glyph_mask(p.word, font, True)[0]
+            image.paste(p.color, (x, y, x + mask.width, y + mask.height), mask)
+        else:
+            left, top = font.getbbox(p.word, anchor='ls')[:2]
+            draw.text((x - left, y - top), p.word, fill=p.color, font=font, anchor='ls')
+    image.save(output_file, optimize=True)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    ap = argparse.ArgumentParser(description='Lay out the word cloud from a stats file and draw it')
+    ap.add_argument('stats_file', nargs='?', default='stats_2025.json')
+    ap.add_argument('output_file', nargs='?', default='wordcloud.svg', help='.svg or .png')
+    ap.add_argument('--font', help=f'TrueType font to use (default: {DEFAULT_FONT})')
+    args = ap.parse_args()
+
+    with open(args.stats_file, 'r', encoding='utf-8') as f:
+        top_words = json.load(f).get('top_words', {})
+    start = time.perf_counter()
+    layout = cached_layout(top_words, font_path=args.font)
+    print(f"{len(layout.placements)}/{len(top_words)} words placed in {time.perf_counter() - start:.2f}s")
+    if args.output_file.endswith('.svg'):
+        with open(args.output_file, 'w', encoding='utf-8') as f:
+            f.write(to_svg(layout))
+    else:
+        to_png(layout, args.output_file)
+    print(f"Word cloud saved to {args.output_file}")
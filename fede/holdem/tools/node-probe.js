@@ -0,0 +1,98 @@
+// Plays one ?autotest run of index.html's own game script under node, with a
+// do-nothing DOM and virtual timers, and prints the title it leaves behind:
+// Chrome's --virtual-time-budget run without Chrome. sweep.py --node drives it.
+//
+//   node tools/node-probe.js index.html "?room=5&autotest&nosw" 200000 SEED
+const fs = require('fs'), vm = require('vm');
+const [,, file, query, budget = '200000', seedArg] = process.argv;
+const html = fs.readFileSync(file, 'utf8');
+let src = html.slice(html.indexOf('<script>') + 8, html.lastIndexOf('</script>'));
+// memoize posAtE on the guest (same result, it is a pure function of dist/pathI/lat)
+const memo = 'const posAtE = e => {\n  if (e._pd === e.dist && e._pp === e.pathI && e._pl === e.lat) return e._pos;\n  e._pd = e.dist; e._pp = e.pathI; e._pl = e.lat;\n  return (e._pos = posAtE0(e));\n};\nconst posAtE0 = e => {';
+if (!src.includes('const posAtE = e => {')) throw new Error('posAtE not found');
+src = src.replace('const posAtE = e => {', memo);
+
+// seeded Math.random so runs are reproducible
+let s = (seedArg === undefined ? Date.now() : +seedArg) >>> 0;
+const rnd = () => { s = (s + 0x6D2B79F5) >>> 0; let t = s; t = Math.imul(t ^ t >>> 15, t | 1); t ^= t + Math.imul(t ^ t >>> 7, t | 61); return ((t ^ t >>> 14) >>> 0) / 4294967296; };
+
+// cubic-only SVG path geometry, flattened like tools/sim.py
+function pathGeom(d) {
+  const nums = (d.match(/-?\d*\.?\d+/g) || []).map(Number);
+  let x = nums[0], y = nums[1]; const poly = [[x, y]];
+  for (let i = 2; i + 5 < nums.length; i += 6) {
+    const [x1, y1, x2, y2, x3, y3] = nums.slice(i, i + 6);
+    for (let k = 1; k <= 256; k++) {
+      const t = k / 256, u = 1 - t, a = u*u*u, b = 3*u*u*t, c = 3*u*t*t, w = t*t*t;
+      poly.push([a*x + b*x1 + c*x2 + w*x3, a*y + b*y1 + c*y2 + w*y3]);
+    }
+    x = x3; y = y3;
+  }
+  const cum = [0];
+  for (let i = 1; i < poly.length; i++) cum.push(cum[i-1] + Math.hypot(poly[i][0]-poly[i-1][0], poly[i][1]-poly[i-1][1]));
+  return { len: cum[cum.length-1], at(dd) {
+    let lo = 0, hi = cum.length - 1;
+    while (hi - lo > 1) { const m = (lo + hi) >> 1; if (cum[m] < dd) lo = m; else hi = m; }
+    const j = Math.min(lo, cum.length - 2), seg = cum[j+1] - cum[j] || 1, f = (dd - cum[j]) / seg;
+    return { x: poly[j][0] + (poly[j+1][0]-poly[j][0]) * f, y: poly[j][1] + (poly[j+1][1]-poly[j][1]) * f };
+  } };
+}
+
+const noop = () => {};
+function el(tag) {
+  const attrs = {}, style = { setProperty: noop, removeProperty: noop };
+  const o = {
+    tagName: tag, attrs, style, children: [], childNodes: [], dataset: {}, textContent: '', innerHTML: '', value: '',
+    classList: { add: noop, remove: noop, toggle: noop, contains: () => false },
+    setAttribute(k, v) { attrs[k] = String(v); }, getAttribute(k) { return attrs[k] ?? null; }, removeAttribute(k) { delete attrs[k]; },
+    appendChild(c) { this.children.push(c); c.parentNode = this; return c; }, insertBefore(c) { return c; }, append: noop, prepend: noop,
+    remove: noop, removeChild: noop, replaceChildren: noop, addEventListener: noop, removeEventListener: noop,
+    dispatchEvent(ev) { (handlers.get(o) || {})[ev.type]?.forEach(f => f(ev)); return true; },
+    querySelector: () => el('q'), querySelectorAll: () => [], closest: () => null, cloneNode() { return el(tag); },
+    getBoundingClientRect: () => ({ left: 0, top: 0, width: 1120, height: 630, right: 1120, bottom: 630 }),
+    offsetWidth: 1, offsetHeight: 1, clientWidth: 1120, clientHeight: 630, focus: noop, blur: noop, animate: () => ({ onfinish: null }),
+    getTotalLength() { return pathGeom(attrs.d).len; }, getPointAtLength(dd) { return (this._g && this._d === attrs.d ? this._g : (this._d = attrs.d, this._g = pathGeom(attrs.d))).at(dd); },
+    getBBox: () => ({ x: 0, y: 0, width: 10, height: 10 }), getScreenCTM: () => ({ inverse: () => ({}) }), createSVGPoint: () => ({ matrixTransform: () => ({ x: 0, y: 0 }) }),
+    getContext: () => new Proxy({}, { get: () => noop }),
+  };
+  o.parentNode = { insertBefore: noop, removeChild: noop };
+  return o;
+}
+const handlers = new Map();
+const ids = {};
+const byId = id => ids[id] || (ids[id] = (() => { const e = el('div'); e.id = id;
+  const add = e.addEventListener; e.addEventListener = (t, f) => { const h = handlers.get(e) || {}; (h[t] = h[t] || []).push(f); handlers.set(e, h); };
+  if (id === 'carpet') e.children = [el('r'), el('r'), el('r'), el('r')];
+  return e; })());
+const document = {
+  getElementById: byId, createElement: el, createElementNS: (ns, t) => el(t), title: '',
+  querySelector: () => null, querySelectorAll: () => [], addEventListener: noop, body: el('body'), head: el('head'),
+};
+let now = 0, seq = 0; const timers = [];
+const addT = (f, ms, rep) => { const t = { f, ms: Math.max(0, ms|0), rep, at: now + Math.max(0, ms|0), seq: seq++, id: seq }; timers.push(t); return t.id; };
+const ctx = {
+  document, console, Math: Object.create(Math, { random: { value: rnd } }), JSON, Object, Array, Set, Map, Number, String, Boolean, Date, RegExp, Error, Promise, Symbol, parseInt, parseFloat, isNaN, Infinity, NaN,
+  location: { search: query, href: '', pathname: '/', protocol: 'file:', reload() { throw new Error('reload'); } },
+  localStorage: { getItem: () => null, setItem: noop, removeItem: noop }, sessionStorage: { getItem: () => null, setItem: noop, removeItem: noop, clear: noop },
+  navigator: {}, performance: { now: () => now }, requestAnimationFrame: noop, cancelAnimationFrame: noop,
+  setTimeout: (f, ms) => addT(f, ms, false), setInterval: (f, ms) => addT(f, ms, true),
+  clearTimeout: id => { const i = timers.findIndex(t => t.id === id); if (i >= 0) timers.splice(i, 1); }, clearInterval: id => { const i = timers.findIndex(t => t.id === id); if (i >= 0) timers.splice(i, 1); },
+  innerWidth: 1280, innerHeight: 600, addEventListener: noop, Event: function (type) { this.type = type; }, getComputedStyle: () => ({}),
+  matchMedia: () => ({ matches: false, addEventListener: noop }),
+};
+ctx.window = ctx; ctx.self = ctx;
+vm.createContext(ctx);
+vm.runInContext(src, ctx, { filename: 'index.html' });
+// drawing only: skip it
+for (const f of ['emit', 'float', 'fxRing', 'poof', 'confettiBurst', 'bolt', 'banner', 'updateHUD', 'fxDoor', 'applyTowerLook', 'spawnPuke0']) ctx[f] = noop;
+const B = +budget;
+while (timers.length) {
+  let k = 0;
+  for (let i = 1; i < timers.length; i++) if (timers[i].at < timers[k].at || (timers[i].at === timers[k].at && timers[i].seq < timers[k].seq)) k = i;
+  const t = timers[k];
+  if (t.at > B) break;
+  now = t.at;
+  if (t.rep) { t.at += t.ms || 1; t.seq = seq++; } else timers.splice(k, 1);
+  t.f();
+}
+console.log(document.title);
@@ -0,0 +1,927 @@
+#!/usr/bin/env python3
+"""Headless balance simulator.
+
+Plays the ?autotest bot against a pure-Python copy of the game's combat model:
+the lanes, waves, guests, tables and projectiles of stepSim() in index.html,
+minus everything that only draws. The data is not copied by hand: TTYPES /
+TSPEC / ETYPES / ROOMS come from the same dump housebook-extract.py makes, so a
+tuned `diff` or a new tier is in the next run.
+
+    python3 tools/sim.py --floor 12                       # one run, wave by wave
+    python3 tools/sweep.py --sim --trials 100000 --floors 12 --out /tmp/sim.json
+    python3 tools/sim.py --calibrate /tmp/chrome.json    # against a Chrome sweep
+    python3 tools/sim.py --calibrate tools/calibration.json   # against the node one
+
+The rules (OPENER, BOSS_BITE, the escrow share, radii and timings) are copied
+from index.html; change them there and here together, then re-run --calibrate.
+"""
+import argparse, json, math, os, random, re, subprocess, sys, time
+
+EXTRACT = '/tmp/_holdem_extract.json'
+HERE = os.path.dirname(os.path.abspath(__file__))
+GAME = os.path.join(HERE, '..', 'index.html')
+STEP = 4                       # setLanes() samples a lane every 4px
+OPENER = [.45, .62, .8, .92]   # startWave(): the opening waves ramp in
+BOSS_BITE = .30
+ESCROW_SHARE = .65
+CELL = 40                      # grid the card/chip hit tests look guests up in
+
+def rnd(v):
+    """Math.round."""
+    return math.floor(v + .5)
+
+def tables(src=GAME):
+    """The data tables, re-extracted whenever index.html is newer than the dump."""
+    if not os.path.exists(EXTRACT) or os.path.getmtime(EXTRACT) < os.path.getmtime(src):
+        # the extractor reads index.html from the current directory
+        subprocess.run([sys.executable, os.path.join(HERE, 'housebook-extract.py')],
+                       cwd=os.path.dirname(os.path.abspath(src)), check=True, stdout=subprocess.DEVNULL)
+    return json.load(open(EXTRACT))['data']
+
+# ── lanes ─────────────────────────────────────────────────────────────────
+
+class Lane:
+    """One lane as setLanes() samples it: a point every STEP px of its length,
+    and the unit normal posAtE() offsets each guest along."""
+    def __init__(self, d, kill_offset):
+        nums = [float(v) for v in re.findall(r'-?\d*\.?\d+', d)]
+        x, y = nums[0], nums[1]
+        poly = [(x, y)]
+        for i in range(2, len(nums) - 5, 6):       # M x y, then C x1 y1, x2 y2, x y ...
+            x1, y1, x2, y2, x3, y3 = nums[i:i + 6]
+            for k in range(1, 257):
+                t = k / 256; u = 1 - t
+                a, b, c, w = u * u * u, 3 * u * u * t, 3 * u * t * t, t * t * t
+                poly.append((a * x + b * x1 + c * x2 + w * x3, a * y + b * y1 + c * y2 + w * y3))
+            x, y = x3, y3
+        cum = [0.0]
+        for (ax, ay), (bx, by) in zip(poly, poly[1:]):
+            cum.append(cum[-1] + math.hypot(bx - ax, by - ay))
+        self.len = cum[-1]
+        self.kill_at = self.len - kill_offset
+        pts, j, dd = [], 0, 0
+        while dd <= self.len:
+            while j < len(cum) - 2 and cum[j + 1] < dd: j += 1
+            f = (dd - cum[j]) / (cum[j + 1] - cum[j] or 1)
+            (ax, ay), (bx, by) = poly[j], poly[j + 1]
+            pts.append((ax + (bx - ax) * f, ay + (by - ay) * f))
+            dd += STEP
+        self.pts = pts
+        self.n = n = len(pts)
+        self.xs, self.ys, self.nx, self.ny = [p[0] for p in pts], [p[1] for p in pts], [], []
+        for i in range(n):
+            a, b = pts[max(0, i - 2)], pts[min(n - 1, i + 2)]
+            dx, dy = b[0] - a[0], b[1] - a[1]
+            ln = math.hypot(dx, dy) or 1
+            self.nx.append(-dy / ln); self.ny.append(dx / ln)
+
+# ── guests and tables ─────────────────────────────────────────────────────
+
+class Enemy:
+    __slots__ = ('id', 'type', 'E', 'lane', 'pathI', 'dist', 'x', 'y', 'hp', 'hpMax', 'lat', 'pace',
+                 'armor', 'slowFac', 'slowUntil', 'stunCd', 'dead', 'mate', 'enraged', 'hitN',
+                 'poisonUntil', 'poisonDps', 'plague', 'pukeSrc', 'pukeCd', 'spreadT', 'exposed',
+                 'exposedUntil', 'shoveImm', 'frzImm', 'blinkT', 'skipT', 'papT', 'showT',
+                 'beast', 'print', 'encored',
+                 # E's fields, read every step: refreshed by retype() whenever E is swapped
+                 'speed', 'boss', 'capped', 'haste', 'heal', 'enrage', 'blink', 'skip', 'special',
+                 'comp', 'dodge', 'countDodge', 'enrageOnHit')
+
+    def retype(self):
+        E = self.E
+        self.speed = E['speed']
+        self.boss = bool(E.get('boss'))
+        self.capped = self.boss and not E.get('mini')
+        self.haste = E.get('aura') == 'haste'
+        self.heal = E.get('pairHeal') or 0
+        self.enrage = E.get('enrage')
+        self.blink, self.skip = E.get('blink'), E.get('skip')
+        self.special = E.get('special') if E.get('special') in ('stun', 'flash') else None
+        self.comp, self.dodge, self.countDodge = E.get('comp'), E.get('dodge'), E.get('countDodge')
+        self.enrageOnHit = E.get('enrageOnHit')
+
+    def place(self):
+        """posAtE(), cached: call after every change of dist or lane."""
+        L = self.lane
+        i = int(self.dist * .25 + .5) if self.dist > 0 else 0
+        if i >= L.n: i = L.n - 1
+        self.x = L.xs[i] + L.nx[i] * self.lat
+        self.y = L.ys[i] + L.ny[i] * self.lat
+
+class Tower:
+    __slots__ = ('type', 'x', 'y', 'lvl', 'path', 'cool', 'stunUntil', 'prio', 's', 'range', 'rr')
+
+# ── one floor ─────────────────────────────────────────────────────────────
+
+class Game:
+    """One floor of the campaign under the autotest bot, timed like headless Chrome."""
+
+    def __init__(self, D, floor, seed=None, baseline=False, alt=None, vi=None):
+        self.D = D
+        self.ET, self.TT, self.TS = D['ETYPES'], D['TTYPES'], D['TSPEC']
+        self.rand = random.Random(seed).random
+        rooms = D['ROOMS']
+        i = self.room = min(len(rooms) - 1, max(0, floor - 1))
+        base = rooms[i]
+        R = dict(base, **base['alt']) if alt == 'b' and base.get('alt') else base
+        # initRoom(): the layout is seeded per floor (a fresh profile has unlocked=1)
+        s = float((i * 7919 + 1 * 131 + (977 if alt == 'b' else 0)) & 0xffffffff)
+        s = (s * 1103515245 + 12345) % 2147483648
+        if vi is None: vi = math.floor(s / 2147483648 * len(R['variants']))
+        self.vi = vi = min(vi, len(R['variants']) - 1)
+        V = R['variants'][vi]
+        self.lanes = [Lane(d, V['killOffset']) for d in V['lanes']]
+        self.waves = R['waves']
+        self.hpMul, self.diff = R['hpMul'], R.get('diff') or 1
+        self.pay = 1 + (R['hpMul'] - 1) * .75
+        self.pow = 1 + min(i, len(rooms)) * .22
+        # familiarity(): every guest toughens 5% a floor after its debut, capped at 2x
+        intro = {}
+        for k, r in enumerate(rooms):
+            for t, *_ in (w for wave in r['waves'] for w in wave):
+                for t2 in (['honey', 'groom', 'bride'] if t == 'honey' else [t]):
+                    intro.setdefault(t2, k)
+        self.fam = {t: min(2, 1.05 ** max(0, i - intro.get(t, 0))) for t in self.ET}
+        # the floor's cast decides which of the per-step checks can ever fire
+        cast = {t for wave in self.waves for t, *_ in wave}
+        cast |= {'groom', 'bride'} if 'honey' in cast else set()
+        cast |= {'whale'} if 'whalewife' in cast else set()
+        has = lambda k: any(self.ET[t].get(k) for t in cast)
+        self.auras, self.comps = has('aura'), has('comp')
+        self.acts = {k for k in ('paparazzi', 'showtime', 'inspect', 'audit') if has(k)}
+        self.chips = rnd(R['chips'] * (1 + i * .06))
+        self.earned = 0
+        self.stars = 20
+        self.escrow = 0
+        self.audited = False
+        self.wave = 0
+        self.running = False
+        self.over = None
+        self.left = 0
+        self.time = 0.0
+        self.enemies, self.towers, self.projectiles, self.pukes, self.spawners = [], [], [], [], []
+        self.grid = None
+        self.nid = 0
+        self.owned = ['dealer', 'roulette', 'rope', 'cage'] if baseline else list(self.TT)
+        self.owned = [k for k in self.owned if k not in D['DISABLED']]
+        self.maxlv = 2 if baseline else 5
+        self.buyN = 0
+        self.ms = 0
+        self.log = []
+
+    def restat(self, t):
+        """TS(): base stats overlaid with every tier bought on the table's branch."""
+        spec = self.TS[t.type]
+        s = dict(spec['base'])
+        if t.path:
+            for tier in spec[t.path]['tiers'][:t.lvl - 1]: s.update(tier['s'])
+        t.s = s
+        t.range = s.get('range') or self.TT[t.type].get('range')
+        t.rr = t.range * t.range if t.range else None
+
+    def earn(self, n):
+        if n <= 0: return
+        if self.audited:                         # the Auditor impounds most of it
+            held = rnd(n * ESCROW_SHARE)
+            self.escrow += held
+            self.chips += n - held
+        else:
+            self.chips += n
+
+    # ── buildTower / spawnEnemy / killEnemy / damageEnemy ──
+
+    def build(self, type, x, y):
+        t = Tower()
+        t.type, t.x, t.y, t.lvl, t.path, t.cool, t.stunUntil = type, x, y, 1, None, 0, 0
+        t.prio = 'strong' if type in ('security', 'roulette', 'sniper') else 'first'
+        self.restat(t)
+        self.stars += self.TS[type]['base'].get('rep') or 0   # the act itself buys goodwill
+        self.towers.append(t)
+        return t
+
+    def spawn(self, type):
+        E = self.ET[type]
+        e = Enemy()
+        self.nid += 1
+        e.id, e.type, e.E = self.nid, type, E
+        e.retype()
+        e.hpMax = (E['hp'] * (1 + self.wave * .08) * self.hpMul * self.fam[type]
+                   * (1.75 if e.capped else 1) * self.diff)
+        e.hp = e.hpMax
+        e.pathI = math.floor(self.rand() * len(self.lanes))
+        e.lane = self.lanes[e.pathI]
+        e.dist = 0
+        e.lat = (self.rand() - .5) * (8 if e.boss else 23)
+        e.pace = 1 if e.boss else .9 + self.rand() * .2
+        e.armor = E.get('armor') or 0
+        e.slowFac, e.slowUntil, e.stunCd = 1, 0, 0
+        e.dead = e.enraged = e.plague = e.beast = e.print = e.encored = False
+        e.mate = None
+        e.hitN = e.pukeSrc = e.pukeCd = e.spreadT = 0
+        e.poisonUntil = e.poisonDps = 0
+        e.exposed = e.exposedUntil = e.shoveImm = e.frzImm = 0
+        e.blinkT = e.skipT = e.papT = e.showT = 0
+        e.place()
+        self.enemies.append(e)
+        return e
+
+    def spawn_pair(self, a, b, lead, vows=None):
+        """spawnPair() / spawnWhaleCouple(): two guests on one lane who heal each other."""
+        g = self.spawn(a)
+        w = self.spawn(b)
+        w.pathI, w.lane = g.pathI, g.lane
+        w.place()
+        g.dist = lead
+        g.place()
+        if vows:
+            g.E = dict(g.E, **vows[0]); g.retype()
+            w.E = dict(w.E, **vows[1]); w.retype()
+        g.mate, w.mate = w, g
+
+    def kill(self, e, leaked):
+        E = e.E
+        if not leaked and E.get('encore') and not e.encored:
+            e.encored = True                     # he takes a bow and gets right back up
+            e.hpMax = max(1, rnd(e.hpMax * .5))
+            e.hp = e.hpMax
+            e.pace *= 1.35
+            e.E = dict(E, showtime=0, encoreSong=1)
+            return
+        e.dead = True
+        if E.get('audit') and not any(z is not e and not z.dead and z.E.get('audit') for z in self.enemies):
+            held = rnd(self.escrow)
+            self.escrow = 0
+            self.audited = False
+            if not leaked and held: self.chips += held
+        if not leaked:                           # the cage's cut of every body dropped nearby
+            cut = 0
+            for t in self.towers:
+                if t.type != 'cage': continue
+                kb = t.s.get('killBonus')
+                if kb and t.rr and (e.x - t.x) ** 2 + (e.y - t.y) ** 2 <= t.rr: cut += kb
+            if cut:
+                amt = rnd(cut * self.pay)
+                self.earn(amt)
+                self.earned += amt
+        if e.mate and not e.mate.dead:
+            e.mate.enraged = True
+            e.mate.mate = None
+        # a new list, as the game's filter() makes: loops already walking the old one finish it
+        self.enemies = [z for z in self.enemies if z is not e]
+        if leaked:
+            self.stars = max(0, self.stars - E['star'])
+            if E.get('steal'): self.chips = max(0, self.chips - E['steal'])
+            if self.stars <= 0 and not self.over: self.finish('LOSE')
+        else:
+            rw = rnd(E['reward'] * 1.35 * self.pay)
+            self.earn(rw)
+            self.earned += rw
+
+    def damage(self, e, dmg):
+        if e.dead: return
+        if e.exposed and self.time < e.exposedUntil: dmg *= e.exposed
+        if e.capped:
+            cap = e.hpMax * BOSS_BITE
+            if dmg > cap: dmg = cap
+        if self.comps and not e.comp:            # the Pit Boss comps everyone near him
+            for b in self.enemies:
+                c = b.comp
+                if c and not b.dead and (b.x - e.x) ** 2 + (b.y - e.y) ** 2 <= c * c:
+                    dmg *= .5
+                    break
+        if e.dodge and self.rand() < e.dodge: return
+        if e.countDodge:
+            e.hitN += 1
+            if e.hitN % e.countDodge == 0: return
+        if e.armor > 0:
+            e.armor -= 1
+            return
+        if e.enrageOnHit and not e.enraged: e.enraged = True
+        e.hp -= dmg
+        if e.hp <= 0: self.kill(e, False)
+
+    # ── waves ──
+
+    def start_wave(self):
+        if self.running or self.over: return
+        self.running = True
+        os_ = (OPENER[self.wave] if self.wave < len(OPENER) else 1) * self.diff
+        self.spawners = [[type, max(1, rnd(count * (os_ if count > 1 else 1))), interval,
+                          max(interval, si * 1.6) if count == 1 else si * 1.6]
+                         for si, (type, count, interval) in enumerate(self.waves[self.wave])]
+        self.left = sum(s[1] for s in self.spawners)
+
+    def end_wave(self):
+        self.running = False
+        self.wave += 1
+        income = rnd(45 * self.pay)
+        for t in self.towers:
+            if t.type == 'cage': income += rnd(t.s['income'] * self.pay)
+        self.earn(income)
+        self.earned += income
+        self.log.append((self.wave, round(self.time, 1), self.chips, self.stars, len(self.towers)))
+        if self.wave >= len(self.waves): self.finish('WIN')
+
+    def finish(self, verdict):
+        """win() / lose(): what probeReport() puts in the title."""
+        self.over = verdict
+        self.result = (min(self.wave + 1, len(self.waves)), verdict)
+
+    def update(self, dt):
+        total = dt * 4                          # the bot plays at G.speed 4
+        while total > 1e-4:
+            s = min(.034, total)
+            self.step(s)
+            total -= s
+
+    # ── stepSim() ──
+
+    def step(self, dt):
+        self.time += dt
+        if self.over: return
+        now = self.time
+
+        if self.running:
+            if self.left:
+                for s in self.spawners:
+                    if s[1] <= 0: continue
+                    s[3] -= dt
+                    if s[3] <= 0:
+                        if s[0] == 'honey': self.spawn_pair('groom', 'bride', 18)
+                        elif s[0] == 'whalewife':
+                            self.spawn_pair('whale', 'whalewife', 22,
+                                            ({'pairHeal': 26, 'enrage': 1.35}, {'pairHeal': 26, 'enrage': 1.7}))
+                        else: self.spawn(s[0])
+                        s[1] -= 1
+                        self.left -= 1
+                        s[3] = s[2]
+            if not self.left and not self.enemies: self.end_wave()
+
+        pukes = self.pukes
+        if pukes: self.pukes = pukes = [q for q in pukes if now <= q[2]]
+        ropes = [t for t in self.towers if t.type == 'rope']
+        hasters = [e for e in self.enemies if e.haste] if self.auras else None
+        for e in self.enemies:
+            ex, ey = e.x, e.y
+            for qx, qy, _ in pukes:              # whoever steps in it slips and slows
+                if (ex - qx) ** 2 + (ey - qy) ** 2 < 22 * 22:
+                    e.slowFac = min(e.slowFac, .45)
+                    e.slowUntil = max(e.slowUntil, now + .4)
+                    break
+            if e.poisonUntil > now:
+                if e.pukeSrc and now > e.pukeCd:
+                    e.pukeCd = now + 3.4
+                    e.slowFac = 0
+                    e.slowUntil = max(e.slowUntil, now + .5)
+                    pukes.append((ex, ey + 6, now + 2))
+                e.hp -= e.poisonDps * dt
+                if e.hp <= 0:
+                    self.kill(e, False)
+                    continue
+                if e.plague:                     # carriers infect one neighbour every .8s
+                    e.spreadT += dt
+                    if e.spreadT > .8:
+                        e.spreadT = 0
+                        for e2 in self.enemies:
+                            if e2 is e or e2.poisonUntil > now or e2.boss: continue
+                            if (e2.x - ex) ** 2 + (e2.y - ey) ** 2 <= 60 * 60:
+                                e2.poisonUntil = now + 4
+                                e2.poisonDps = e.poisonDps * .8
+                                e2.plague = True
+                                break
+            if now >= e.slowUntil: e.slowFac = 1
+            if ropes:
+                field, linger = 1, 0
+                for t in ropes:
+                    if (ex - t.x) ** 2 + (ey - t.y) ** 2 <= t.rr:
+                        field = min(field, t.s['slow'])
+                        linger = max(linger, t.s['linger'])
+                if field < 1:
+                    e.slowFac = min(e.slowFac, field)
+                    e.slowUntil = max(e.slowUntil, now + linger)
+            boost = e.enrage if e.enraged else 1
+            if hasters and not e.haste:
+                for inf in hasters:
+                    if not inf.dead and inf.haste and (inf.x - ex) ** 2 + (inf.y - ey) ** 2 < 90 * 90:
+                        boost *= 1.3
+                        break
+            d = e.dist = e.dist + e.speed * e.pace * e.slowFac * boost * dt
+            L = e.lane
+            if d >= L.kill_at:
+                self.kill(e, True)
+                continue
+            i = int(d * .25 + .5) if d > 0 else 0
+            if i >= L.n: i = L.n - 1
+            x = e.x = L.xs[i] + L.nx[i] * e.lat
+            y = e.y = L.ys[i] + L.ny[i] * e.lat
+            if e.heal and e.mate and not e.mate.dead and e.hp < e.hpMax:
+                e.hp = min(e.hpMax, e.hp + e.heal * dt)
+            if e.blink:                          # the Magician's vanishing act
+                b = e.blink
+                e.blinkT += dt
+                if e.blinkT >= b['every']:
+                    e.blinkT = 0
+                    cap = L.kill_at - 60
+                    if d < cap - 40:
+                        took = [e2 for e2 in self.enemies if e2 is not e and not e2.boss
+                                and (e2.x - ex) ** 2 + (e2.y - ey) ** 2 <= b['r'] ** 2]
+                        e.dist = min(cap, d + b['dist'])
+                        e.place()
+                        for e2 in took:
+                            e2.dist = min(e2.lane.kill_at - 60, e2.dist + b['dist'])
+                            e2.place()
+            if e.skip:                           # the Regular's staff doors
+                e.skipT += dt
+                if e.skipT >= e.skip['every']:
+                    e.skipT = 0
+                    if e.dist < L.kill_at - 220:
+                        e.dist += e.skip['dist']
+                        e.place()
+            if e.special:                        # grandma's tap, the tourist's flash
+                e.stunCd -= dt
+                if e.stunCd <= 0:
+                    flash = e.special == 'flash'
+                    near, nd = None, 1e9
+                    for t in self.towers:
+                        if t.type == 'cage' or t.type == 'rope': continue
+                        d2 = (x - t.x) ** 2 + (y - t.y) ** 2
+                        if d2 < 110 * 110 and d2 < nd and now > t.stunUntil: near, nd = t, d2
+                    if near:
+                        near.stunUntil = now + (.9 if flash else 2.5)
+                        e.stunCd = 11 if flash else 6
+                    else: e.stunCd = 1.5
+
+        if self.acts: self.boss_acts(dt, now)
+
+        for t in self.towers:
+            self.fire(t, dt, now)
+
+        if self.projectiles:
+            self.grid = None
+            self.projectiles = [p for p in self.projectiles if self.fly(p, dt, now)]
+
+    def boss_acts(self, dt, now):
+        """The headliners' floor-wide tricks: prints, showtime, inspection, the audit."""
+        acts = self.acts
+        for e in list(self.enemies) if 'paparazzi' in acts else ():
+            pz = e.E.get('paparazzi')
+            if pz:                               # everyone in frame gets a print a few steps behind
+                e.papT += dt
+                if e.papT >= pz['every']:
+                    e.papT = 0
+                    made = 0
+                    for g2 in list(self.enemies):
+                        if made >= (pz.get('copies') or 3): break
+                        if g2.boss or g2.print: continue
+                        if (g2.x - e.x) ** 2 + (g2.y - e.y) ** 2 > pz['r'] ** 2: continue
+                        c = self.spawn(g2.type)
+                        c.pathI, c.lane = g2.pathI, g2.lane
+                        c.dist = max(0, g2.dist - 120)
+                        c.place()
+                        c.print = True
+                        c.hpMax = max(1, rnd(c.hpMax * .5))
+                        c.hp = c.hpMax
+                        made += 1
+        for e in self.enemies if 'showtime' in acts else ():
+            show = e.E.get('showtime')
+            if show:                             # the floor stops to watch
+                e.showT += dt
+                if e.showT >= 8:
+                    e.showT = 0
+                    for t in self.towers:
+                        if (t.x - e.x) ** 2 + (t.y - e.y) ** 2 <= show * show:
+                            t.stunUntil = max(t.stunUntil, now + 2.4)
+        if 'inspect' in acts and any(e.E.get('inspect') for e in self.enemies):   # buffets closed, stomachs pumped
+            for t in self.towers:
+                if t.type == 'buffet': t.stunUntil = max(t.stunUntil, now + .5)
+            for insp in self.enemies:
+                if not insp.E.get('inspect'): continue
+                for e2 in self.enemies:
+                    if e2.poisonUntil <= now: continue
+                    if (e2.x - insp.x) ** 2 + (e2.y - insp.y) ** 2 <= 120 * 120:
+                        e2.poisonUntil = 0
+                        e2.plague = False
+                        e2.pukeSrc = 0
+        if 'audit' in acts: self.audited = any(e.E.get('audit') and not e.dead for e in self.enemies)
+
+    def nearest_first(self, t):
+        """firstEnemyInRange(): furthest along, or toughest for 'strong' tables."""
+        best, key = None, -math.inf
+        strong = t.prio == 'strong'
+        tx, ty, rr = t.x, t.y, t.rr
+        for e in self.enemies:
+            dx = e.x - tx
+            if dx * dx > rr: continue
+            dy = e.y - ty
+            if dx * dx + dy * dy > rr: continue
+            k = e.hp if strong else e.dist
+            if k > key: key, best = k, e
+        return best
+
+    def speed_factor(self, t):
+        """atkSpeedFactor(): the strongest waitress serving this table."""
+        f = 1
+        for w in self.towers:
+            if w.type != 'waitress' or w is t: continue
+            if (w.x - t.x) ** 2 + (w.y - t.y) ** 2 <= w.rr: f = min(f, w.s['factor'])
+        return f
+
+    def fire(self, t, dt, now):
+        """The towers' half of stepSim(): cool down, then act."""
+        kind, s = t.type, t.s
+        if kind == 'cage' or kind == 'atm': return      # the ATM is benched (DISABLED)
+        if kind == 'rope' and not s.get('shout'): return
+        if kind == 'waitress' and not s.get('cork') and not s.get('overclock'): return
+        if now < t.stunUntil: return
+        t.cool -= dt
+        if t.cool > 0: return
+        rr = t.rr
+        if kind == 'dealer' or kind == 'roulette':
+            target = self.nearest_first(t)
+            if target:
+                dmg = max(1, rnd(s['dmg'] * self.pow))
+                if kind == 'roulette':
+                    self.projectiles.append(['ball', t.x, t.y, target, dmg, s['bounce'], set(), 0,
+                                             s.get('falloff') or .5, s.get('quake') or 0])
+                else:
+                    base = math.atan2(target.y - t.y, target.x - t.x)
+                    n = s['n']
+                    for i in range(n):
+                        ang = base + (i - (n - 1) / 2) * .21
+                        self.projectiles.append(['card', t.x, t.y, math.cos(ang) * 330, math.sin(ang) * 330,
+                                                 dmg, .55, 2, set(), s.get('chill') or 0, s.get('fire') or 0,
+                                                 s.get('freeze') or 0, s.get('freezeOdds') or 0])
+                t.cool = (s.get('cd') or self.TT[kind]['cd']) * self.speed_factor(t)
+            else: t.cool = .1
+        elif kind == 'rope':                     # the velvet wall: the whole queue stops dead
+            hit = False
+            for e in self.enemies:
+                if (e.x - t.x) ** 2 + (e.y - t.y) ** 2 <= rr:
+                    e.slowFac = 0
+                    e.slowUntil = max(e.slowUntil, now + 1.3)
+                    hit = True
+            t.cool = s['shout'] if hit else .4
+        elif kind == 'waitress':
+            if s.get('cork'):                    # the cork ricochets off someone's head
+                nb, nd = None, rr
+                for e in self.enemies:
+                    d2 = (e.x - t.x) ** 2 + (e.y - t.y) ** 2
+                    if d2 < nd: nd, nb = d2, e
+                if nb:
+                    bx, by = nb.x, nb.y
+                    for e2 in self.enemies:
+                        if (e2.x - bx) ** 2 + (e2.y - by) ** 2 <= 60 * 60:
+                            e2.slowFac = 0
+                            e2.slowUntil = max(e2.slowUntil, now + 1.1)
+                    t.cool = s['cork']
+                else: t.cool = .4
+            else: t.cool = 1.1                   # overclock only shows
+        elif kind == 'buffet':
+            for e in self.enemies:
+                if (e.x - t.x) ** 2 + (e.y - t.y) ** 2 > rr: continue
+                e.poisonUntil = now + 4
+                e.poisonDps = max(e.poisonDps, s['dps'] * self.pow * .5)
+                if s.get('plague'): e.plague = True
+                if s.get('puke'): e.pukeSrc = 1
+            t.cool = 1.4
+        elif kind == 'craps':
+            hit = False
+            push, boxcars, stun = s['push'], s.get('dmg'), s.get('stun')
+            odds = s.get('shoveOdds') or .5
+            for e in self.enemies:
+                if (e.x - t.x) ** 2 + (e.y - t.y) ** 2 <= rr:
+                    if boxcars: self.damage(e, boxcars * self.pow)
+                    # only some of the crowd stumbles, and never twice in a row
+                    if self.rand() < odds and now > e.shoveImm:
+                        e.dist = max(0, e.dist - push)
+                        e.place()
+                        e.shoveImm = now + 1.8
+                        if stun:
+                            e.slowFac = 0
+                            e.slowUntil = max(e.slowUntil, now + stun)
+                    hit = True
+            if hit:
+                if s.get('bigDie'):              # seven out: a giant die rolls up the nearest lane
+                    bp = bi = 0; bd = 1e9
+                    for pi, L in enumerate(self.lanes):
+                        for i in range(0, L.n, 4):
+                            d2 = (L.xs[i] - t.x) ** 2 + (L.ys[i] - t.y) ** 2
+                            if d2 < bd: bd, bp, bi = d2, pi, i
+                    self.projectiles.append(['die', bi * STEP, bp, max(1, rnd(s['bigDie'] * self.pow)), set()])
+                t.cool = s['cd']
+            else: t.cool = .3
+        elif kind == 'magic':                    # one volunteer, always
+            pick, best = None, -1
+            for e in self.enemies:
+                if e.boss or e.beast: continue
+                if (e.x - t.x) ** 2 + (e.y - t.y) ** 2 > rr: continue
+                if e.dist > best: best, pick = e.dist, e
+            if pick:
+                pick.dist = max(0, pick.dist - s['vanish'])
+                pick.place()
+                keep = s.get('beast')
+                if keep:                         # sawn in half and put back together wrong
+                    pick.beast = True
+                    pick.E = dict(pick.E, special=None, aura=None, dodge=0, countDodge=0, skip=None,
+                                  pairHeal=0, enrage=1, armor=0)
+                    pick.retype()
+                    pick.armor = 0
+                    pick.hpMax = max(1, rnd(pick.hpMax * keep))
+                    pick.hp = min(pick.hp, pick.hpMax)
+                    pick.pace *= .72
+                strip = s.get('strip')
+                if strip:
+                    if pick.armor > 0: pick.armor -= min(pick.armor, strip)
+                    if s.get('expose'):
+                        pick.exposed = 1 + s['expose']
+                        pick.exposedUntil = now + 6
+                t.cool = s['cd']
+            else: t.cool = .4
+        elif kind == 'bouncer':                  # a cone of buckshot, one hit per guest in it
+            target = self.nearest_first(t)
+            if target:
+                base = math.atan2(target.y - t.y, target.x - t.x)
+                half = s['spread'] / 2
+                dmg = max(1, rnd(s['dmg'] * self.pow))
+                knock = s.get('knock') or 0
+                for e in self.enemies:
+                    dx, dy = e.x - t.x, e.y - t.y
+                    if dx * dx + dy * dy > rr: continue
+                    da = math.atan2(dy, dx) - base
+                    while da > math.pi: da -= math.pi * 2
+                    while da < -math.pi: da += math.pi * 2
+                    if abs(da) > half: continue
+                    self.damage(e, dmg)
+                    if knock:
+                        e.dist = max(0, e.dist - knock)
+                        e.place()
+                t.cool = s['cd'] * self.speed_factor(t)
+            else: t.cool = .25
+        elif kind == 'sniper':
+            target = self.nearest_first(t)
+            if target:
+                dmg = s['dmg'] * self.pow
+                if target.boss: dmg *= s.get('bossMul') or 1
+                self.damage(target, max(1, rnd(dmg)))
+                t.cool = s['cd'] * self.speed_factor(t)
+            else: t.cool = .3
+        elif kind == 'security':                 # walk the top N guests back out
+            n = s.get('targets') or 1
+            strong = t.prio == 'strong'
+            cands = [(e.hp if strong else e.dist, e) for e in self.enemies
+                     if (e.x - t.x) ** 2 + (e.y - t.y) ** 2 <= rr]
+            cands.sort(key=lambda c: -c[0])
+            for _, e in cands[:n]:
+                e.dist = max(0, e.dist - s['walk'])
+                e.place()
+                self.damage(e, max(1, rnd(s['dmg'] * self.pow)))
+            t.cool = s['cd'] if cands else .3
+        elif kind == 'catapult':                 # one enormous chip that skims the room
+            ammo = s['ammo']
+            target = self.nearest_first(t) if self.chips >= ammo else None
+            if target:
+                self.chips -= ammo
+                base = math.atan2(target.y - t.y, target.x - t.x)
+                lines = 1 + (s.get('storm') or 0)
+                dmg = max(1, rnd(s['dmg'] * self.pow))
+                for i in range(lines):
+                    ang = base + (i - (lines - 1) / 2) * .16
+                    self.projectiles.append(['chip', t.x, t.y, math.cos(ang) * 420, math.sin(ang) * 420, dmg, set()])
+                t.cool = (s.get('cd') or self.TT['catapult']['cd']) * self.speed_factor(t)
+            else: t.cool = .3
+
+    def near(self, x, y, r):
+        """Guests whose cell touches the r-box around (x, y), in the order stepSim() walks them."""
+        grid = self.grid
+        if grid is None:
+            grid = self.grid = {}
+            for e in self.enemies:
+                key = int(e.x // CELL) * 256 + int(e.y // CELL)
+                if key in grid: grid[key].append(e)
+                else: grid[key] = [e]
+        x0, x1, y0, y1 = int((x - r) // CELL), int((x + r) // CELL), int((y - r) // CELL), int((y + r) // CELL)
+        if x0 == x1 and y0 == y1: return grid.get(x0 * 256 + y0, ())
+        found = [e for cx in range(x0 * 256, x1 * 256 + 1, 256) for cy in range(y0, y1 + 1) for e in grid.get(cx + cy, ())]
+        if len(found) > 1: found.sort(key=lambda e: e.id)
+        return found
+
+    def fly(self, p, dt, now):
+        """The projectiles' half of stepSim(); False once the projectile is spent."""
+        kind = p[0]
+        if kind == 'card':
+            p[6] -= dt
+            px = p[1] = p[1] + p[3] * dt
+            py = p[2] = p[2] + p[4] * dt
+            if p[6] <= 0: return False
+            hit = p[8]
+            for e in self.near(px, py, 18):
+                if e.dead or e in hit: continue
+                x, y = e.x, e.y
+                if (x - px) ** 2 + (y - py) ** 2 < 18 * 18:
+                    hit.add(e)
+                    self.damage(e, p[5])
+                    if p[10]:                    # the inferno: every card is a fireball
+                        fd = max(1, rnd(p[10] * self.pow))
+                        for e2 in self.near(x, y, 55):
+                            if e2 is not e and (e2.x - x) ** 2 + (e2.y - y) ** 2 <= 55 * 55: self.damage(e2, fd)
+                    if p[11] and self.rand() < (p[12] or .35) and now > e.frzImm:
+                        e.slowFac = 0            # a roll, not a rule, and they thaw out immune
+                        e.slowUntil = max(e.slowUntil, now + p[11])
+                        e.frzImm = now + p[11] + 1.6
+                    elif p[9]:
+                        e.slowFac = min(e.slowFac, p[9])
+                        e.slowUntil = max(e.slowUntil, now + 1.8)
+                    p[7] -= 1
+                    if p[7] <= 0: return False
+        elif kind == 'ball':
+            _, bx, by, target, dmg, bounces, hit, hop, falloff, quake = p
+            if target is None or target.dead:    # retarget the nearest
+                nb, nd = None, 1e9
+                for e in self.enemies:
+                    if e in hit: continue
+                    d2 = (e.x - bx) ** 2 + (e.y - by) ** 2
+                    if d2 < nd: nd, nb = d2, e
+                p[3] = target = nb
+                if target is None: return False
+            tx, ty = target.x, target.y
+            dx, dy = tx - bx, ty - by
+            d = math.hypot(dx, dy)
+            sp = 360 * dt
+            if d <= sp + 8:
+                hit.add(target)
+                self.damage(target, max(1, rnd(dmg * falloff ** hop)))
+                p[7] = hop + 1
+                if quake:                        # the wrecking ball shoves the crowd
+                    for e2 in self.enemies:
+                        if e2 is not target and (e2.x - tx) ** 2 + (e2.y - ty) ** 2 <= 75 * 75:
+                            e2.dist = max(0, e2.dist - quake)
+                            e2.place()
+                    self.grid = None
+                p[5] = bounces - 1
+                p[1], p[2] = tx, ty
+                if p[5] <= 0: return False
+                nb, bh = None, -1                # ricochet to the strongest within 150
+                for e in self.enemies:
+                    if e in hit: continue
+                    if (e.x - tx) ** 2 + (e.y - ty) ** 2 > 150 * 150: continue
+                    if e.hp > bh: bh, nb = e.hp, e
+                if nb is None: return False
+                p[3] = nb
+            else:
+                p[1] = bx + dx / d * sp
+                p[2] = by + dy / d * sp
+        elif kind == 'chip':
+            px = p[1] = p[1] + p[3] * dt
+            py = p[2] = p[2] + p[4] * dt
+            if px < -60 or px > 1180 or py < -60 or py > 690: return False
+            hit = p[6]
+            for e in self.near(px, py, 20):
+                if e.dead or e in hit: continue
+                if (e.x - px) ** 2 + (e.y - py) ** 2 < 20 * 20:
+                    hit.add(e)
+                    self.damage(e, p[5])
+        elif kind == 'die':
+            p[1] -= 330 * dt
+            if p[1] <= 4: return False
+            for e in self.enemies:
+                if e.pathI != p[2] or e in p[4]: continue
+                if abs(e.dist - p[1]) < 46:
+                    p[4].add(e)
+                    self.damage(e, p[3])
+        return True
+
+    # ── the ?autotest bot ──
+
+    def slot(self, i, frac, off, side):
+        """A spot `off` px beside lane i at `frac` of its length, clamped to the floor."""
+        L = self.lanes[i % len(self.lanes)]
+        idx = min(L.n - 3, rnd(frac * L.n))
+        (ax, ay), (bx, by) = L.pts[idx - 2], L.pts[idx + 2]
+        px, py = L.pts[idx]
+        ln = math.hypot(bx - ax, by - ay) or 1
+        nx, ny = -(by - ay) / ln, (bx - ax) / ln
+        return (max(60, min(1060, px + nx * off * side)), max(70, min(500, py + ny * off * side)))
+
+    def auto_place(self):
+        """autoPlace(): the opening tables, near the desk on every lane."""
+        kinds = [k if k in self.owned else 'dealer'
+                 for k in ['dealer', 'roulette', 'dealer', 'roulette', 'craps', 'waitress']]
+        for i, k in enumerate(kinds):
+            if self.chips < self.TT[k]['cost']: continue
+            self.build(k, *self.slot(i, .5 + (i // len(self.lanes)) * .1, 78, -1 if i % 2 else 1))
+            self.chips -= self.TT[k]['cost']
+
+    def auto_upgrade(self):
+        """The 900ms timer: one tier on the next table in turn, keeping 80 in hand."""
+        if self.over or not self.towers: return
+        t = self.towers[self.buyN % len(self.towers)]
+        if t.lvl >= self.maxlv or t.type == 'rope': return
+        pk = t.path or ('b' if self.buyN % 2 else 'a')
+        spec = self.TS[t.type].get(pk)
+        if not spec or t.lvl - 1 >= len(spec['tiers']): return
+        cost = spec['tiers'][t.lvl - 1]['cost']
+        if self.chips < cost + 80: return
+        self.chips -= cost
+        t.path = pk
+        t.lvl += 1
+        self.restat(t)
+
+    def auto_tick(self):
+        """The 400ms timer: deal the next wave, and reinvest (affordable or not)."""
+        if self.over: return
+        if not self.running: self.start_wave()
+        if self.chips > 300 and len(self.towers) < 26:
+            pool = [z for z in ['dealer', 'roulette', 'catapult', 'bouncer', 'sniper'] if z in self.owned]
+            k = pool[self.buyN % len(pool)]
+            self.build(k, *self.slot(self.buyN, .45 + (self.buyN % 6) * .09, 120, -1 if self.buyN % 3 else 1))
+            self.chips -= self.TT[k]['cost']
+            self.buyN += 1
+
+    def play(self, budget=200000):
+        """Run the bot's three timers until the floor ends or the virtual-time budget does.
+        Returns (wave, 'WIN' | 'LOSE' | 'running') as the title would read, or (None, None)
+        if no wave had ended yet and the title still had nothing to read."""
+        self.auto_place()
+        upg, auto, upd = 900, 400, 32
+        while not self.over:
+            self.ms = now = min(upg, auto, upd)
+            if now > budget:
+                if not self.log: return None, None
+                return min(self.wave + 1, len(self.waves)), 'running'
+            if upg == now: self.auto_upgrade(); upg += 900
+            if auto == now: self.auto_tick(); auto += 400
+            if upd == now: self.update(.032); upd += 32
+        return self.result
+
+_D = None
+
+def trial(job):
+    """One run for a worker process: (floor, wave, verdict)."""
+    global _D
+    floor, seed, baseline, budget, extra = job
+    D = _D = _D or tables()
+    alt = 'b' if 'alt=b' in extra else None
+    m = re.search(r'vi=(\d+)', extra)
+    wave, verdict = Game(D, floor, seed, baseline, alt, int(m.group(1)) if m else None).play(budget)
+    return floor, wave, verdict
+
+def trials(jobs):
+    """A batch of runs in one task, so a big sweep isn't all pickling."""
+    return [trial(j) for j in jobs]
+
+def calibrate(a):
+    """Sim vs the game, floor by floor, from a sweep.py --out file (Chrome or --node)."""
+    sys.path.insert(0, HERE)
+    from sweep import run_sim, summarize, wilson
+    ref = {int(k): v for k, v in json.load(open(a.calibrate)).items()}
+    floors = sorted(ref)
+    t0 = time.time()
+    sim = summarize(run_sim(floors, a.trials, a.baseline, a.budget, a.extra, a.jobs, a.seed), floors)
+    print(f"\nsim vs {os.path.basename(a.calibrate)}   {a.trials} sim runs/floor{'  (fresh-player build)' if a.baseline else ''}"
+          f"   {time.time()-t0:.0f}s\n")
+    print(f"{'floor':>5} {'game':>14} {'90% band':>9} {'sim':>5} {'gap':>5}  {'med g/s':>7}  {'deaths g / s':>15}")
+    off = 0
+    for f in floors:
+        c, s = ref[f], sim.get(f)
+        if not s:
+            print(f"{f:>5}  no sim data"); continue
+        lo, hi = wilson(c["wins"], c["n"])
+        inside = lo <= s["rate"] <= hi
+        off += not inside
+        dc = f"{c['death_lo']}-{c['death_hi']}" if c["wins"] < c["n"] else "-"
+        ds = f"{s['death_lo']}-{s['death_hi']}" if s["wins"] < s["n"] else "-"
+        band = f"{lo*100:.0f}-{hi*100:.0f}%"
+        print(f"{f:>5} {c['wins']:>4}/{c['n']:<4} {c['rate']*100:>3.0f}% {band:>9} "
+              f"{s['rate']*100:>4.0f}% {(s['rate']-c['rate'])*100:>+5.0f}  {c['median_wave']:>3.0f}/{s['median_wave']:<3.0f}  "
+              f"{dc:>7} / {ds:<7} {'' if inside else 'OFF'}")
+    print(f"\n{len(floors) - off}/{len(floors)} floors: the sim's rate is inside the game's 90% interval"
+          f" (about {round(len(floors) * .9)} if the two agree)")
+
+def main():
+    ap = argparse.ArgumentParser(description="Pure-Python balance simulator (see tools/README.md)")
+    ap.add_argument("--floor", type=int, default=1, help="play this floor once and print it wave by wave")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--baseline", action="store_true")
+    ap.add_argument("--budget", type=int, default=200000, help="virtual ms, as Chrome's --virtual-time-budget")
+    ap.add_argument("--extra", default="", help="alt=b and vi=N are honoured, as in the URL")
+    ap.add_argument("--calibrate", metavar="SWEEP_JSON", help="compare against a sweep.py --out file (Chrome or --node)")
+    ap.add_argument("--trials", type=int, default=2000, help="sim runs per floor for --calibrate")
+    ap.add_argument("--jobs", type=int, default=os.cpu_count())
+    a = ap.parse_args()
+    if a.calibrate: return calibrate(a)
+
+    alt = 'b' if 'alt=b' in a.extra else None
+    m = re.search(r'vi=(\d+)', a.extra)
+    g = Game(tables(), a.floor, a.seed, a.baseline, alt, int(m.group(1)) if m else None)
+    t0 = time.time()
+    wave, verdict = g.play(a.budget)
+    print(f"floor {a.floor}{'B' if alt else ''}  variant {g.vi}  lanes "
+          f"{', '.join(f'{L.len:.0f}' for L in g.lanes)} px\n")
+    print(f"{'wave':>4} {'game s':>7} {'chips':>6} {'rep':>4} {'tables':>6}")
+    for w, t, c, s, n in g.log:
+        print(f"{w:>4} {t:>7.1f} {c:>6} {s:>4} {n:>6}")
+    print(f"\n{verdict} on wave {wave}/{len(g.waves)} after {g.ms/1000:.0f}s virtual"
+          f"  ({time.time()-t0:.2f}s to simulate)")
+
+if __name__ == "__main__":
+    main()
@@ -6,13 +6,20 @@ a win RATE per floor instead of a one-run anecdote.
 
   python3 tools/sweep.py --trials 30 --floors 1-31
   python3 tools/sweep.py --trials 50 --floors 5,10,20 --baseline
+  python3 tools/sweep.py --sim --trials 100000 --floors 12
+  python3 tools/sweep.py --node --trials 50 --floors 1-31 --flat
 
-Needs a local server on :8799 serving this directory.
+Needs a local server on :8799 serving this directory, except with --sim, which
+plays the floors in tools/sim.py instead of Chrome, or --node, which runs
+index.html's own script under node (tools/node-probe.js).
 """
-import argparse, json, random, re, statistics, subprocess, sys, time
-from concurrent.futures import ThreadPoolExecutor
+import argparse, json, os, random, re, statistics, subprocess, sys, time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import sim
 
 CHROME = "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"
+PROBE = os.path.join(sim.HERE, "node-probe.js")
 TITLE = re.compile(r"<title>([^<]*)</title>")
 RESULT = re.compile(r"wave=(\d+)/(\d+).*?(WIN|LOSE|running)")
 
@@ -35,12 +42,78 @@ def one(args):
     if not r: return floor, None, None
     return floor, int(r.group(1)), r.group(3)
 
+def node_one(args):
+    """What one() gives, from index.html run under node with a seeded Math.random."""
+    floor, seed, baseline, budget, extra = args
+    query = (f"?room={floor}&autotest{'&baseline' if baseline else ''}"
+             f"{'&' + extra if extra else ''}&nosw")
+    try:
+        out = subprocess.run(["node", PROBE, sim.GAME, query, str(budget), str(seed)],
+                             capture_output=True, text=True, timeout=600).stdout
+    except subprocess.TimeoutExpired:
+        return floor, None, None
+    r = RESULT.search(out)
+    if not r: return floor, None, None
+    return floor, int(r.group(1)), r.group(3)
+
+def node_batch(batch, jobs, seed):
+    """The runs of a batch under node, seeded by position like sim_batch."""
+    runs = [(f, seed + i, baseline, budget, extra) for i, (f, baseline, budget, extra) in enumerate(batch)]
+    with ThreadPoolExecutor(max_workers=jobs) as ex:
+        yield from ex.map(node_one, runs)
+
+def wilson(k, n, z=1.64):
+    """90% interval — good enough to tell 'settled' from 'needs more runs'."""
+    if n == 0: return 0.0, 1.0
+    p = k / n
+    d = 1 + z*z/n
+    c = (p + z*z/(2*n)) / d
+    h = z * ((p*(1-p)/n + z*z/(4*n*n)) ** .5) / d
+    return max(0.0, c - h), min(1.0, c + h)
+
+def sim_batch(batch, jobs, seed):
+    """The same runs as one() gives, played by sim.py across worker processes."""
+    runs = [(f, seed + i, baseline, budget, extra) for i, (f, baseline, budget, extra) in enumerate(batch)]
+    chunk = max(1, min(200, len(runs) // (jobs * 4)))
+    chunks = [runs[i:i + chunk] for i in range(0, len(runs), chunk)]
+    if jobs <= 1:
+        for c in chunks: yield from sim.trials(c)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as ex:
+        for out in ex.map(sim.trials, chunks): yield from out
+
+def run_sim(floors, trials, baseline, budget, extra, jobs, seed=None):
+    """`trials` sim runs on every floor: {floor: [(wave, verdict), ...]}."""
+    if seed is None: seed = random.randrange(2**31)
+    res = {f: [] for f in floors}
+    batch = [(f, baseline, budget, extra) for f in floors for _ in range(trials)]
+    for floor, wave, verdict in sim_batch(batch, jobs, seed):
+        if verdict: res[floor].append((wave, verdict))
+    return res
+
+def summarize(res, floors):
+    """The per-floor rows --out writes and tune.py reads."""
+    rows = {}
+    for f in floors:
+        rs = res[f]
+        if not rs: continue
+        wins = sum(1 for _, v in rs if v == "WIN")
+        waves = sorted(w for w, v in rs if v != "WIN")
+        # how many of the losses happen on the very last wave: 1.0 means a cliff
+        last = (sum(1 for w in waves if w >= 10) / len(waves)) if waves else 0
+        rows[f] = {"n": len(rs), "wins": wins, "rate": wins / len(rs),
+                   "median_wave": statistics.median(w for w, _ in rs),
+                   "death_lo": waves[0] if waves else 10, "death_hi": waves[-1] if waves else 10,
+                   "cliff": round(last, 2)}
+    return rows
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--trials", type=int, default=20)
     ap.add_argument("--floors", default="1-31")
     ap.add_argument("--baseline", action="store_true")
-    ap.add_argument("--jobs", type=int, default=10)
+    ap.add_argument("--jobs", type=int, default=None,
+                    help="parallel Chromes (default 10), or worker processes with --sim/--node (default: all cores)")
     ap.add_argument("--budget", type=int, default=200000)
     ap.add_argument("--out", default="")
     ap.add_argument("--extra", default="", help="extra query params, e.g. dhp=0.03")
@@ -48,7 +121,15 @@ def main():
                     help="win rate we are tuning toward; used to decide when a floor is settled")
     ap.add_argument("--flat", action="store_true",
                     help="run every trial on every floor instead of stopping early")
+    ap.add_argument("--sim", action="store_true",
+                    help="play the floors in tools/sim.py instead of headless Chrome")
+    ap.add_argument("--node", action="store_true",
+                    help="run index.html's own script under node (tools/node-probe.js) instead of Chrome")
+    ap.add_argument("--seed", type=int, default=None, help="first seed, for a repeatable --sim or --node sweep")
     a = ap.parse_args()
+    if a.jobs is None: a.jobs = os.cpu_count() if a.sim or a.node else 10
+    seed = random.randrange(2**31) if a.seed is None else a.seed
+    shuffle = random.Random(seed).shuffle     # seeds go by batch position, so the order must repeat too
 
     floors = []
     for part in a.floors.split(","):
@@ -61,15 +142,6 @@ def main():
     res = {f: [] for f in floors}
     spent = 0
 
-    def wilson(k, n, z=1.64):
-        """90% interval — good enough to tell 'settled' from 'needs more runs'."""
-        if n == 0: return 0.0, 1.0
-        p = k / n
-        d = 1 + z*z/n
-        c = (p + z*z/(2*n)) / d
-        h = z * ((p*(1-p)/n + z*z/(4*n*n)) ** .5) / d
-        return max(0.0, c - h), min(1.0, c + h)
-
     def settled(rs):
         """Stop sampling a floor once more runs cannot change what we would do to it."""
         n = len(rs)
@@ -84,16 +156,23 @@ def main():
 
     # sample in rounds, dropping floors that have made up their mind
     live = list(floors)
+    scale = max(1, a.trials / 50) if a.sim else 1     # the sim's rounds grow with --trials
     for size in (10, 10, 15, 15):
         if not live: break
+        size = round(size * scale)
         batch = [(f, a.baseline, a.budget, a.extra) for f in live for _ in range(size)]
         if not a.flat:
             batch = [j for j in batch if len(res[j[0]]) + size <= a.trials or True]
-        random.shuffle(batch)
-        with ThreadPoolExecutor(max_workers=a.jobs) as ex:
-            for floor, wave, verdict in ex.map(one, batch):
+        shuffle(batch)
+        if a.sim or a.node:
+            for floor, wave, verdict in (sim_batch if a.sim else node_batch)(batch, a.jobs, seed + spent):
                 if verdict: res[floor].append((wave, verdict))
                 spent += 1
+        else:
+            with ThreadPoolExecutor(max_workers=a.jobs) as ex:
+                for floor, wave, verdict in ex.map(one, batch):
+                    if verdict: res[floor].append((wave, verdict))
+                    spent += 1
         live = [f for f in live
                 if len(res[f]) < a.trials and not (settled(res[f]) and not a.flat)]
         print(f"  {spent} runs, {time.time()-t0:.0f}s, {len(live)} floors still open",
@@ -101,27 +180,19 @@ def main():
     done = spent
 
     print(f"\nup to {a.trials} runs/floor {a.extra}"
-          f"{'  (fresh-player build)' if a.baseline else ''}"
+          f"{'  (fresh-player build)' if a.baseline else ''}{'  (sim)' if a.sim else ''}{'  (node)' if a.node else ''}"
           f"   {spent} runs, {time.time()-t0:.0f}s wall\n")
     print(f"{'floor':>5} {'win rate':>9} {'n':>4}  {'med':>4} {'deaths':>7}  {'on w10':>6}\n")
-    rows = {}
+    rows = summarize(res, floors)
     for f in floors:
-        rs = res[f]
-        if not rs:
+        if f not in rows:
             print(f"{f:>5} {'no data':>9}"); continue
-        wins = sum(1 for _, v in rs if v == "WIN")
-        rate = wins / len(rs)
-        waves = sorted(w for w, v in rs if v != "WIN")
-        med = statistics.median(w for w, _ in rs)
-        lo = waves[0] if waves else 10
-        hi = waves[-1] if waves else 10
-        # how many of the losses happen on the very last wave: 1.0 means a cliff
-        last = (sum(1 for w in waves if w >= 10) / len(waves)) if waves else 0
-        rows[f] = {"n": len(rs), "wins": wins, "rate": rate, "median_wave": med,
-                   "death_lo": lo, "death_hi": hi, "cliff": round(last, 2)}
+        r = rows[f]
+        n, wins, rate, med, last = r["n"], r["wins"], r["rate"], r["median_wave"], r["cliff"]
+        deaths = f"{r['death_lo']}-{r['death_hi']}" if wins < n else ""
         flag = "CLIFF" if last > .8 and wins == 0 else ("shut" if med < 7 and wins == 0 else "")
-        print(f"{f:>5} {wins:>3}/{len(rs):<5} {rate*100:>3.0f}% {len(rs):>4}  "
-              f"{med:>4.0f} {('' if not waves else f'{lo}-{hi}'):>7}  {last*100:>4.0f}%  {flag:<5} {'█' * round(rate*20)}")
+        print(f"{f:>5} {wins:>3}/{n:<5} {rate*100:>3.0f}% {n:>4}  "
+              f"{med:>4.0f} {deaths:>7}  {last*100:>4.0f}%  {flag:<5} {'█' * round(rate*20)}")
     if a.out:
         json.dump(rows, open(a.out, "w"), indent=1)
         print(f"\nwrote {a.out}")